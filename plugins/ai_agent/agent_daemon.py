@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agent Daemon for Sarah AI Agent
+
+This module keeps a single warm AI agent running behind a Unix socket so that
+`sarah ai_agent ...` calls only pay for a socket round trip instead of loading
+spaCy, the sentence model and a fresh conversation session every time.
+
+Protocol: the client sends one JSON line ``{"args": [...], "client": "..."}``;
+the server streams back JSON lines ``{"output": "..."}`` and finishes with
+``{"done": true}``. The client id (the terminal session, or SARAH_SESSION
+if set) tells the agent which conversation the request belongs to.
+"""
+
+import os
+import json
+import time
+import signal
+import socket
+import socketserver
+import subprocess
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "~/.sarah/ai_agent.sock"
+DEFAULT_LOG_PATH = "~/.sarah/ai_agent.log"
+
+
+def client_id() -> str:
+    """Identify this caller's conversation: SARAH_SESSION, or the user and terminal session"""
+    return os.environ.get('SARAH_SESSION') or f"{os.getuid()}:{os.getsid(0)}"
+
+
+class _SocketWriter:
+    """File-like object that frames everything written to it as output messages"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        if text:
+            self.send({"output": text})
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def send(self, message: Dict[str, Any]) -> None:
+        data = (json.dumps(message) + "\n").encode('utf-8')
+        with self.lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles a single client request on the agent socket"""
+
+    def handle(self):
+        daemon = self.server.agent_daemon
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError:
+            logger.warning("Ignoring malformed daemon request")
+            return
+
+        writer = _SocketWriter(self.wfile)
+        try:
+            daemon.dispatch(request, writer)
+        except BrokenPipeError:
+            logger.info("Client disconnected before the response was complete")
+            return
+        except Exception as e:
+            logger.error(f"Daemon request failed: {e}")
+            writer.send({"output": f"[ERROR] AI Agent daemon error: {e}\n"})
+
+        try:
+            writer.send({"done": True})
+        except BrokenPipeError:
+            pass
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class AgentDaemon:
+    """
+    Long-running server that forwards client requests to a warm agent handler
+    """
+
+    def __init__(self, handler: Callable[[List[str], Any, str], None],
+                 socket_path: str = DEFAULT_SOCKET_PATH,
+                 idle_timeout_minutes: float = 0):
+        self.handler = handler
+        self.socket_path = os.path.expanduser(socket_path)
+        self.idle_timeout = idle_timeout_minutes * 60
+        self.last_activity = time.monotonic()
+        self.server: Optional[_ThreadingUnixServer] = None
+        self._lock = threading.Lock()
+
+    def dispatch(self, request: Dict[str, Any], writer: _SocketWriter) -> None:
+        """Run one client request against the agent, streaming output to the client"""
+        self.last_activity = time.monotonic()
+
+        if request.get("command") == "stop":
+            writer.write("[INFO] AI Agent daemon stopping\n")
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return
+
+        args = [str(arg) for arg in request.get("args", [])]
+        client = str(request.get("client", ""))
+
+        # Each client has its own conversation, but the NLP models and
+        # in-process plugin dispatch are shared, so requests are still
+        # handled one at a time.
+        with self._lock:
+            self.handler(args, writer, client)
+
+        self.last_activity = time.monotonic()
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve requests until stopped"""
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        self._remove_stale_socket()
+
+        self.server = _ThreadingUnixServer(self.socket_path, _RequestHandler)
+        self.server.agent_daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+        if self.idle_timeout > 0:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        if threading.current_thread() is threading.main_thread():
+            # Stop cleanly on SIGTERM, so the agent gets to save pending history
+            signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+                target=self.shutdown, daemon=True).start())
+
+        logger.info(f"AI Agent daemon listening on {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            logger.info("AI Agent daemon stopped")
+
+    def shutdown(self) -> None:
+        """Stop serving; safe to call from any thread other than the server loop"""
+        if self.server:
+            self.server.shutdown()
+
+    def _watch_idle(self) -> None:
+        """Shut the daemon down once it has been idle for the configured time"""
+        while True:
+            time.sleep(min(self.idle_timeout, 30))
+            if time.monotonic() - self.last_activity >= self.idle_timeout:
+                logger.info("AI Agent daemon idle timeout reached")
+                self.shutdown()
+                return
+
+    def _remove_stale_socket(self) -> None:
+        """Remove a socket file left behind by a daemon that is no longer running"""
+        if not os.path.exists(self.socket_path):
+            return
+
+        if AgentClient(self.socket_path).is_running():
+            raise RuntimeError(f"Another AI Agent daemon is already listening on {self.socket_path}")
+
+        os.unlink(self.socket_path)
+
+
+class AgentClient:
+    """
+    Thin client that forwards arguments to the agent daemon and relays its output
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, startup_timeout: float = 15):
+        self.socket_path = os.path.expanduser(socket_path)
+        self.startup_timeout = startup_timeout
+
+    def is_running(self) -> bool:
+        """Check whether a daemon is accepting connections"""
+        try:
+            with self._connect():
+                return True
+        except OSError:
+            return False
+
+    def ensure_running(self, launch_cmd: List[str], log_path: str = DEFAULT_LOG_PATH) -> bool:
+        """Start the daemon if needed and wait until it accepts connections"""
+        if self.is_running():
+            return True
+
+        log_path = os.path.expanduser(log_path)
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+        with open(log_path, 'ab') as log_file:
+            subprocess.Popen(
+                launch_cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.is_running():
+                return True
+            time.sleep(0.1)
+
+        logger.warning(f"AI Agent daemon did not start within {self.startup_timeout}s")
+        return False
+
+    def send(self, args: List[str], on_output: Callable[[str], None]) -> bool:
+        """
+        Forward a request and relay output as it arrives
+
+        Once the daemon has started responding it has usually run plugins and
+        recorded the turn, so a connection lost after that is reported as an
+        error rather than leaving the request to be handled again.
+
+        Returns:
+            True if the daemon handled the request, even partly; False if it
+            closed the connection without responding
+
+        Raises:
+            OSError: If the request could not be sent
+        """
+        return self._request({"args": list(args), "client": client_id()}, on_output)
+
+    def stop(self, on_output: Callable[[str], None]) -> bool:
+        """Ask a running daemon to shut down"""
+        return self._request({"command": "stop"}, on_output)
+
+    def _request(self, request: Dict[str, Any], on_output: Callable[[str], None]) -> bool:
+        with self._connect() as sock:
+            sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+
+            received = False
+            with sock.makefile('rb') as stream:
+                while True:
+                    try:
+                        line = stream.readline()
+                        if not line:
+                            break
+                        received = True
+                        message = json.loads(line.decode('utf-8'))
+                    except (OSError, ValueError) as e:
+                        if not received:
+                            raise
+                        logger.warning(f"Lost connection to the AI Agent daemon: {e}")
+                        break
+                    if message.get("done"):
+                        return True
+                    if "output" in message:
+                        on_output(message["output"])
+
+        if not received:
+            return False
+        on_output("[ERROR] Lost connection to the AI Agent daemon; the request may not have completed\n")
+        return True
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+def create_agent_daemon(handler: Callable[[List[str], Any, str], None],
+                        socket_path: str = DEFAULT_SOCKET_PATH,
+                        idle_timeout_minutes: float = 0) -> AgentDaemon:
+    """Factory function to create agent daemon"""
+    return AgentDaemon(handler, socket_path, idle_timeout_minutes)
+
+
+if __name__ == "__main__":
+    # Serve an echo handler so the protocol can be exercised without the AI stack
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+
+    def echo_handler(args, stream, client):
+        print(f"echo to {client}: {' '.join(args)}", file=stream)
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "/tmp/sarah_agent_test.sock"
+    create_agent_daemon(echo_handler, path).serve_forever()
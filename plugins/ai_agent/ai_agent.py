@@ -9,9 +9,14 @@ with robust Unicode handling for different environments.
 
 import os
 import sys
+import json
+import time
+import argparse
 import logging
+import threading
 import traceback
-import subprocess
+from datetime import datetime, timedelta
+from contextlib import contextmanager
 from typing import Dict, List, Any, Optional
 
 import gi
@@ -23,25 +28,76 @@ from gi.repository import GObject, Peas, Sarah
 try:
     from .ai_core import create_ai_core, Intent
     from .conversation_manager import create_conversation_manager
+    from .conversation_stats import create_conversation_stats
+    from .conversation_log import create_conversation_log
+    from .session_store import SessionStore
+    from .session_backend import create_session_backend
+    from .history_index import create_history_index
+    from .agent_daemon import AgentClient, create_agent_daemon
+    from .plugin_executor import create_plugin_executor, ExecutionResult, OrderedOutput, PluginCall
+    from .batch_runner import create_batch_runner
+    from .result_cache import create_result_cache
+    from .circuit_breaker import create_circuit_breakers
+    from .prefetcher import create_prefetcher
+    from .completion import create_input_completer
+    from .llm_fallback import create_llm_fallback
+    from .semantic_cache import create_semantic_cache
 except ImportError:
     # Fallback for direct execution
     from ai_core import create_ai_core, Intent
     from conversation_manager import create_conversation_manager
+    from conversation_stats import create_conversation_stats
+    from conversation_log import create_conversation_log
+    from session_store import SessionStore
+    from session_backend import create_session_backend
+    from history_index import create_history_index
+    from agent_daemon import AgentClient, create_agent_daemon
+    from plugin_executor import create_plugin_executor, ExecutionResult, OrderedOutput, PluginCall
+    from batch_runner import create_batch_runner
+    from result_cache import create_result_cache
+    from circuit_breaker import create_circuit_breakers
+    from prefetcher import create_prefetcher
+    from completion import create_input_completer
+    from llm_fallback import create_llm_fallback
+    from semantic_cache import create_semantic_cache
 
 logger = logging.getLogger(__name__)
 
+# Per-thread output stream, so daemon requests print to their own client
+_output = threading.local()
+
+# Per-thread conversation session of the daemon client being served
+_request = threading.local()
+
+
+def current_output():
+    """Get the stream safe_print writes to from the current thread"""
+    return getattr(_output, 'stream', None) or sys.stdout
+
 
 def safe_print(message: str):
     """Safely print messages with Unicode fallback for encoding issues"""
+    stream = current_output()
     try:
-        print(message)
+        print(message, file=stream)
     except UnicodeEncodeError:
         # Fallback to ASCII-safe version without emojis
         ascii_message = message.encode('ascii', 'ignore').decode('ascii').strip()
         if ascii_message:
-            print(ascii_message)
+            print(ascii_message, file=stream)
         else:
-            print("[Unicode content - display not supported]")
+            print("[Unicode content - display not supported]", file=stream)
+
+
+@contextmanager
+def redirect_output(stream):
+    """Send safe_print output from the current thread to another stream"""
+    previous = getattr(_output, 'stream', None)
+    _output.stream = stream
+    try:
+        yield stream
+    finally:
+        _output.stream = previous
 
 
 class AIAgentPlugin(GObject.Object, Sarah.IExtension):
@@ -56,24 +112,60 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
         super().__init__()
         self.ai_core = None
         self.conversation_manager = None
+        self.executor = None
+        self.result_cache = None
+        self.prefetcher = None
+        self.llm_fallback = None
         self.initialized = False
-        
-        # Try to initialize AI components
-        self._initialize_ai()
+        self.ai_loaded = False
+        self.serving = False
+        self._client_sessions: Dict[str, str] = {}
+        self._client_sessions_lock = threading.Lock()
+        self.config = self._load_config()
+
+    def _ensure_initialized(self, background_models: bool = False):
+        """Load AI components on first use, so forwarding to the daemon stays cheap"""
+        if not self.ai_loaded:
+            self.ai_loaded = True
+            self._initialize_ai(background_models)
 
-    def _initialize_ai(self):
-        """Initialize AI components with error handling"""
+    def _initialize_ai(self, background_models: bool = False):
+        """
+        Initialize AI components with error handling
+        
+        Args:
+            background_models: Load the NLP models on a background thread,
+                using keyword matching until they are ready
+        """
         try:
             # Create AI core
             config_path = self._get_config_path()
-            self.ai_core = create_ai_core(config_path)
+            self.ai_core = create_ai_core(config_path, load_models=not background_models)
+            if background_models:
+                self.ai_core.load_models_in_background()
             
-            # Create conversation manager
-            self.conversation_manager = create_conversation_manager()
+            # Create conversation manager, remembering earlier sessions
+            conversation_config = self.config.get('conversation', {})
+            self.conversation_manager = create_conversation_manager(
+                conversation_config.get('max_context_turns', 10),
+                conversation_config.get('session_timeout_minutes', 30),
+                conversation_config.get('max_active_sessions', 1000),
+                conversation_config.get('dialogue_acts')
+            )
+            self.conversation_manager.stats = create_conversation_stats(
+                conversation_config.get('topic_window', 20),
+                conversation_config.get('location_half_life_days', 7)
+            )
+            # The index goes first, so opening the history expires its old turns too
+            self._open_history_index()
+            if conversation_config.get('store', 'sqlite') == 'log':
+                self._open_conversation_log()
+            else:
+                self._open_session_store()
             
-            # Start conversation session
+            # Continue the latest session if it is recent, otherwise start one
             if self.conversation_manager:
-                greeting = self.conversation_manager.start_conversation()
+                greeting = self.conversation_manager.start_conversation(resume=True)
                 safe_print(f"\n[AI] {greeting}")
                 safe_print("[INFO] You can now talk to me in natural language!")
                 safe_print("[INFO] Try: 'What's the weather like?' or 'Search for Python tutorials'")
@@ -88,6 +180,168 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
             safe_print("[INFO] Basic keyword matching will be used instead.")
             self.initialized = False
 
+    def _history_path(self) -> str:
+        """Get path to the JSON conversation history written by earlier versions"""
+        history_file = self.config.get('conversation', {}).get('history_file', '~/.sarah/conversation_history.json')
+        return os.path.expanduser(history_file)
+
+    def _open_conversation_log(self):
+        """
+        Rebuild the conversation history from the append-only log and keep it up to date
+        
+        The first time, sessions from the old JSON history file are imported.
+        """
+        conversation_config = self.config.get('conversation', {})
+        if not conversation_config.get('save_history', True):
+            return
+        
+        log = create_conversation_log(
+            conversation_config.get('log_file', '~/.sarah/conversation_log.jsonl'),
+            conversation_config.get('fsync', True)
+        )
+        migrate = not log.exists() and os.path.exists(self._history_path())
+        
+        self.conversation_manager.open_log(
+            log,
+            conversation_config.get('retention_days', 30),
+            conversation_config.get('max_sessions', 500),
+            conversation_config.get('compact_after', 1000)
+        )
+        
+        if migrate:
+            self.conversation_manager.load_conversation_history(self._history_path())
+            self.conversation_manager.import_into_log()
+
+    def _open_session_store(self):
+        """
+        Resume from the configured session backend and keep it up to date
+        
+        The first time the SQLite store is used, sessions from the conversation
+        log (or the older JSON history file) are imported. If the configured
+        backend can't be used, the SQLite store is used instead.
+        """
+        conversation_config = self.config.get('conversation', {})
+        if not conversation_config.get('save_history', True):
+            return
+        
+        try:
+            store = create_session_backend(conversation_config)
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning(f"Conversation store unavailable ({e}), using the local database")
+            store = create_session_backend(dict(conversation_config, store='sqlite'))
+        
+        if isinstance(store, SessionStore) and store.created:
+            self._import_into_store(store)
+        
+        self.conversation_manager.open_store(store, conversation_config.get('retention_days', 30))
+    
+    def _open_history_index(self):
+        """Index each turn by the embedding of its input, for `history search`"""
+        conversation_config = self.config.get('conversation', {})
+        index_config = conversation_config.get('history_index', {})
+        if not conversation_config.get('save_history', True) or not index_config.get('enabled', True):
+            return
+        
+        try:
+            index = create_history_index(index_config.get('path', '~/.sarah/history_index'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"History index unavailable: {e}")
+            return
+        self.conversation_manager.attach_index(index)
+    
+    def _start_history_writer(self):
+        """
+        Save the history on a background thread, within the configured durability window
+        
+        Only long-lived agents (the daemon and the REPL) write behind; a
+        one-shot command saves its turn before it returns, since nothing
+        guarantees it a chance to flush on exit.
+        """
+        write_behind = self.config.get('conversation', {}).get('write_behind', {})
+        if not write_behind.get('enabled', True) or not self.conversation_manager:
+            return
+        self.conversation_manager.start_writer(
+            write_behind.get('max_delay_seconds', 1.0),
+            write_behind.get('max_batch', 64),
+            write_behind.get('max_pending', 1024)
+        )
+    
+    def _import_into_store(self, store):
+        """Copy the history kept by earlier versions into a new session store"""
+        conversation_config = self.config.get('conversation', {})
+        previous = create_conversation_manager()
+        log = create_conversation_log(conversation_config.get('log_file', '~/.sarah/conversation_log.jsonl'),
+                                      fsync=False)
+        if log.exists():
+            previous.load_log(log)
+        elif os.path.exists(self._history_path()):
+            previous.load_conversation_history(self._history_path())
+        
+        if previous.conversation_history:
+            store.import_sessions(list(previous.conversation_history.values()))
+            logger.info(f"Imported {len(previous.conversation_history)} sessions into {store.path}")
+    
+    def _start_prefetcher(self):
+        """
+        Warm the result cache for likely requests now and whenever the agent is idle
+        
+        Only long-lived agents (the daemon and the REPL) prefetch, since a
+        one-shot command would exit before the results arrive.
+        """
+        prefetch_config = self.config.get('prefetch', {})
+        if not prefetch_config.get('enabled', True) or not self.ai_core or not self.conversation_manager:
+            return
+        
+        executor = self._get_executor()
+        if executor.cache is None:
+            return
+        
+        self.prefetcher = create_prefetcher(
+            executor,
+            self.conversation_manager,
+            self._prepare_plugin_args,
+            self.ai_core.is_side_effect_free,
+            prefetch_config
+        )
+        self.prefetcher.prefetch()
+        self.prefetcher.start_idle_watch()
+
+    def _start_governor(self):
+        """Unload the NLP models of a long-lived agent when idle, and sample its memory use"""
+        if self.ai_core:
+            self.ai_core.governor.start()
+
+    def _create_completer(self):
+        """
+        Set up tab-completion for the REPL from plugin names, examples and past inputs
+        
+        The saved inputs load in the background; on first use they are seeded
+        from the conversation history.
+        """
+        completion_config = self.config.get('completion', {})
+        if not completion_config.get('enabled', True):
+            return None
+        
+        completer = create_input_completer(
+            completion_config.get('path', '~/.sarah/completions.txt'),
+            completion_config.get('max_suggestions', 8),
+            completion_config.get('max_entries', 20000),
+            completion_config.get('compact_after', 500)
+        )
+        
+        if self.ai_core:
+            for plugin_name, plugin_info in self.ai_core.plugins_info.items():
+                completer.add_phrases([plugin_name], 2)
+                completer.add_phrases(plugin_info.examples)
+        
+        if completer.path and not os.path.exists(completer.path) and self.conversation_manager:
+            for context in self.conversation_manager.conversation_history.values():
+                for turn in context.turns:
+                    completer.record(turn.user_input)
+        
+        completer.load_in_background()
+        return completer
+
     def _get_config_path(self) -> Optional[str]:
         """Get path to AI configuration file"""
         config_locations = [
@@ -101,9 +355,73 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
                 return path
         return None
 
+    def _load_config(self) -> Dict:
+        """Load agent configuration"""
+        config = {
+            "daemon": {
+                "enabled": True,
+                "autostart": True,
+                "socket_path": "~/.sarah/ai_agent.sock",
+                "log_file": "~/.sarah/ai_agent.log",
+                "startup_timeout": 60,
+                "idle_timeout_minutes": 60
+            }
+        }
+
+        config_path = self._get_config_path()
+        if config_path:
+            try:
+                with open(config_path, 'r') as f:
+                    user_config = json.load(f)
+                for section, values in user_config.items():
+                    if isinstance(values, dict) and isinstance(config.get(section), dict):
+                        config[section].update(values)
+                    else:
+                        config[section] = values
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to load AI config {config_path}: {e}")
+
+        return config
+
     def do_activate(self, args, argv):
         """Main activation method called by Sarah's plugin system"""
         try:
+            args = list(args or [])
+
+            if args and args[0] == '--serve':
+                self._serve()
+                return
+            elif args and args[0] == '--stop':
+                self._stop_daemon()
+                return
+            elif args and args[0] == '--batch':
+                # Batch input and output are local files/streams, so never forwarded
+                self._run_batch(args[1:])
+                return
+            elif args and args[0] == '--no-daemon':
+                args = args[1:]
+            elif self._forward_to_daemon(args):
+                return
+
+            self.handle_command(args)
+
+        except Exception as e:
+            error_msg = f"AI Agent error: {e}"
+            logger.error(error_msg)
+            safe_print(f"[ERROR] {error_msg}")
+            if logger.isEnabledFor(logging.DEBUG):
+                traceback.print_exc()
+
+    def handle_command(self, args: List[str]):
+        """Handle agent arguments in this process"""
+        try:
+            if self.prefetcher:
+                self.prefetcher.touch()
+            
+            # Force fresh results for this request only
+            use_cache = '--no-cache' not in args
+            args = [arg for arg in args if arg != '--no-cache']
+
             if not args:
                 self._show_help()
                 return
@@ -116,12 +434,18 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
                 self._show_help()
                 return
             elif user_input.lower() in ['status', '--status']:
+                self._ensure_initialized()
                 self._show_status()
                 return
+            elif args[0].lower() == 'history':
+                self._ensure_initialized()
+                self._show_history(args[1:])
+                return
             
             # Process natural language input
-            self._process_natural_language(user_input)
-            
+            self._ensure_initialized()
+            self._process_natural_language(user_input, use_cache)
+
         except Exception as e:
             error_msg = f"AI Agent error: {e}"
             logger.error(error_msg)
@@ -129,76 +453,377 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
             if logger.isEnabledFor(logging.DEBUG):
                 traceback.print_exc()
 
-    def _process_natural_language(self, user_input: str):
+    def _forward_to_daemon(self, args: List[str]) -> bool:
+        """
+        Forward the request to the warm agent daemon
+
+        Returns:
+            True if the daemon handled the request, False if it should be
+            handled locally instead
+        """
+        daemon_config = self.config['daemon']
+        if self.serving or not daemon_config.get('enabled'):
+            return False
+
+        client = AgentClient(daemon_config['socket_path'], daemon_config['startup_timeout'])
+
+        try:
+            if daemon_config.get('autostart'):
+                running = client.ensure_running(['sarah', 'ai_agent', '--serve'],
+                                                daemon_config['log_file'])
+            else:
+                running = client.is_running()
+
+            if not running:
+                return False
+
+            return client.send(args, self._write_output)
+
+        except (OSError, ValueError) as e:
+            logger.warning(f"AI Agent daemon unavailable, handling locally: {e}")
+            return False
+
+    def _write_output(self, text: str):
+        """Relay raw output text received from the daemon"""
+        stream = current_output()
+        try:
+            stream.write(text)
+        except UnicodeEncodeError:
+            stream.write(text.encode('ascii', 'ignore').decode('ascii'))
+        stream.flush()
+
+    def _serve(self):
+        """Run this process as the warm agent daemon"""
+        daemon_config = self.config['daemon']
+        self.serving = True
+        self._ensure_initialized()
+        self._start_history_writer()
+        self._start_prefetcher()
+        self._start_governor()
+        if self.conversation_manager:
+            self.conversation_manager.start_sweeper(
+                self.config.get('conversation', {}).get('sweep_interval_seconds', 60)
+            )
+
+        daemon = create_agent_daemon(
+            self._handle_daemon_request,
+            daemon_config['socket_path'],
+            daemon_config.get('idle_timeout_minutes', 0)
+        )
+
+        try:
+            daemon.serve_forever()
+        finally:
+            self.serving = False
+            self.do_deactivate()
+
+    def _handle_daemon_request(self, args: List[str], stream, client: str = ""):
+        """Handle one request received by the daemon, printing to the client"""
+        with redirect_output(stream):
+            _request.session = self._client_session(client) if client else None
+            try:
+                self.handle_command(args)
+            finally:
+                _request.session = None
+
+    def _client_session(self, client: str):
+        """Get the conversation session of a daemon client, starting one if it has none or it timed out"""
+        self._ensure_initialized()
+        if not self.conversation_manager:
+            return None
+        
+        with self._client_sessions_lock:
+            session_id = self._client_sessions.get(client)
+            session = self.conversation_manager.get_session(session_id) if session_id else None
+            if session is None:
+                session = self.conversation_manager.new_session()
+                self._client_sessions[client] = session.session_id
+            return session
+
+    @staticmethod
+    def _session():
+        """Get the conversation session of this request; None means the current session"""
+        return getattr(_request, 'session', None)
+
+    def _stop_daemon(self):
+        """Stop a running agent daemon"""
+        client = AgentClient(self.config['daemon']['socket_path'])
+        if not client.is_running():
+            safe_print("[INFO] AI Agent daemon is not running")
+            return
+        client.stop(self._write_output)
+
+    def _run_batch(self, args: List[str]):
+        """Process a JSONL file (or stdin) of utterances, writing JSONL results"""
+        parser = argparse.ArgumentParser(prog='sarah ai_agent --batch')
+        parser.add_argument('input', help="JSONL file of utterances, or '-' for stdin")
+        parser.add_argument('--output', '-o', default='-', help="JSONL result file, or '-' for stdout")
+        parser.add_argument('--execute', action='store_true',
+                            help="Run the recognized plugins that only look things up")
+        parser.add_argument('--allow-side-effects', action='store_true',
+                            help="With --execute, also run plugins with side effects (e.g. opening a browser)")
+        parser.add_argument('--chunk-size', type=int,
+                            default=self.config.get('batch', {}).get('chunk_size', 64))
+
+        try:
+            options = parser.parse_args(args)
+        except SystemExit:
+            return
+
+        # Keep stdout clean for JSONL results
+        with redirect_output(sys.stderr):
+            self._ensure_initialized()
+
+        try:
+            if not self.ai_core:
+                safe_print("[ERROR] Batch mode needs the AI core, which failed to initialize")
+                return
+
+            runner = create_batch_runner(
+                self.ai_core,
+                self._get_executor() if options.execute else None,
+                self._prepare_plugin_args,
+                options.chunk_size,
+                allow_side_effects=options.allow_side_effects
+            )
+
+            source = sys.stdin if options.input == '-' else open(options.input, 'r', encoding='utf-8')
+            sink = sys.stdout if options.output == '-' else open(options.output, 'w', encoding='utf-8')
+            try:
+                stats = runner.run(source, sink, execute=options.execute)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+                if sink is not sys.stdout:
+                    sink.close()
+        finally:
+            self.do_deactivate()
+
+        print(f"[INFO] Batch complete: {stats['processed']} processed, "
+              f"{stats['executed']} executed, {stats['skipped']} skipped, {stats['errors']} invalid",
+              file=sys.stderr)
+
+    def _process_natural_language(self, user_input: str, use_cache: bool = True):
         """Process natural language input and execute appropriate action"""
         
         if not self.initialized or not self.ai_core:
             # Fallback to simple keyword matching
-            self._fallback_processing(user_input)
+            self._fallback_processing(user_input, use_cache)
+            return
+        
+        if self.ai_core.models_loading:
+            safe_print(f"[INFO] Language models are still loading ({self.ai_core.load_status})")
+            self._fallback_processing(user_input, use_cache)
             return
         
         try:
-            # Understand the intent
-            intent = self.ai_core.understand_input(user_input)
+            # Understand the intent, splitting compound requests into clauses
+            intents = self.ai_core.understand_compound(user_input)
+            if len(intents) > 1:
+                self._process_compound(intents, use_cache)
+                return
+            
+            intent = intents[0]
             
             safe_print(f"[AI] I understand you want: {intent.plugin_name} (confidence: {intent.confidence:.2f})")
             
             if intent.confidence < 0.3:
-                # Very low confidence - ask for clarification
+                # Very low confidence - let the language model answer if
+                # configured, otherwise ask for clarification
+                if self._answer_with_llm(intent):
+                    return
                 suggestions = self.ai_core.get_suggestions(user_input, 3)
                 self._show_suggestions(user_input, suggestions)
                 return
             
+            # Start the runner-up too if the intent is uncertain
+            if use_cache:
+                self._speculate(intent)
+            
             # Execute the intended plugin
-            success = self._execute_plugin(intent)
+            result = self._execute_plugin(intent, use_cache)
             
             # Add to conversation history
-            if self.conversation_manager:
-                plugin_response = "Command executed successfully" if success else "Command failed"
-                self.conversation_manager.add_turn(
-                    user_input, intent.plugin_name, intent.confidence,
-                    intent.entities, plugin_response, success
-                )
+            self._record_turn(intent, result)
             
         except Exception as e:
             logger.error(f"Error processing natural language: {e}")
             safe_print(f"[ERROR] Sorry, I encountered an error: {e}")
 
-    def _execute_plugin(self, intent: Intent) -> bool:
+    def _answer_with_llm(self, intent: Intent) -> bool:
+        """
+        Answer an input no plugin matches with the OpenAI fallback model
+        
+        Returns:
+            False if the fallback is disabled or the model could not be reached
+        """
+        fallback = self._get_llm_fallback()
+        if not fallback.available:
+            return False
+        
+        safe_print("[AI] No plugin fits that; asking the language model.")
+        answer = fallback.answer(intent.raw_text, current_output(), intent.embedding)
+        if answer is None:
+            safe_print("[WARNING] The language model is unavailable right now.")
+            return False
+        
+        if self.conversation_manager:
+            self.conversation_manager.add_turn(
+                intent.raw_text, 'openai', intent.confidence, intent.entities, answer, True,
+                session=self._session(), embedding=intent.embedding
+            )
+        return True
+
+    def _get_llm_fallback(self):
+        """Get the OpenAI fallback, creating it and its semantic cache on first use"""
+        if self.llm_fallback is None:
+            openai_config = self.config.get('openai', {})
+            cache_config = openai_config.get('semantic_cache', {})
+            cache = create_semantic_cache(cache_config) if cache_config.get('enabled', True) else None
+            self.llm_fallback = create_llm_fallback(openai_config, cache)
+        return self.llm_fallback
+
+    def _speculate(self, intent: Intent):
+        """
+        Run the runner-up plugin of a mid-confidence intent in the background
+        
+        Its output is not shown; the result only goes into the result cache,
+        so it is served instantly if the next turn turns out to want it. Only
+        plugins flagged side-effect free are run this way.
+        """
+        speculation = self.config.get('speculation', {})
+        if not speculation.get('enabled') or not intent.alternatives:
+            return
+        
+        if not speculation.get('min_confidence', 0.3) <= intent.confidence < speculation.get('max_confidence', 0.6):
+            return
+        
+        runner_up = intent.alternatives[0]
+        if not self.ai_core.is_side_effect_free(runner_up['plugin']):
+            return
+        
+        runner_up_intent = Intent(runner_up['plugin'], runner_up['confidence'], intent.entities, intent.raw_text)
+        call = PluginCall(runner_up_intent.plugin_name, self._prepare_plugin_args(runner_up_intent))
+        if self._get_executor().run_in_background(call):
+            safe_print(f"[AI] Also looking up {call.plugin_name} (confidence: {runner_up['confidence']:.2f}) "
+                       f"in case you meant that")
+
+    def _process_compound(self, intents: List[Intent], use_cache: bool = True):
+        """Run the plugins for a multi-part request concurrently, printing results in order"""
+        safe_print(f"[AI] I understand {len(intents)} requests:")
+        for i, intent in enumerate(intents, 1):
+            safe_print(f"  {i}. {intent.plugin_name} (confidence: {intent.confidence:.2f}) - {intent.raw_text}")
+        
+        calls = [PluginCall(intent.plugin_name, self._prepare_plugin_args(intent), use_cache)
+                 for intent in intents]
+        ordered = OrderedOutput(current_output(), len(calls))
+        streams = [ordered.slot(i) for i in range(len(calls))]
+        
+        for call, stream in zip(calls, streams):
+            stream.write(f"[EXEC] Executing: {' '.join(['sarah', call.plugin_name] + call.args)}\n")
+            stream.write("[RESULT]\n")
+        
+        def on_complete(index: int, result: ExecutionResult):
+            warning = self._describe_result(result)
+            if warning:
+                streams[index].write(warning + "\n")
+            ordered.finish(index)
+        
+        try:
+            results = self._get_executor().execute_many(calls, streams, on_complete)
+        except KeyboardInterrupt:
+            safe_print("\n[INFO] Cancelled")
+            return
+        
+        for intent, result in zip(intents, results):
+            self._record_turn(intent, result)
+
+    def _record_turn(self, intent: Intent, result: Optional[ExecutionResult]):
+        """Add an executed intent to the conversation history"""
+        if self.prefetcher and result is not None:
+            self.prefetcher.record_result(result)
+        
+        if not self.conversation_manager:
+            return
+        
+        success = result is not None and result.success
+        plugin_response = "Command executed successfully" if success else "Command failed"
+        record = result.record if result is not None else None
+        if record is not None:
+            # The structured result stands in for the captured text
+            plugin_response = record.describe()
+        elif result is not None and result.output:
+            plugin_response = result.output
+        self.conversation_manager.add_turn(
+            intent.raw_text, intent.plugin_name, intent.confidence,
+            intent.entities, plugin_response, success,
+            record.to_dict() if record is not None else None,
+            session=self._session(), embedding=intent.embedding
+        )
+
+    def _execute_plugin(self, intent: Intent, use_cache: bool = True) -> Optional[ExecutionResult]:
         """Execute the appropriate Sarah plugin based on intent"""
         try:
             # Prepare arguments for the plugin
             plugin_args = self._prepare_plugin_args(intent)
             
-            # Build sarah command
-            sarah_cmd = ['sarah', intent.plugin_name] + plugin_args
+            return self._run_plugin(intent.plugin_name, plugin_args, use_cache)
             
-            safe_print(f"[EXEC] Executing: {' '.join(sarah_cmd)}")
-            
-            # Execute the plugin
-            result = subprocess.run(
-                sarah_cmd,
-                capture_output=True,
-                text=True,
-                timeout=30  # 30 second timeout
-            )
-            
-            if result.stdout:
-                safe_print("[RESULT]")
-                safe_print(result.stdout)
-            
-            if result.stderr and result.returncode != 0:
-                safe_print(f"[WARNING] Error: {result.stderr}")
-                return False
-            
-            return result.returncode == 0
-            
-        except subprocess.TimeoutExpired:
-            safe_print("[ERROR] Command timed out")
-            return False
         except Exception as e:
             safe_print(f"[ERROR] Failed to execute plugin: {e}")
-            return False
+            return None
+
+    def _get_executor(self):
+        """Get the plugin executor, bound to the Sarah.Core that loaded us"""
+        if self.executor is None:
+            self.executor = create_plugin_executor(
+                self.object,
+                self.config.get('plugins', {}),
+                self._get_result_cache(),
+                create_circuit_breakers(self.config.get('circuit_breaker', {})),
+                self._is_side_effect_free
+            )
+        return self.executor
+
+    def _is_side_effect_free(self, plugin_name: str) -> bool:
+        """Check whether a plugin only looks things up; unknown before the AI core is up"""
+        return bool(self.ai_core and self.ai_core.is_side_effect_free(plugin_name))
+
+    def _get_result_cache(self):
+        """Get the plugin result cache, or None if caching is disabled"""
+        cache_config = self.config.get('cache', {})
+        if self.result_cache is None and cache_config.get('enabled', True):
+            self.result_cache = create_result_cache(cache_config)
+        return self.result_cache
+
+    def _run_plugin(self, plugin_name: str, args: List[str], use_cache: bool = True) -> ExecutionResult:
+        """Run a plugin, relaying its output to the current output stream"""
+        safe_print(f"[EXEC] Executing: {' '.join(['sarah', plugin_name] + args)}")
+        safe_print("[RESULT]")
+
+        try:
+            result = self._get_executor().execute(plugin_name, args, current_output(), use_cache)
+        except KeyboardInterrupt:
+            # Running isolated plugins have already been killed by the executor
+            safe_print("\n[INFO] Cancelled")
+            return ExecutionResult(plugin_name, args, False, "", error="Cancelled")
+
+        warning = self._describe_result(result)
+        if warning:
+            safe_print(warning)
+
+        return result
+
+    def _describe_result(self, result: ExecutionResult) -> Optional[str]:
+        """Get the warning to show for a failed plugin run, or the note for a stale result"""
+        if result.stale:
+            return "[INFO] This is the last known result; refreshing it in the background."
+        if not result.error:
+            return None
+        if not result.in_process:
+            # stderr of isolated plugins has already been relayed
+            return f"[WARNING] Plugin {result.plugin_name} failed: {result.error.splitlines()[-1]}"
+        return f"[WARNING] Error: {result.error}"
 
     def _prepare_plugin_args(self, intent: Intent) -> List[str]:
         """Prepare arguments for the plugin based on extracted entities"""
@@ -225,7 +850,7 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
         
         return args
 
-    def _fallback_processing(self, user_input: str):
+    def _fallback_processing(self, user_input: str, use_cache: bool = True):
         """Fallback processing when AI is not available"""
         safe_print("[INFO] Using basic keyword matching...")
         
@@ -260,14 +885,7 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
             
             # Execute the plugin
             try:
-                sarah_cmd = ['sarah', best_match] + args
-                result = subprocess.run(sarah_cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.stdout:
-                    safe_print("[RESULT]")
-                    safe_print(result.stdout)
-                if result.stderr and result.returncode != 0:
-                    safe_print(f"[WARNING] Error: {result.stderr}")
+                self._run_plugin(best_match, args, use_cache)
                     
             except Exception as e:
                 safe_print(f"[ERROR] Error executing {best_match}: {e}")
@@ -286,6 +904,68 @@ class AIAgentPlugin(GObject.Object, Sarah.IExtension):
         
         safe_print("\n[INFO] Try rephrasing your request or be more specific.")
 
+    def _show_history(self, args: List[str]):
+        """Show the stored conversation turns of the last hours"""
+        if not self.conversation_manager:
+            safe_print("[ERROR] Conversation history is not available")
+            return
+        
+        if args and args[0].lower() == 'search':
+            self._search_history(args[1:])
+            return
+        
+        try:
+            hours = float(args[0]) if args else 24
+        except ValueError:
+            safe_print("[ERROR] Usage: sarah ai_agent history [hours]")
+            return
+        
+        turns = self.conversation_manager.get_turns_between(datetime.now() - timedelta(hours=hours))
+        if not turns:
+            safe_print(f"[INFO] No conversation in the last {hours:g} hours")
+            return
+        
+        for item in reversed(turns):
+            turn = item['turn']
+            safe_print(f"[{turn.timestamp:%Y-%m-%d %H:%M}] You: {turn.user_input}")
+            safe_print(f"{'':18} {turn.intent_plugin}: {turn.sarah_response}")
+    
+    def _search_history(self, args: List[str]):
+        """Show the past turns most similar in meaning to a query"""
+        parser = argparse.ArgumentParser(prog='sarah ai_agent history search', add_help=False)
+        parser.add_argument('query', nargs='+')
+        parser.add_argument('--plugin')
+        parser.add_argument('--days', type=float)
+        parser.add_argument('--k', type=int)
+        try:
+            options = parser.parse_args(args)
+        except SystemExit:
+            safe_print("[ERROR] Usage: sarah ai_agent history search <text> [--plugin P] [--days N] [--k K]")
+            return
+        
+        if self.conversation_manager.index is None:
+            safe_print("[ERROR] The history index is disabled")
+            return
+        
+        query = ' '.join(options.query)
+        embedding = self.ai_core.embed(query) if self.ai_core else None
+        if embedding is None:
+            safe_print("[ERROR] Searching history needs the sentence model")
+            return
+        
+        index_config = self.config.get('conversation', {}).get('history_index', {})
+        start = datetime.now() - timedelta(days=options.days) if options.days else None
+        results = self.conversation_manager.search_history(
+            embedding, options.k or index_config.get('results', 5), start, plugin=options.plugin
+        )
+        if not results:
+            safe_print(f"[INFO] Nothing in the conversation history resembles '{query}'")
+            return
+        
+        for item in results:
+            safe_print(f"[{item['timestamp']:%Y-%m-%d %H:%M}] ({item['similarity']:.2f}) You: {item['user_input']}")
+            safe_print(f"{'':25} {item['plugin']}: {item['sarah_response']}")
+    
     def _show_help(self):
         """Show help information"""
         safe_print("""
@@ -312,6 +992,22 @@ FEATURES:
 COMMANDS:
   help     - Show this help message
   status   - Show AI system status
+  history [hours]
+           - Show the conversation turns of the last 24 (or given) hours
+  history search <text> [--plugin P] [--days N] [--k K]
+           - Show the past turns closest in meaning to the text
+
+OPTIONS:
+  --no-cache   - Run plugins even if a cached result is still fresh
+
+BATCH:
+  --batch <file|-> [--execute] [--output file] [--chunk-size N]
+               - Classify JSONL utterances, optionally running the plugins
+
+DAEMON:
+  --serve      - Run the warm agent daemon in the foreground
+  --stop       - Stop the running agent daemon
+  --no-daemon  - Handle this request without the daemon
 
 AVAILABLE PLUGINS:
 """)
@@ -340,35 +1036,106 @@ AVAILABLE PLUGINS:
     def _show_status(self):
         """Show AI system status"""
         safe_print("[AI AGENT] Sarah AI Agent Status:")
+        safe_print(f"  • Daemon: {'SERVING' if self.serving else 'NOT_USED'}")
         safe_print(f"  • AI Core: {'ACTIVE' if self.initialized and self.ai_core else 'INACTIVE'}")
         safe_print(f"  • Conversation: {'ACTIVE' if self.conversation_manager else 'INACTIVE'}")
         
         if self.ai_core:
             try:
                 # Test AI components
+                if self.ai_core.models_loading:
+                    safe_print(f"  • Models: LOADING ({self.ai_core.load_status})")
+                elif self.ai_core.models_unloaded:
+                    safe_print("  • Models: UNLOADED while idle (reloaded on next request)")
                 safe_print(f"  • NLP Model: {'LOADED' if self.ai_core.nlp else 'BASIC_MODE'}")
                 safe_print(f"  • Embeddings: {'READY' if self.ai_core.sentence_model else 'UNAVAILABLE'}")
             except:
                 safe_print("  • Models: ERROR_CHECKING_STATUS")
         
+        if self.ai_core:
+            self._show_resources(self.ai_core.governor.snapshot())
+        
+        if self.result_cache:
+            stats = self.result_cache.stats()
+            safe_print(f"  • Result Cache: {stats['entries']} entries, "
+                       f"{stats['hits']} hits ({stats['stale_hits']} stale) / {stats['misses']} misses")
+        
+        if self.prefetcher:
+            stats = self.prefetcher.stats()
+            safe_print(f"  • Prefetch: {stats['used']} of {stats['prefetched']} prefetched results used "
+                       f"({stats['hit_rate']:.0%} hit rate)")
+        
+        if self.llm_fallback and self.llm_fallback.available:
+            stats = self.llm_fallback.stats()
+            safe_print(f"  • LLM Fallback: {stats['requests']} requests ({stats['failures']} failed), "
+                       f"semantic cache {stats.get('cache_hits', 0)} hits / {stats.get('cache_misses', 0)} misses")
+        
+        if self.executor and self.executor.breakers:
+            for upstream, breaker in self.executor.breakers.snapshot().items():
+                safe_print(f"  • Upstream {upstream}: {breaker['state'].upper()} "
+                           f"({breaker['successes']} ok, {breaker['failures']} failed, "
+                           f"{breaker['rejected']} rejected)")
+        
         if self.conversation_manager:
-            summary = self.conversation_manager.get_conversation_summary()
+            summary = self.conversation_manager.get_conversation_summary(self._session())
             if summary.get('status') != 'no_active_conversation':
                 safe_print(f"  • Session: {summary.get('session_id', 'Unknown')}")
                 safe_print(f"  • Duration: {summary.get('duration', 'Unknown')}")
                 safe_print(f"  • Turns: {summary.get('total_turns', 0)}")
+            sessions = self.conversation_manager.conversation_history.stats()
+            safe_print(f"  • Sessions in memory: {sessions['sessions']} "
+                       f"({sessions['expired']} expired, {sessions['evicted']} evicted)")
+            totals = self.conversation_manager.stats.snapshot()
+            safe_print(f"  • All sessions: {totals['turns']} turns in {totals['sessions']} sessions since start")
+            for plugin, count, success_rate in totals['top_plugins']:
+                rate = f", {success_rate:.0%} successful" if success_rate is not None else ""
+                safe_print(f"    - {plugin}: {count} uses{rate}")
+            if totals['preferred_location']:
+                safe_print(f"  • Preferred location: {totals['preferred_location']}")
+            if totals['recent_topics']:
+                safe_print(f"  • Recent topics: {', '.join(totals['recent_topics'][:8])}")
+            writer = self.conversation_manager.writer_stats()
+            if writer:
+                safe_print(f"  • History writes: {writer['written']} saved in {writer['batches']} batches, "
+                           f"{writer['pending']} pending ({writer['stalls']} waits on a full queue)")
+            if self.conversation_manager.index is not None:
+                safe_print(f"  • Turns indexed for search: {len(self.conversation_manager.index)}")
+
+    def _show_resources(self, resources: Dict[str, Any]):
+        """Show memory use over time and the inference thread settings"""
+        def megabytes(size):
+            return f"{size / 2**20:.0f} MB" if size else "unknown"
+        
+        safe_print(f"  • Memory: {megabytes(resources['rss_bytes'])} RSS "
+                   f"(peak {megabytes(resources['peak_rss_bytes'])}, models unloaded {resources['unloads']}x)")
+        
+        history = resources['rss_history'][-8:]
+        if len(history) > 1:
+            now = time.time()
+            samples = ", ".join(f"{(now - sampled_at) / 60:.0f}m ago {megabytes(rss)}"
+                                for sampled_at, rss in history)
+            safe_print(f"  • Memory over time: {samples}")
+        
+        affinity = resources['cpu_affinity']
+        safe_print(f"  • Threads: {resources['intra_op_threads']} intra-op, "
+                   f"{resources['interop_threads']} inter-op, "
+                   f"CPUs {','.join(map(str, affinity)) if affinity else 'any'}, "
+                   f"encoder batch {resources['encoder_batch_size']}")
 
     def do_deactivate(self):
         """Cleanup when plugin is deactivated"""
+        if self.prefetcher:
+            self.prefetcher.stop()
+        
+        if self.ai_core:
+            self.ai_core.governor.stop()
+        
+        # Turns are saved as they happen; only the writer's last batch can be pending
         if self.conversation_manager:
-            try:
-                # Save conversation history
-                history_path = os.path.expanduser('~/.sarah/conversation_history.json')
-                os.makedirs(os.path.dirname(history_path), exist_ok=True)
-                self.conversation_manager.save_conversation_history(history_path)
-                logger.info("Conversation history saved")
-            except Exception as e:
-                logger.warning(f"Failed to save conversation history: {e}")
+            self.conversation_manager.stop_sweeper()
+            self.conversation_manager.stop_writer()
+            if self.conversation_manager.store:
+                self.conversation_manager.store.close()
 
 
 def main():
@@ -380,33 +1147,62 @@ def main():
     
     # Create AI agent
     agent = AIAgentPlugin()
-    
-    if len(sys.argv) > 1:
-        # Process command line arguments
-        args = sys.argv[1:]
-        agent.do_activate(args, len(args))
-    else:
-        # Interactive mode
-        safe_print("[AI AGENT] Sarah AI Agent - Interactive Mode")
-        safe_print("Type 'quit' to exit, 'help' for help")
-        
-        while True:
-            try:
-                user_input = input("\nYou: ").strip()
-                
-                if user_input.lower() in ['quit', 'exit', 'bye']:
-                    safe_print("Goodbye!")
-                    break
-                
-                if user_input:
-                    args = user_input.split()
-                    agent.do_activate(args, len(args))
+
+    # Stop the background threads and save pending history however this exits
+    try:
+        if len(sys.argv) > 1:
+            # Process command line arguments
+            args = sys.argv[1:]
+            agent.do_activate(args, len(args))
+        else:
+            # The REPL keeps its own models warm, so it talks to the agent
+            # directly; they load in the background so the prompt shows at once
+            agent._ensure_initialized(background_models=True)
+            agent._start_history_writer()
+            agent._start_prefetcher()
+            agent._start_governor()
+            completer = agent._create_completer()
+            if completer:
+                completer.install("You: ")
+
+            # Interactive mode
+            safe_print("[AI AGENT] Sarah AI Agent - Interactive Mode")
+            safe_print("Type 'quit' to exit, 'help' for help")
+            
+            models_announced = False
+            while True:
+                try:
+                    # Status line while models load, and a note once they are ready
+                    core = agent.ai_core
+                    if core and core.models_loading:
+                        safe_print(f"\n[AI] Loading language models: {core.load_status}... "
+                                   f"(basic keyword matching until ready)")
+                    elif core and core.models_loaded.is_set() and not models_announced:
+                        models_announced = True
+                        safe_print(f"\n[AI] Language models: {core.load_status}")
                     
-            except KeyboardInterrupt:
-                safe_print("\nGoodbye!")
-                break
-            except Exception as e:
-                safe_print(f"[ERROR] Error: {e}")
+                    user_input = input("\nYou: ").strip()
+                    
+                    if user_input.lower() in ['quit', 'exit', 'bye']:
+                        safe_print("Goodbye!")
+                        break
+                    
+                    if user_input:
+                        if completer:
+                            completer.record(user_input)
+                        args = user_input.split()
+                        agent.handle_command(args)
+                        
+                except KeyboardInterrupt:
+                    safe_print("\nGoodbye!")
+                    break
+                except Exception as e:
+                    safe_print(f"[ERROR] Error: {e}")
+            
+            if completer:
+                completer.close()
+    finally:
+        agent.do_deactivate()
 
 
 if __name__ == "__main__":
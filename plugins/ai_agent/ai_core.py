@@ -10,15 +10,24 @@ and mapping it to appropriate actions and plugins.
 import re
 import json
 import os
+import functools
+import threading
 from typing import Dict, List, Tuple, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
 
-# NLP libraries
-import spacy
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+# NLP libraries; spaCy, sentence-transformers and scikit-learn take seconds
+# to import, so they are imported by load_models() rather than here
 import numpy as np
+spacy = None
+SentenceTransformer = None
+cosine_similarity = None
+
+try:
+    from .resource_governor import create_resource_governor
+except ImportError:
+    # Fallback for direct execution
+    from resource_governor import create_resource_governor
 
 # Configuration
 from dotenv import load_dotenv
@@ -28,6 +37,34 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _import_nlp_libraries() -> None:
+    """Import the NLP libraries on first use"""
+    global spacy, SentenceTransformer, cosine_similarity
+    if cosine_similarity is not None:
+        return
+    
+    import spacy as spacy_module
+    from sentence_transformers import SentenceTransformer as sentence_transformer_class
+    from sklearn.metrics.pairwise import cosine_similarity as cosine_similarity_function
+    
+    spacy = spacy_module
+    SentenceTransformer = sentence_transformer_class
+    cosine_similarity = cosine_similarity_function
+
+
+def _uses_models(method):
+    """Keep the models loaded while a method runs, reloading them first if they were unloaded"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.governor.in_use():
+            self._ensure_models()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Separators that may join several requests in one input
+CLAUSE_SEPARATOR = re.compile(r'\s*;\s*|,?\s+(?:and then|and also|and|then|also)\s+', re.IGNORECASE)
+
 
 @dataclass
 class Intent:
@@ -36,6 +73,8 @@ class Intent:
     confidence: float
     entities: Dict[str, Any]
     raw_text: str
+    alternatives: List[Dict[str, Any]] = field(default_factory=list)  # Next best plugins
+    embedding: Optional[Any] = field(default=None, repr=False, compare=False)  # Sentence embedding of the input
 
 
 @dataclass
@@ -46,6 +85,7 @@ class PluginInfo:
     examples: List[str]
     keywords: List[str]
     parameters: List[str]
+    side_effect_free: bool = False  # Safe to run speculatively (no browser, no state changes)
 
 
 class SarahAICore:
@@ -53,18 +93,88 @@ class SarahAICore:
     Core AI system for Sarah that handles natural language understanding
     """
     
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, load_models: bool = True):
         self.config = self._load_config(config_path)
         self.nlp = None
         self.sentence_model = None
         self.plugin_embeddings = {}
+        self.plugin_names = []
+        self.plugin_matrix = None
         self.plugins_info = {}
+        self.load_status = "not loaded"
+        self.models_loaded = threading.Event()
+        self.models_unloaded = False
+        self._reload_lock = threading.Lock()
         
-        # Initialize NLP models
-        self._initialize_models()
+        # Thread limits, encoder batch cap and idle unloading
+        self.governor = create_resource_governor(self.config.get('resources', {}), self._unload_models)
         
         # Load plugin information
         self._load_plugin_definitions()
+        
+        # Initialize NLP models
+        if load_models:
+            self.load_models()
+    
+    @property
+    def models_loading(self) -> bool:
+        """True while models are being loaded in the background"""
+        return self.load_status != "not loaded" and not self.models_loaded.is_set()
+    
+    def load_models(self):
+        """
+        Load the NLP models and create plugin embeddings
+        
+        Until this has finished, understanding falls back to keyword
+        matching. Each model is published only once it is fully usable, so
+        this can run on a background thread while inputs are processed.
+        """
+        try:
+            self.load_status = "importing NLP libraries"
+            self.governor.limit_threads()
+            _import_nlp_libraries()
+            self.governor.limit_threads()
+            self._initialize_models()
+            self.load_status = "ready" if self.sentence_model else "keyword matching only"
+        except Exception as e:
+            logger.error(f"Failed to load NLP models: {e}")
+            self.load_status = "unavailable"
+        finally:
+            self.models_loaded.set()
+    
+    def load_models_in_background(self) -> threading.Thread:
+        """Start loading the NLP models on a daemon thread"""
+        self.load_status = "starting"
+        thread = threading.Thread(target=self.load_models, name="ai-core-model-loader", daemon=True)
+        thread.start()
+        return thread
+    
+    def _unload_models(self) -> bool:
+        """
+        Drop the loaded models to free their memory (called by the governor when idle)
+        
+        The plugin embeddings are small and kept. The models are loaded again
+        by the next request that needs them.
+        """
+        if not self.models_loaded.is_set() or (self.nlp is None and self.sentence_model is None):
+            return False
+        
+        self.nlp = None
+        self.sentence_model = None
+        self.models_unloaded = True
+        self.load_status = "unloaded while idle"
+        return True
+    
+    def _ensure_models(self):
+        """Load the models again if they were unloaded while idle"""
+        if not self.models_unloaded:
+            return
+        
+        with self._reload_lock:
+            if self.models_unloaded:
+                logger.info("Reloading NLP models after idle unload")
+                self.load_models()
+                self.models_unloaded = False
     
     def _load_config(self, config_path: str) -> Dict:
         """Load AI configuration"""
@@ -74,13 +184,16 @@ class SarahAICore:
             "confidence_threshold": 0.6,
             "max_suggestions": 3,
             "enable_conversation": True,
-            "conversation_context_length": 5
+            "conversation_context_length": 5,
+            "compound_min_confidence": 0.4
         }
         
         if config_path and os.path.exists(config_path):
             with open(config_path, 'r') as f:
                 user_config = json.load(f)
                 default_config.update(user_config)
+                # Settings from the "ai_core" section apply to the core directly
+                default_config.update(user_config.get('ai_core', {}))
         
         return default_config
     
@@ -88,6 +201,7 @@ class SarahAICore:
         """Initialize NLP models"""
         try:
             # Load spaCy model for NER and linguistic analysis
+            self.load_status = f"loading {self.config['spacy_model']}"
             self.nlp = spacy.load(self.config["spacy_model"])
             logger.info(f"Loaded spaCy model: {self.config['spacy_model']}")
         except OSError:
@@ -96,14 +210,21 @@ class SarahAICore:
         
         try:
             # Load sentence transformer for semantic similarity
-            self.sentence_model = SentenceTransformer(self.config["sentence_model"])
+            self.load_status = f"loading {self.config['sentence_model']}"
+            sentence_model = SentenceTransformer(self.config["sentence_model"])
+            self.governor.configure_encoder(sentence_model)
             logger.info(f"Loaded sentence model: {self.config['sentence_model']}")
         except Exception as e:
             logger.error(f"Failed to load sentence model: {e}")
-            self.sentence_model = None
+            return
+        
+        # Create embeddings for plugin matching, then switch over to the model
+        self.load_status = "encoding plugins"
+        self._create_plugin_embeddings(sentence_model)
+        self.sentence_model = sentence_model
     
     def _load_plugin_definitions(self):
-        """Load plugin definitions and create embeddings"""
+        """Load plugin definitions"""
         # Define Sarah's built-in plugins with natural language descriptions
         self.plugins_info = {
             "weather": PluginInfo(
@@ -116,7 +237,8 @@ class SarahAICore:
                     "weather forecast for London"
                 ],
                 keywords=["weather", "temperature", "rain", "snow", "forecast", "climate"],
-                parameters=["location"]
+                parameters=["location"],
+                side_effect_free=True
             ),
             "time": PluginInfo(
                 name="time",
@@ -140,7 +262,8 @@ class SarahAICore:
                     "wiki information about Paris"
                 ],
                 keywords=["wiki", "wikipedia", "information", "about", "tell me", "search"],
-                parameters=["topic", "query"]
+                parameters=["topic", "query"],
+                side_effect_free=True
             ),
             "google": PluginInfo(
                 name="google",
@@ -188,7 +311,8 @@ class SarahAICore:
                     "whois domain.com"
                 ],
                 keywords=["who", "whois", "about", "information", "person", "biography"],
-                parameters=["person", "domain", "entity"]
+                parameters=["person", "domain", "entity"],
+                side_effect_free=True
             ),
             "watch": PluginInfo(
                 name="watch",
@@ -200,7 +324,8 @@ class SarahAICore:
                     "IMDB info for The Matrix"
                 ],
                 keywords=["movie", "film", "tv show", "series", "imdb", "watch", "cinema"],
-                parameters=["title", "movie_name", "show_name"]
+                parameters=["title", "movie_name", "show_name"],
+                side_effect_free=True
             ),
             "speedtest": PluginInfo(
                 name="speedtest",
@@ -224,7 +349,8 @@ class SarahAICore:
                     "Islamic prayer schedule"
                 ],
                 keywords=["prayer", "adhan", "islamic", "fajr", "dhuhr", "asr", "maghrib", "isha"],
-                parameters=["city", "country"]
+                parameters=["city", "country"],
+                side_effect_free=True
             ),
             "hi": PluginInfo(
                 name="hi",
@@ -251,16 +377,10 @@ class SarahAICore:
                 parameters=["symbol", "stock_name", "country", "security_type"]
             )
         }
-        
-        # Create embeddings for plugin matching
-        self._create_plugin_embeddings()
     
-    def _create_plugin_embeddings(self):
+    def _create_plugin_embeddings(self, sentence_model):
         """Create embeddings for all plugins to enable semantic matching"""
-        if not self.sentence_model:
-            logger.warning("No sentence model available for embeddings")
-            return
-        
+        plugin_embeddings = {}
         for plugin_name, plugin_info in self.plugins_info.items():
             # Combine description, examples, and keywords for embedding
             text_content = []
@@ -270,11 +390,17 @@ class SarahAICore:
             
             # Create embedding for this plugin
             combined_text = " ".join(text_content)
-            embedding = self.sentence_model.encode([combined_text])[0]
-            self.plugin_embeddings[plugin_name] = embedding
+            embedding = sentence_model.encode([combined_text])[0]
+            plugin_embeddings[plugin_name] = embedding
+        
+        # Stack embeddings so a batch of inputs is scored in one call
+        self.plugin_names = list(plugin_embeddings)
+        self.plugin_matrix = np.vstack([plugin_embeddings[name] for name in self.plugin_names])
+        self.plugin_embeddings = plugin_embeddings
         
         logger.info(f"Created embeddings for {len(self.plugin_embeddings)} plugins")
     
+    @_uses_models
     def understand_input(self, user_input: str) -> Intent:
         """
         Main method to understand user input and return intent
@@ -299,11 +425,76 @@ class SarahAICore:
             plugin_name=plugin_match['plugin'],
             confidence=plugin_match['confidence'],
             entities=entities,
-            raw_text=user_input
+            raw_text=user_input,
+            alternatives=plugin_match.get('alternatives', []),
+            embedding=plugin_match.get('embedding')
         )
         
         return intent
     
+    @_uses_models
+    def understand_inputs(self, user_inputs: List[str]) -> List[Intent]:
+        """
+        Understand several inputs at once
+        
+        All inputs are encoded in a single batched sentence model call and
+        parsed with spaCy's pipe, which is much cheaper than calling
+        understand_input once per input.
+        
+        Args:
+            user_inputs: Raw user input strings
+            
+        Returns:
+            Intent objects in the same order as the inputs
+        """
+        if not user_inputs:
+            return []
+        
+        cleaned_inputs = [self._clean_input(text) for text in user_inputs]
+        entities = self._extract_entities_batch(cleaned_inputs)
+        matches = self._find_best_plugin_matches(cleaned_inputs)
+        
+        return [
+            Intent(
+                plugin_name=match['plugin'],
+                confidence=match['confidence'],
+                entities=entity,
+                raw_text=raw_text,
+                alternatives=match.get('alternatives', []),
+                embedding=match.get('embedding')
+            )
+            for raw_text, entity, match in zip(user_inputs, entities, matches)
+        ]
+    
+    @_uses_models
+    def understand_compound(self, user_input: str) -> List[Intent]:
+        """
+        Understand input that may contain several requests
+        
+        "weather in London and prayer times in Cairo" is split into clauses
+        that are classified together. The split is only kept if every clause
+        is understood with at least `compound_min_confidence`; otherwise the
+        input is treated as a single request, so titles like "Tom and Jerry"
+        stay intact.
+        
+        Returns:
+            One intent per clause, in the order they appear in the input
+        """
+        clauses = self.split_clauses(user_input)
+        if len(clauses) < 2:
+            return [self.understand_input(user_input)]
+        
+        intents = self.understand_inputs(clauses)
+        if min(intent.confidence for intent in intents) < self.config['compound_min_confidence']:
+            return [self.understand_input(user_input)]
+        
+        return intents
+    
+    def split_clauses(self, user_input: str) -> List[str]:
+        """Split input on conjunctions and separators into candidate clauses"""
+        clauses = [clause.strip(' ,.') for clause in CLAUSE_SEPARATOR.split(user_input)]
+        return [clause for clause in clauses if clause]
+    
     def _clean_input(self, text: str) -> str:
         """Clean and normalize user input"""
         # Remove extra whitespace
@@ -314,33 +505,48 @@ class SarahAICore:
     
     def _extract_entities(self, text: str) -> Dict[str, Any]:
         """Extract named entities and important information from text"""
-        entities = {}
+        if self.nlp:
+            return self._entities_from_doc(self.nlp(text))
         
+        return self._extract_keywords(text)
+    
+    def _extract_entities_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Extract entities for several texts, parsing them with spaCy's pipe"""
         if self.nlp:
-            doc = self.nlp(text)
-            
-            # Extract named entities
-            for ent in doc.ents:
-                entity_type = ent.label_.lower()
-                if entity_type in ['person', 'org', 'gpe', 'loc']:  # Focus on relevant entities
-                    entities[entity_type] = ent.text
-            
-            # Extract potential search terms (remaining content after removing stop words)
-            search_terms = []
-            for token in doc:
-                if not token.is_stop and not token.is_punct and len(token.text) > 2:
-                    search_terms.append(token.text)
-            
-            if search_terms:
-                entities['search_terms'] = search_terms
-        else:
-            # Fallback: simple keyword extraction
-            words = text.split()
-            # Remove common stop words
-            stop_words = {'the', 'is', 'at', 'which', 'on', 'a', 'an', 'and', 'or', 'but', 'in', 'with', 'to', 'for', 'of', 'as', 'by'}
-            search_terms = [word for word in words if word not in stop_words and len(word) > 2]
-            if search_terms:
-                entities['search_terms'] = search_terms
+            return [self._entities_from_doc(doc) for doc in self.nlp.pipe(texts)]
+        
+        return [self._extract_keywords(text) for text in texts]
+    
+    def _entities_from_doc(self, doc) -> Dict[str, Any]:
+        """Collect relevant named entities and search terms from a spaCy doc"""
+        entities = {}
+        
+        # Extract named entities
+        for ent in doc.ents:
+            entity_type = ent.label_.lower()
+            if entity_type in ['person', 'org', 'gpe', 'loc']:  # Focus on relevant entities
+                entities[entity_type] = ent.text
+        
+        # Extract potential search terms (remaining content after removing stop words)
+        search_terms = []
+        for token in doc:
+            if not token.is_stop and not token.is_punct and len(token.text) > 2:
+                search_terms.append(token.text)
+        
+        if search_terms:
+            entities['search_terms'] = search_terms
+        
+        return entities
+    
+    def _extract_keywords(self, text: str) -> Dict[str, Any]:
+        """Fallback: simple keyword extraction when spaCy is not available"""
+        entities = {}
+        words = text.split()
+        # Remove common stop words
+        stop_words = {'the', 'is', 'at', 'which', 'on', 'a', 'an', 'and', 'or', 'but', 'in', 'with', 'to', 'for', 'of', 'as', 'by'}
+        search_terms = [word for word in words if word not in stop_words and len(word) > 2]
+        if search_terms:
+            entities['search_terms'] = search_terms
         
         return entities
     
@@ -351,28 +557,36 @@ class SarahAICore:
             # Fallback to keyword matching
             return self._keyword_based_matching(text)
         
-        # Create embedding for user input
-        input_embedding = self.sentence_model.encode([text])[0]
+        return self._find_best_plugin_matches([text])[0]
+    
+    def _find_best_plugin_matches(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Find the best matching plugin for each text with one batched encoder call"""
         
-        best_match = {
-            'plugin': 'hi',  # Default fallback
-            'confidence': 0.0
-        }
+        if not self.sentence_model:
+            return [self._keyword_based_matching(text) for text in texts]
         
-        # Calculate similarity with all plugin embeddings
-        for plugin_name, plugin_embedding in self.plugin_embeddings.items():
-            similarity = cosine_similarity(
-                [input_embedding], 
-                [plugin_embedding]
-            )[0][0]
-            
-            if similarity > best_match['confidence']:
-                best_match = {
-                    'plugin': plugin_name,
-                    'confidence': float(similarity)
-                }
+        # Create embeddings for all inputs at once
+        input_embeddings = self.sentence_model.encode(texts, batch_size=self.governor.encoder_batch_size)
         
-        return best_match
+        # Similarity of every input with every plugin
+        similarities = cosine_similarity(input_embeddings, self.plugin_matrix)
+        
+        matches = []
+        for row, embedding in zip(similarities, input_embeddings):
+            ranked = np.argsort(row)[::-1]
+            best = int(ranked[0])
+            if row[best] > 0.0:
+                runner_up = int(ranked[1]) if len(ranked) > 1 else None
+                alternatives = []
+                if runner_up is not None and row[runner_up] > 0.0:
+                    alternatives.append({'plugin': self.plugin_names[runner_up],
+                                         'confidence': float(row[runner_up])})
+                matches.append({'plugin': self.plugin_names[best], 'confidence': float(row[best]),
+                                'alternatives': alternatives, 'embedding': embedding})
+            else:
+                matches.append({'plugin': 'hi', 'confidence': 0.0, 'embedding': embedding})  # Default fallback
+        
+        return matches
     
     def _keyword_based_matching(self, text: str) -> Dict[str, Any]:
         """Fallback keyword-based matching when no ML models available"""
@@ -398,6 +612,19 @@ class SarahAICore:
         
         return best_match
     
+    def is_side_effect_free(self, plugin_name: str) -> bool:
+        """Check whether a plugin only looks things up, so it can run speculatively"""
+        plugin_info = self.plugins_info.get(plugin_name)
+        return bool(plugin_info and plugin_info.side_effect_free)
+    
+    @_uses_models
+    def embed(self, text: str) -> Optional[Any]:
+        """Get the sentence embedding of a text, or None without a sentence model"""
+        if not self.sentence_model:
+            return None
+        return self.sentence_model.encode([self._clean_input(text)])[0]
+
+    @_uses_models
     def get_suggestions(self, user_input: str, max_suggestions: int = None) -> List[Dict]:
         """Get multiple plugin suggestions for ambiguous input"""
         if max_suggestions is None:
@@ -444,9 +671,9 @@ class SarahAICore:
         return f"I understood you want to use {intent.plugin_name} with confidence {intent.confidence:.2f}"
 
 
-def create_ai_core(config_path: str = None) -> SarahAICore:
+def create_ai_core(config_path: str = None, load_models: bool = True) -> SarahAICore:
     """Factory function to create AI core instance"""
-    return SarahAICore(config_path)
+    return SarahAICore(config_path, load_models)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Runner for Sarah AI Agent
+
+This module processes utterances in bulk, e.g. for replaying production
+utterance logs. Input is JSONL (one string, or one object with a "text",
+"input" or "user_input" field, per line) read from a file or stdin. It is
+streamed through the NLU in fixed-size chunks, optionally executed with
+bounded concurrency, and written out as one JSONL record per input, so memory
+use stays constant no matter how large the input is.
+
+Only side-effect-free plugins are executed unless side effects are allowed:
+replaying a log should not open a browser tab for every search in it.
+"""
+
+import json
+import math
+import time
+import asyncio
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+import logging
+
+try:
+    from .plugin_executor import NullOutput, PluginCall
+except ImportError:
+    # Fallback for direct execution
+    from plugin_executor import NullOutput, PluginCall
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ('text', 'input', 'user_input')
+
+
+class BatchRunner:
+    """
+    Streams JSONL utterances through batched NLU and optional plugin execution
+    """
+
+    def __init__(self, ai_core, executor=None, prepare_args: Callable = None,
+                 chunk_size: int = 64, min_confidence: float = 0.3,
+                 allow_side_effects: bool = False):
+        self.ai_core = ai_core
+        self.executor = executor
+        self.prepare_args = prepare_args or (lambda intent: intent.entities.get('search_terms', []))
+        self.chunk_size = max(1, chunk_size)
+        self.min_confidence = min_confidence
+        self.allow_side_effects = allow_side_effects
+
+    def run(self, source: TextIO, sink: TextIO, execute: bool = False) -> Dict[str, int]:
+        """
+        Process every record in `source`, writing one result record per input to `sink`
+
+        Args:
+            source: JSONL input stream
+            sink: JSONL output stream
+            execute: Also run the recognized plugins and record their output
+
+        Returns:
+            Counts of processed, executed, skipped and failed records
+        """
+        stats = {'processed': 0, 'executed': 0, 'skipped': 0, 'errors': 0}
+
+        records = self._read_records(source)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+
+            for result in self._process_chunk(chunk, execute):
+                sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+                stats['processed'] += 1
+                stats['executed'] += 'success' in result
+                stats['skipped'] += 'skipped' in result
+                stats['errors'] += 'error' in result
+            sink.flush()
+
+        return stats
+
+    def _read_records(self, source: TextIO) -> Iterator[Dict[str, Any]]:
+        """Lazily parse input lines into records holding the utterance text"""
+        for line_number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            record: Dict[str, Any] = {'line': line_number}
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                record['error'] = f"invalid JSON: {e}"
+                yield record
+                continue
+
+            if isinstance(data, str):
+                record['input'] = data
+            elif isinstance(data, dict):
+                if 'id' in data:
+                    record['id'] = data['id']
+                text = next((data[field] for field in TEXT_FIELDS if isinstance(data.get(field), str)), None)
+                if text is None:
+                    record['error'] = f"no text field (expected one of {', '.join(TEXT_FIELDS)})"
+                else:
+                    record['input'] = text
+            else:
+                record['error'] = "record must be a string or an object"
+
+            yield record
+
+    def _process_chunk(self, chunk: List[Dict[str, Any]], execute: bool) -> List[Dict[str, Any]]:
+        """Classify a chunk in one NLU call, then run its plugins if requested"""
+        valid = [record for record in chunk if 'error' not in record]
+
+        started = time.perf_counter()
+        intents = self.ai_core.understand_inputs([record['input'] for record in valid])
+        nlu_ms = (time.perf_counter() - started) * 1000 / max(1, len(valid))
+
+        for record, intent in zip(valid, intents):
+            record['intent'] = intent.plugin_name
+            record['confidence'] = round(intent.confidence, 4)
+            record['entities'] = intent.entities
+            record['timings'] = {'nlu_ms': round(nlu_ms, 3)}
+            record['_intent'] = intent
+
+        if execute and self.executor:
+            runnable = []
+            for record in valid:
+                intent = record['_intent']
+                if intent.confidence < self.min_confidence:
+                    continue
+                if self.allow_side_effects or self.ai_core.is_side_effect_free(intent.plugin_name):
+                    runnable.append(record)
+                else:
+                    record['skipped'] = "side effects"
+            self._execute(runnable)
+
+        for record in valid:
+            del record['_intent']
+            record['timings']['total_ms'] = round(sum(record['timings'].values()), 3)
+
+        return chunk
+
+    def _execute(self, records: List[Dict[str, Any]]) -> None:
+        """Run the plugins for a chunk with the executor's bounded concurrency"""
+        if not records:
+            return
+
+        calls = [PluginCall(record['_intent'].plugin_name, self.prepare_args(record['_intent']))
+                 for record in records]
+        streams = [NullOutput() for _ in calls]
+
+        # Each call keeps its own timeout, but a long batch has no overall deadline
+        results = asyncio.run(self.executor.run_many(calls, streams, deadline=math.inf))
+
+        for record, result in zip(records, results):
+            record['args'] = result.args
+            record['success'] = result.success
+            if result.record is not None:
+                # Structured data replaces the plugin's text
+                record['result'] = result.record.to_dict()
+            else:
+                record['output'] = result.output
+                if result.truncated:
+                    record['output_truncated'] = True
+            if result.error:
+                record['execution_error'] = result.error
+            record['timings']['execute_ms'] = round(result.duration * 1000, 3)
+
+
+def create_batch_runner(ai_core, executor=None, prepare_args: Callable = None,
+                        chunk_size: int = 64, min_confidence: float = 0.3,
+                        allow_side_effects: bool = False) -> BatchRunner:
+    """Factory function to create batch runner"""
+    return BatchRunner(ai_core, executor, prepare_args, chunk_size, min_confidence, allow_side_effects)
+
+
+if __name__ == "__main__":
+    # Classify JSONL from stdin without executing plugins
+    import sys
+
+    try:
+        from .ai_core import create_ai_core
+    except ImportError:
+        from ai_core import create_ai_core
+
+    runner = create_batch_runner(create_ai_core())
+    stats = runner.run(sys.stdin, sys.stdout)
+    print(json.dumps(stats), file=sys.stderr)
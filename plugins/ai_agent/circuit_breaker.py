@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Circuit Breakers for Sarah AI Agent
+
+Network plugins such as `weather` (wttr.in) or `adhan` (api.aladhan.com)
+block for their full timeout when their upstream service is slow or down.
+This module keeps one circuit breaker per upstream: after repeated failures
+or timeouts the breaker opens and calls fail fast, and once the reset timeout
+has passed a single trial call is let through to probe whether the upstream
+has recovered.
+"""
+
+import time
+import threading
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPSTREAMS: Dict[str, str] = {
+    "weather": "wttr.in",
+    "adhan": "api.aladhan.com",
+    "watch": "omdbapi.com",
+    "wiki": "wikipedia.org"
+}
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one upstream service
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a call may go to the upstream now"""
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_started = None
+
+            if self.state == self.HALF_OPEN:
+                # One trial at a time; a trial that never reported back (e.g.
+                # cancelled) is given up on after another reset timeout
+                if self._trial_started is None or now - self._trial_started >= self.reset_timeout:
+                    self._trial_started = now
+                    return True
+
+            if self.state == self.CLOSED:
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Upstream {self.name} recovered, closing circuit")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_started = None
+            self.successes += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.failures += 1
+            self._trial_started = None
+
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Upstream {self.name} is failing, opening circuit")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the breaker state and counters"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected
+            }
+
+
+class CircuitBreakers:
+    """
+    Maps plugins to the circuit breaker of the upstream they depend on
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.failure_threshold = config.get('failure_threshold', 3)
+        self.reset_timeout = config.get('reset_timeout', 60)
+        self.upstreams = dict(DEFAULT_UPSTREAMS)
+        self.upstreams.update(config.get('upstreams', {}))
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_plugin(self, plugin_name: str) -> Optional[CircuitBreaker]:
+        """Get the breaker guarding a plugin's upstream, or None if it has none"""
+        upstream = self.upstreams.get(plugin_name)
+        if not self.enabled or not upstream:
+            return None
+
+        with self._lock:
+            breaker = self._breakers.get(upstream)
+            if breaker is None:
+                breaker = CircuitBreaker(upstream, self.failure_threshold, self.reset_timeout)
+                self._breakers[upstream] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get the state of every breaker that has seen a call"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def create_circuit_breakers(config: Dict[str, Any] = None) -> CircuitBreakers:
+    """Factory function to create circuit breakers"""
+    return CircuitBreakers(config)
+
+
+if __name__ == "__main__":
+    # Trip and recover a breaker
+    breakers = create_circuit_breakers({'failure_threshold': 2, 'reset_timeout': 0.1})
+    breaker = breakers.for_plugin('weather')
+
+    for _ in range(2):
+        breaker.record_failure()
+    print("after failures:", breaker.state, "allowed:", breaker.allow())
+
+    time.sleep(0.1)
+    print("after reset timeout allowed:", breaker.allow(), breaker.state)
+    breaker.record_success()
+    print(breakers.snapshot())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Input Completion for Sarah AI Agent
+
+This module provides readline tab-completion for the interactive agent. The
+suggestions come from a prefix trie over plugin names, the example phrases
+of each plugin, and the user's own past inputs, ranked by how often they
+were used.
+
+Every trie node keeps its best few completions, so a lookup only walks the
+typed prefix and stays well under a millisecond however much history there
+is. Past inputs are stored front-coded (each line only holds what differs
+from the previous one) with new inputs appended to a log, which is folded
+into the base file once it grows.
+"""
+
+import os
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+STORE_HEADER = "# sarah completions v1\n"
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace; completion keys are matched case-insensitively"""
+    return ' '.join(text.split())
+
+
+class _Node:
+    """Trie node holding its children and the best completions below it"""
+    __slots__ = ('children', 'top', 'bucket')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.top: List[str] = []
+        self.bucket: Optional[set] = None
+
+
+class PrefixTrie:
+    """
+    Prefix trie with the top-k completions precomputed at every node
+
+    Nodes are only created down to `max_depth` characters; keys longer than
+    that are kept in a bucket on their deepest node, which is scanned for
+    prefixes that long.
+    """
+
+    def __init__(self, top_k: int = 8, max_depth: int = 24):
+        self.top_k = top_k
+        self.max_depth = max_depth
+        self.root = _Node()
+        self.weights: Dict[str, float] = {}
+        self.texts: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def add(self, text: str, weight: float = 1.0) -> None:
+        """Add a phrase, or raise the weight of one already present"""
+        text = normalize(text)
+        key = text.lower()
+        if not key:
+            return
+
+        self.weights[key] = self.weights.get(key, 0.0) + weight
+        self.texts[key] = text
+
+        node = self.root
+        self._promote(node, key)
+        for char in key[:self.max_depth]:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+            self._promote(node, key)
+
+        if len(key) > self.max_depth:
+            if node.bucket is None:
+                node.bucket = set()
+            node.bucket.add(key)
+
+    def add_many(self, items: Iterable[Tuple[str, float]]) -> None:
+        """Add many phrases at once, computing every node's top list in one pass afterwards"""
+        for text, weight in items:
+            text = normalize(text)
+            key = text.lower()
+            if not key:
+                continue
+
+            self.weights[key] = self.weights.get(key, 0.0) + weight
+            self.texts[key] = text
+
+            node = self.root
+            for char in key[:self.max_depth]:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                node = child
+
+            if len(key) > self.max_depth:
+                if node.bucket is None:
+                    node.bucket = set()
+                node.bucket.add(key)
+
+        self._rebuild_top(self.root, "")
+
+    def _rebuild_top(self, node: _Node, prefix: str) -> None:
+        """Recompute the top lists of a subtree from its children's"""
+        candidates = set(node.bucket or ())
+        if prefix in self.weights:
+            candidates.add(prefix)
+
+        for char, child in node.children.items():
+            self._rebuild_top(child, prefix + char)
+            candidates.update(child.top)
+
+        node.top = heapq.nlargest(self.top_k, candidates, key=self.weights.__getitem__)
+
+    def _promote(self, node: _Node, key: str) -> None:
+        """Place `key` in a node's top list if its weight earns it a spot"""
+        top = node.top
+        if key not in top:
+            if len(top) < self.top_k:
+                top.append(key)
+            elif self.weights[key] > self.weights[top[-1]]:
+                top[-1] = key
+            else:
+                return
+        top.sort(key=self.weights.__getitem__, reverse=True)
+
+    def complete(self, prefix: str, limit: int = None) -> List[str]:
+        """Get the highest weighted phrases starting with `prefix`"""
+        key = normalize(prefix).lower()
+        limit = limit or self.top_k
+
+        node = self.root
+        for char in key[:self.max_depth]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        if len(key) <= self.max_depth:
+            keys = node.top[:limit]
+        else:
+            matches = [candidate for candidate in (node.bucket or ()) if candidate.startswith(key)]
+            matches.sort(key=self.weights.__getitem__, reverse=True)
+            keys = matches[:limit]
+
+        return [self.texts[candidate] for candidate in keys]
+
+
+class InputCompleter:
+    """
+    Readline completer backed by a prefix trie and a persistent input history
+
+    The on-disk history is read by `load()`, typically on a background thread
+    via `load_in_background()`. Until it is done, completion uses the phrases
+    and inputs added so far, and those are carried over into the loaded trie.
+    """
+
+    def __init__(self, path: str = None, max_suggestions: int = 8,
+                 max_entries: int = 20000, compact_after: int = 500):
+        self.path = os.path.expanduser(path) if path else None
+        self.log_path = f"{self.path}.log" if self.path else None
+        self.max_suggestions = max_suggestions
+        self.max_entries = max_entries
+        self.compact_after = compact_after
+        self.trie = PrefixTrie(top_k=max_suggestions, max_depth=16)
+        self.history: Dict[str, Tuple[str, int]] = {}
+        self.prompt = ""
+        self.loaded = threading.Event()
+        self._phrases: List[Tuple[str, float]] = []
+        self._pending: Optional[List[str]] = None
+        self._log_lines = 0
+        self._matches: List[str] = []
+        self._lock = threading.Lock()
+
+    def add_phrases(self, phrases: Iterable[str], weight: float = 1.0) -> None:
+        """Add fixed phrases such as plugin names and examples (not persisted)"""
+        with self._lock:
+            for phrase in phrases:
+                self._phrases.append((phrase, weight))
+                self.trie.add(phrase, weight)
+
+    def record(self, user_input: str) -> None:
+        """Add one user input, appending it to the on-disk log"""
+        text = normalize(user_input)
+        if not text:
+            return
+
+        with self._lock:
+            self.trie.add(text)
+            _count(self.history, text, 1)
+            if self._pending is not None:
+                self._pending.append(text)
+
+            if not self.log_path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(text + "\n")
+                self._log_lines += 1
+            except OSError as e:
+                logger.warning(f"Failed to record completion history: {e}")
+                return
+
+        # Compacting before the history is loaded would drop it
+        if self._log_lines >= self.compact_after and self.loaded.is_set():
+            self.compact()
+
+    def complete(self, prefix: str) -> List[str]:
+        return self.trie.complete(prefix, self.max_suggestions)
+
+    def load(self) -> None:
+        """Read the front-coded base file and the append log, then switch to the trie built from them"""
+        history: Dict[str, Tuple[str, int]] = {}
+        if self.path:
+            self._read_base(history)
+
+        # The log already holds every input recorded so far; later ones are
+        # collected in _pending
+        with self._lock:
+            self._log_lines = self._read_log(history) if self.path else 0
+            self._pending = []
+
+        trie = PrefixTrie(top_k=self.max_suggestions, max_depth=self.trie.max_depth)
+        trie.add_many(history.values())
+
+        with self._lock:
+            for phrase, weight in self._phrases:
+                trie.add(phrase, weight)
+            for text in self._pending:
+                trie.add(text)
+                _count(history, text, 1)
+            self.trie, self.history, self._pending = trie, history, None
+
+        self.loaded.set()
+
+    def load_in_background(self) -> threading.Thread:
+        """Start loading the on-disk history on a daemon thread"""
+        thread = threading.Thread(target=self.load, name="completion-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def install(self, prompt: str = "") -> bool:
+        """
+        Use this completer for `input()` through readline
+
+        Returns:
+            False if readline is not available on this platform
+        """
+        try:
+            import readline
+        except ImportError:
+            return False
+
+        self.prompt = prompt
+        # Complete whole phrases rather than single words
+        readline.set_completer_delims('')
+        readline.set_completer(self._readline_complete)
+        readline.set_completion_display_matches_hook(self._display_matches)
+        if 'libedit' in (readline.__doc__ or ''):
+            readline.parse_and_bind('bind ^I rl_complete')
+        else:
+            readline.parse_and_bind('tab: complete')
+        return True
+
+    def _readline_complete(self, text: str, state: int) -> Optional[str]:
+        if state == 0:
+            self._matches = self.complete(text)
+        return self._matches[state] if state < len(self._matches) else None
+
+    def _display_matches(self, substitution: str, matches: List[str], longest: int) -> None:
+        """Show suggestions on their own lines, then redraw the prompt and input"""
+        import readline
+
+        print()
+        for match in matches:
+            print(f"  {match}")
+        print(self.prompt + readline.get_line_buffer(), end='', flush=True)
+
+    def compact(self) -> None:
+        """Fold the append log into the front-coded base file"""
+        if not self.path:
+            return
+
+        with self._lock:
+            entries = sorted(self.history.values(), key=lambda entry: entry[1], reverse=True)
+        entries = sorted(entries[:self.max_entries])
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(STORE_HEADER)
+                previous = ""
+                for text, count in entries:
+                    shared = len(os.path.commonprefix([previous, text]))
+                    f.write(f"{shared}\t{text[shared:]}\t{count}\n")
+                    previous = text
+            os.replace(tmp_path, self.path)
+            open(self.log_path, 'w').close()
+            self._log_lines = 0
+        except OSError as e:
+            logger.warning(f"Failed to compact completion history: {e}")
+
+    def close(self) -> None:
+        if self._log_lines and self.loaded.is_set():
+            self.compact()
+
+    def _read_base(self, history: Dict[str, Tuple[str, int]]) -> None:
+        """Read the front-coded base file into `history`"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                previous = ""
+                for line in f:
+                    if line.startswith('#'):
+                        continue
+                    shared, suffix, count = line.rstrip('\n').split('\t')
+                    text = previous[:int(shared)] + suffix
+                    _count(history, text, int(count))
+                    previous = text
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable completion history {self.path}: {e}")
+
+    def _read_log(self, history: Dict[str, Tuple[str, int]]) -> int:
+        """Read the append log into `history`, returning its number of entries"""
+        log_lines = 0
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        _count(history, normalize(line), 1)
+                        log_lines += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Ignoring unreadable completion log {self.log_path}: {e}")
+
+        return log_lines
+
+
+def _count(history: Dict[str, Tuple[str, int]], text: str, count: int) -> None:
+    """Add to the use count of an input, keeping its latest spelling"""
+    key = text.lower()
+    history[key] = (text, history.get(key, (text, 0))[1] + count)
+
+
+def create_input_completer(path: str = None, max_suggestions: int = 8,
+                           max_entries: int = 20000, compact_after: int = 500) -> InputCompleter:
+    """Factory function to create input completer"""
+    return InputCompleter(path, max_suggestions, max_entries, compact_after)
+
+
+if __name__ == "__main__":
+    # Time lookups over a large synthetic history (max_entries distinct inputs)
+    import time
+    import random
+
+    random.seed(7)
+    words = ["weather", "in", "london", "prayer", "times", "for", "cairo", "tell", "me", "about",
+             "python", "search", "youtube", "music", "stock", "price", "apple", "movie", "matrix"]
+
+    completer = create_input_completer()
+    completer.add_phrases(["weather", "wiki", "watch", "whois", "what's the weather like?"], 5)
+
+    started = time.perf_counter()
+    completer.trie.add_many((' '.join(random.choices(words, k=random.randint(2, 8))), 1)
+                            for _ in range(20000))
+    print(f"Built trie of {len(completer.trie)} phrases in {time.perf_counter() - started:.2f}s")
+
+    prefixes = ["w", "we", "weather in", "tell me about py", "search youtube music for stock price apple"]
+    for prefix in prefixes:
+        started = time.perf_counter()
+        for _ in range(1000):
+            matches = completer.complete(prefix)
+        elapsed_us = (time.perf_counter() - started) * 1000
+        print(f"{prefix!r}: {elapsed_us:.1f}us per lookup, top: {matches[:2]}")
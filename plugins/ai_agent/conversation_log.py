@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversation Log for Sarah AI Agent
+
+An append-only JSONL file holding the conversation history. Every change is
+one record appended with a single write, so a turn costs the same I/O however
+long the history is, and processes that each hold only their own sessions
+never overwrite one another's.
+
+Records are appended with O_APPEND under a shared lock and optionally
+fsync'ed. A record torn by a crash is skipped when reading, and the next
+append starts on a fresh line. Compaction rewrites the log to a temporary
+file that atomically replaces it, under an exclusive lock that keeps other
+processes from appending meanwhile.
+
+What the records mean is up to the ConversationManager; this module only
+stores them.
+"""
+
+import os
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; locking is skipped there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationLog:
+    """
+    Append-only record log with crash-safe appends and atomic compaction
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = os.path.expanduser(path)
+        self.lock_path = f"{self.path}.lock"
+        self.fsync = fsync
+        # Records in the file as far as this process knows, for compaction decisions
+        self.records = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record"""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Append records with a single write"""
+        data = ''.join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        if not data:
+            return
+
+        encoded = data.encode('utf-8')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._locked(exclusive=False):
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                # Don't let a record torn by an earlier crash swallow this one
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b"\n":
+                    encoded = b"\n" + encoded
+                os.write(fd, encoded)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self.records += data.count("\n")
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """Read every record, skipping any that are torn or corrupt"""
+        self.records = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Skipping corrupt record on line {number} of {self.path}")
+                        continue
+                    self.records += 1
+                    yield record
+        except FileNotFoundError:
+            return
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the log exclusively, e.g. to read it and then rewrite it"""
+        with self._locked(exclusive=True):
+            yield self
+
+    def rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Atomically replace the log with `records`
+
+        Call while holding `exclusive()` if the records were derived from
+        reading the log, so no append in between is lost.
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._fsync_directory()
+        self.records = len(records)
+
+    def _fsync_directory(self) -> None:
+        """Make the rename itself durable"""
+        try:
+            fd = os.open(os.path.dirname(self.path) or '.', os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def create_conversation_log(path: str = '~/.sarah/conversation_log.jsonl',
+                            fsync: bool = True) -> ConversationLog:
+    """Factory function to create conversation log"""
+    return ConversationLog(path, fsync)
+
+
+if __name__ == "__main__":
+    # Time appends to a log that already holds many records
+    import time
+    import tempfile
+
+    log = create_conversation_log(os.path.join(tempfile.mkdtemp(), 'log.jsonl'), fsync=False)
+    log.append_many({"type": "turn", "n": n, "user_input": "weather in london"} for n in range(100000))
+
+    started = time.perf_counter()
+    for n in range(1000):
+        log.append({"type": "turn", "n": n, "user_input": "weather in paris"})
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{elapsed_ms / 1000:.3f}ms per append to a {log.records}-record log")
@@ -4,16 +4,35 @@
 Conversation Manager for Sarah AI Agent
 
 This module manages conversation context, remembers previous interactions,
-and provides contextual responses.
+and provides contextual responses. With a ConversationLog attached, every
+new session and turn is appended to it as it happens, and the history is
+rebuilt from it on startup. With a SessionStore attached, only the latest
+session is read on startup, and it is resumed if it has not expired.
 """
 
+import sys
+import copy
 import json
 import time
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+import secrets
+import threading
+from typing import Dict, FrozenSet, List, Optional, Any
+from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 import logging
 
+try:
+    from .session_table import create_session_table
+    from .dialogue_acts import create_dialogue_act_classifier, GREETING, FAREWELL, FOLLOW_UP
+    from .conversation_stats import create_conversation_stats, SessionStats, RECENT_TURNS
+    from .history_writer import create_history_writer
+except ImportError:
+    # Fallback for direct execution
+    from session_table import create_session_table
+    from dialogue_acts import create_dialogue_act_classifier, GREETING, FAREWELL, FOLLOW_UP
+    from conversation_stats import create_conversation_stats, SessionStats, RECENT_TURNS
+    from history_writer import create_history_writer
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +46,97 @@ class ConversationTurn:
     entities: Dict[str, Any]
     sarah_response: str
     execution_successful: bool
+    result: Optional[Dict[str, Any]] = None  # Structured plugin result, if one was published
+
+
+# Entity key tuples shared by every turn with the same entity names
+_entity_keys: Dict[tuple, tuple] = {}
+
+
+class CompactTurn:
+    """
+    Memory-compact form of a ConversationTurn, as held in a session
+    
+    The timestamp is an epoch float, the plugin name is interned, and the
+    entities are a tuple of values against a key tuple shared by all turns
+    with the same entity names.
+    """
+    __slots__ = ('timestamp', 'user_input', 'plugin', 'confidence', 'entity_keys',
+                 'entity_values', 'sarah_response', 'successful', 'result')
+    
+    def __init__(self, turn: ConversationTurn):
+        self.timestamp = turn.timestamp.timestamp()
+        self.user_input = turn.user_input
+        self.plugin = sys.intern(turn.intent_plugin)
+        self.confidence = turn.intent_confidence
+        entities = turn.entities or {}
+        keys = tuple(entities)
+        self.entity_keys = _entity_keys.setdefault(keys, keys)
+        self.entity_values = tuple(entities.values())
+        self.sarah_response = turn.sarah_response
+        self.successful = bool(turn.execution_successful)
+        self.result = turn.result
+    
+    def entity(self, key: str, default: Any = None) -> Any:
+        """Get one entity without building the entities dict"""
+        try:
+            return self.entity_values[self.entity_keys.index(key)]
+        except ValueError:
+            return default
+    
+    def materialize(self) -> ConversationTurn:
+        return ConversationTurn(
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            user_input=self.user_input,
+            intent_plugin=self.plugin,
+            intent_confidence=self.confidence,
+            entities=dict(zip(self.entity_keys, self.entity_values)),
+            sarah_response=self.sarah_response,
+            execution_successful=self.successful,
+            result=self.result
+        )
+
+
+class TurnList:
+    """
+    The turns of a session, stored as CompactTurns
+    
+    Reads materialize ConversationTurns on demand, so they are copies:
+    changing one does not change the session. Slicing gives another
+    TurnList, and `compact` exposes the stored turns for reads that should
+    not materialize them.
+    """
+    __slots__ = ('compact',)
+    
+    def __init__(self, turns=()):
+        self.compact: List[CompactTurn] = [turn if isinstance(turn, CompactTurn) else CompactTurn(turn)
+                                           for turn in turns]
+    
+    def append(self, turn: ConversationTurn) -> None:
+        self.compact.append(turn if isinstance(turn, CompactTurn) else CompactTurn(turn))
+    
+    def extend(self, turns) -> None:
+        for turn in turns:
+            self.append(turn)
+    
+    def __len__(self) -> int:
+        return len(self.compact)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TurnList(self.compact[index])
+        return self.compact[index].materialize()
+    
+    def __iter__(self):
+        return (turn.materialize() for turn in self.compact)
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (TurnList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"TurnList({list(self)!r})"
 
 
 @dataclass
@@ -39,6 +149,17 @@ class ConversationContext:
     active_topic: Optional[str] = None
     user_preferences: Dict[str, Any] = None
     location_context: Optional[str] = None
+    # Held while the session is changed or read, so concurrent users don't interleave
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+    # Plugins and topics of the last few turns, kept up to date as turns are added
+    stats: SessionStats = field(default_factory=SessionStats, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Sessions are held in memory for as long as the agent runs
+        if not isinstance(self.turns, TurnList):
+            self.turns = TurnList(self.turns)
+        for turn in self.turns.compact[-RECENT_TURNS:]:
+            self.stats.add(turn.plugin, turn.entity('search_terms') or ())
     
 
 class ConversationManager:
@@ -46,11 +167,28 @@ class ConversationManager:
     Manages conversation flow, context, and provides intelligent responses
     """
     
-    def __init__(self, max_context_turns: int = 10, session_timeout_minutes: int = 30):
+    def __init__(self, max_context_turns: int = 10, session_timeout_minutes: int = 30,
+                 max_active_sessions: int = 0, dialogue_acts: Dict[str, List[str]] = None):
         self.max_context_turns = max_context_turns
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
         self.current_context: Optional[ConversationContext] = None
-        self.conversation_history: Dict[str, ConversationContext] = {}
+        # Sessions in order of last interaction, least recently used evicted past the cap
+        self.conversation_history = create_session_table(max_active_sessions)
+        self.log = None
+        self.store = None
+        self.index = None
+        # Saves log, store and index writes in the background once started
+        self.writer = None
+        self.retention = timedelta(days=30)
+        self.max_sessions = 500
+        self.compact_after = 1000
+        self._compact_threshold = 1000
+        self._log_lock = threading.Lock()
+        self._sweeper_stop = threading.Event()
+        # Cue phrases of greetings, farewells and follow-ups, matched in one pass
+        self.dialogue_acts = create_dialogue_act_classifier(dialogue_acts)
+        # Totals across sessions, updated by add_turn
+        self.stats = create_conversation_stats()
         
         # Conversation patterns for more natural responses
         self.greeting_responses = [
@@ -83,35 +221,91 @@ class ConversationManager:
             "No problem!"
         ]
     
-    def start_conversation(self, session_id: str = None) -> str:
-        """Start a new conversation session"""
+    def start_conversation(self, session_id: str = None, resume: bool = False) -> str:
+        """
+        Start a new conversation session and make it the current one
+        
+        For a single user; concurrent users each hold their own session
+        handle from new_session() or get_session() instead.
+        
+        Args:
+            session_id: Id for the new session
+            resume: Continue the most recent session instead, if it has not timed out
+        """
+        if resume and session_id is None:
+            latest = self.conversation_history.newest()
+            if latest is not None and not self._expired(latest):
+                self.current_context = latest
+                return self._get_contextual_greeting(latest)
+        
+        self.current_context = self.new_session(session_id)
+        return self._get_greeting_response()
+    
+    def new_session(self, session_id: str = None) -> ConversationContext:
+        """
+        Start a new conversation session
+        
+        Returns:
+            The session, which is the handle passed to add_turn and the other
+            per-session methods
+        """
         if session_id is None:
-            session_id = f"session_{int(time.time())}"
+            # Unique across threads and processes starting sessions in the same second
+            session_id = f"session_{int(time.time())}_{secrets.token_hex(4)}"
         
         now = datetime.now()
-        self.current_context = ConversationContext(
+        context = ConversationContext(
             session_id=session_id,
             started_at=now,
             last_interaction=now,
             turns=[],
-            user_preferences={}
+            # Carry preferences learned in earlier sessions forward
+            user_preferences=self.get_user_preferences()
         )
         
         # Store in history
-        self.conversation_history[session_id] = self.current_context
+        self.conversation_history[session_id] = context
+        self.stats.add_session()
+        if self.log:
+            record = self._context_to_dict(context)
+            record['type'] = 'session'
+            self._persist('log', record)
+        if self.store:
+            self._persist('session', self._snapshot(context))
         
         # Clean up old sessions
         self._cleanup_old_sessions()
         
-        return self._get_greeting_response()
+        return context
+    
+    def get_session(self, session_id: str) -> Optional[ConversationContext]:
+        """Get a session by id, from the session store if it is not in memory, unless it has timed out"""
+        context = self.conversation_history.get(session_id)
+        if context is None and self.store:
+            self.flush_history()
+            try:
+                context = self.store.get_session(session_id, self.max_context_turns)
+            except Exception as e:
+                logger.warning(f"Failed to read session store: {e}")
+        if context is None or self._expired(context):
+            return None
+        return self.conversation_history.setdefault(session_id, context)
     
     def add_turn(self, user_input: str, intent_plugin: str, intent_confidence: float, 
                  entities: Dict[str, Any], sarah_response: str, 
-                 execution_successful: bool = True) -> None:
-        """Add a conversation turn to the current context"""
+                 execution_successful: bool = True, result: Dict[str, Any] = None,
+                 session: ConversationContext = None, embedding=None) -> None:
+        """
+        Add a conversation turn to a session (by default the current one)
+        
+        `embedding` is the sentence embedding of the input, if one was
+        computed; with a history index attached the turn is indexed by it.
+        """
         
-        if not self.current_context:
+        context = session or self.current_context
+        if context is None:
             self.start_conversation()
+            context = self.current_context
         
         turn = ConversationTurn(
             timestamp=datetime.now(),
@@ -120,140 +314,168 @@ class ConversationManager:
             intent_confidence=intent_confidence,
             entities=entities,
             sarah_response=sarah_response,
-            execution_successful=execution_successful
+            execution_successful=execution_successful,
+            result=result
         )
         
-        self.current_context.turns.append(turn)
-        self.current_context.last_interaction = turn.timestamp
+        # Turns to one session are recorded in order; other sessions don't wait
+        with context.lock:
+            self._apply_turn(context, turn)
+            self.conversation_history.touch(context)
+            entities = entities or {}
+            self.stats.add_turn(intent_plugin, execution_successful, entities.get('search_terms') or (),
+                                entities.get('gpe') or entities.get('loc'), turn.timestamp.timestamp())
+            
+            if self.log:
+                record = self._turn_to_dict(turn)
+                record.update(type='turn', session_id=context.session_id)
+                self._persist('log', record)
+            if self.store:
+                self._persist('turn', self._snapshot(context), turn)
+            if self.index is not None and embedding is not None:
+                self._persist('index', embedding, context.session_id, turn)
+    
+    def _apply_turn(self, context: ConversationContext, turn: ConversationTurn) -> None:
+        """Add a turn to a session and learn from it"""
+        context.turns.append(turn)
+        context.last_interaction = turn.timestamp
+        context.stats.add(turn.intent_plugin, (turn.entities or {}).get('search_terms') or ())
         
         # Update active topic based on intent
-        self._update_active_topic(intent_plugin, entities)
+        self._update_active_topic(context, turn.intent_plugin, turn.entities)
         
         # Keep only recent turns to manage memory
-        if len(self.current_context.turns) > self.max_context_turns:
-            self.current_context.turns = self.current_context.turns[-self.max_context_turns:]
+        if len(context.turns) > self.max_context_turns:
+            context.turns = context.turns[-self.max_context_turns:]
         
         # Extract and update user preferences
-        self._update_user_preferences(entities, intent_plugin)
+        self._update_user_preferences(context, turn.entities, turn.intent_plugin,
+                                      turn.user_input, turn.execution_successful)
     
     def get_contextual_response(self, user_input: str, intent_plugin: str, 
-                              entities: Dict[str, Any], base_response: str) -> str:
-        """Generate a contextual response based on conversation history"""
+                              entities: Dict[str, Any], base_response: str,
+                              session: ConversationContext = None) -> str:
+        """Generate a contextual response based on a session's history (by default the current one)"""
         
-        if not self.current_context:
+        context = session or self.current_context
+        if not context:
             return base_response
         
-        # Check for conversation patterns
-        if self._is_greeting(user_input):
-            return self._get_contextual_greeting()
-        
-        if self._is_farewell(user_input):
-            return self._get_farewell_response()
-        
-        if self._is_follow_up_question(user_input, intent_plugin):
-            return self._handle_follow_up(base_response)
-        
-        # Add contextual information
-        contextual_response = self._add_context_to_response(base_response, intent_plugin, entities)
-        
-        return contextual_response
+        acts = self.dialogue_acts.classify(user_input)
+        with context.lock:
+            # Check for conversation patterns
+            if GREETING in acts:
+                return self._get_contextual_greeting(context)
+            
+            if FAREWELL in acts:
+                return self._get_farewell_response(context)
+            
+            if self._is_follow_up_question(context, acts, intent_plugin):
+                return self._handle_follow_up(base_response)
+            
+            # Add contextual information
+            return self._add_context_to_response(context, base_response, intent_plugin, entities)
     
-    def get_conversation_summary(self) -> Dict[str, Any]:
-        """Get a summary of the current conversation"""
-        if not self.current_context:
+    def get_conversation_summary(self, session: ConversationContext = None) -> Dict[str, Any]:
+        """Get a summary of a conversation (by default the current one)"""
+        context = session or self.current_context
+        if not context:
             return {"status": "no_active_conversation"}
         
-        recent_plugins = []
-        recent_topics = []
-        
-        for turn in self.current_context.turns[-5:]:  # Last 5 turns
-            if turn.intent_plugin not in recent_plugins:
-                recent_plugins.append(turn.intent_plugin)
-            
-            if 'search_terms' in turn.entities:
-                recent_topics.extend(turn.entities['search_terms'])
-        
-        return {
-            "session_id": self.current_context.session_id,
-            "duration": str(datetime.now() - self.current_context.started_at),
-            "total_turns": len(self.current_context.turns),
-            "active_topic": self.current_context.active_topic,
-            "recent_plugins": recent_plugins,
-            "recent_topics": list(set(recent_topics)),
-            "user_preferences": self.current_context.user_preferences
-        }
+        with context.lock:
+            return {
+                "session_id": context.session_id,
+                "duration": str(datetime.now() - context.started_at),
+                "total_turns": len(context.turns),
+                "active_topic": context.active_topic,
+                "recent_plugins": context.stats.recent_plugins(),
+                "recent_topics": context.stats.topics.terms(),
+                "user_preferences": copy.deepcopy(context.user_preferences)
+            }
     
-    def _update_active_topic(self, intent_plugin: str, entities: Dict[str, Any]) -> None:
+    def get_user_preferences(self) -> Dict[str, Any]:
+        """Get the preferences learned so far, taken from the most recent session that has any"""
+        # New sessions carry the preferences forward, so the newest one almost always has them
+        newest = self.conversation_history.newest()
+        sessions = [newest] if newest is not None and newest.user_preferences else \
+            reversed(self.conversation_history.values())
+        for context in sessions:
+            # Its owner may be adding a turn meanwhile
+            with context.lock:
+                if context.user_preferences:
+                    preferences = dict(context.user_preferences)
+                    preferences['preferred_plugins'] = dict(preferences.get('preferred_plugins', {}))
+                    preferences['last_requests'] = dict(preferences.get('last_requests', {}))
+                    return preferences
+        return {}
+    
+    def _update_active_topic(self, context: ConversationContext, intent_plugin: str,
+                             entities: Dict[str, Any]) -> None:
         """Update the active conversation topic"""
         if 'search_terms' in entities and entities['search_terms']:
             # Use the most recent search terms as active topic
-            self.current_context.active_topic = ' '.join(entities['search_terms'][:3])
+            context.active_topic = ' '.join(entities['search_terms'][:3])
         elif intent_plugin in ['weather', 'time', 'speedtest']:
-            self.current_context.active_topic = intent_plugin
+            context.active_topic = intent_plugin
     
-    def _update_user_preferences(self, entities: Dict[str, Any], intent_plugin: str) -> None:
+    def _update_user_preferences(self, context: ConversationContext, entities: Dict[str, Any],
+                                 intent_plugin: str, user_input: str = None,
+                                 execution_successful: bool = True) -> None:
         """Learn and update user preferences from conversation"""
-        if not self.current_context.user_preferences:
-            self.current_context.user_preferences = {}
+        if not context.user_preferences:
+            context.user_preferences = {}
         
         # Track preferred plugins
-        if 'preferred_plugins' not in self.current_context.user_preferences:
-            self.current_context.user_preferences['preferred_plugins'] = {}
+        if 'preferred_plugins' not in context.user_preferences:
+            context.user_preferences['preferred_plugins'] = {}
         
-        plugin_prefs = self.current_context.user_preferences['preferred_plugins']
+        plugin_prefs = context.user_preferences['preferred_plugins']
         plugin_prefs[intent_plugin] = plugin_prefs.get(intent_plugin, 0) + 1
         
         # Track location preferences
         if 'gpe' in entities or 'loc' in entities:
             location = entities.get('gpe') or entities.get('loc')
-            self.current_context.location_context = location
-            self.current_context.user_preferences['preferred_location'] = location
-    
-    def _is_greeting(self, user_input: str) -> bool:
-        """Check if user input is a greeting"""
-        greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 
-                    'good evening', 'greetings', 'howdy']
-        return any(greeting in user_input.lower() for greeting in greetings)
-    
-    def _is_farewell(self, user_input: str) -> bool:
-        """Check if user input is a farewell"""
-        farewells = ['goodbye', 'bye', 'see you', 'farewell', 'exit', 'quit', 
-                    'thanks', 'thank you', 'that\'s all']
-        return any(farewell in user_input.lower() for farewell in farewells)
-    
-    def _is_follow_up_question(self, user_input: str, intent_plugin: str) -> bool:
+            context.location_context = location
+            context.user_preferences['preferred_location'] = location
+        
+        # Remember the last successful request per plugin, so it can be anticipated
+        if execution_successful and user_input is not None:
+            last_requests = context.user_preferences.setdefault('last_requests', {})
+            last_requests[intent_plugin] = {'user_input': user_input, 'entities': entities}
+    
+    def _is_follow_up_question(self, context: ConversationContext, acts: FrozenSet[str],
+                               intent_plugin: str) -> bool:
         """Check if this is a follow-up question"""
-        if not self.current_context or not self.current_context.turns:
+        if not context.turns:
             return False
         
-        last_turn = self.current_context.turns[-1]
+        last_turn = context.turns.compact[-1]
         
         # Check if it's the same plugin as last turn (within 2 minutes)
-        time_diff = datetime.now() - last_turn.timestamp
-        if time_diff < timedelta(minutes=2) and intent_plugin == last_turn.intent_plugin:
+        time_diff = time.time() - last_turn.timestamp
+        if time_diff < 120 and intent_plugin == last_turn.plugin:
             return True
         
         # Check for follow-up indicators
-        follow_up_words = ['also', 'and', 'what about', 'how about', 'more', 'another']
-        return any(word in user_input.lower() for word in follow_up_words)
+        return FOLLOW_UP in acts
     
     def _get_greeting_response(self) -> str:
         """Get an appropriate greeting response"""
         import random
         return random.choice(self.greeting_responses)
     
-    def _get_contextual_greeting(self) -> str:
+    def _get_contextual_greeting(self, context: ConversationContext) -> str:
         """Get a contextual greeting based on conversation history"""
-        if self.current_context and self.current_context.turns:
+        if context.turns:
             return "Welcome back! What else can I help you with?"
         return self._get_greeting_response()
     
-    def _get_farewell_response(self) -> str:
+    def _get_farewell_response(self, context: ConversationContext) -> str:
         """Get an appropriate farewell response"""
         import random
         base_farewell = random.choice(self.farewell_responses)
         
-        if self.current_context and len(self.current_context.turns) > 0:
+        if len(context.turns) > 0:
             base_farewell += " It was great helping you today!"
         
         return base_farewell
@@ -264,60 +486,345 @@ class ConversationManager:
         acknowledgment = random.choice(self.acknowledgment_responses)
         return f"{acknowledgment} Here's more information:\n{base_response}"
     
-    def _add_context_to_response(self, base_response: str, intent_plugin: str, 
-                                entities: Dict[str, Any]) -> str:
+    def _add_context_to_response(self, context: ConversationContext, base_response: str,
+                                 intent_plugin: str, entities: Dict[str, Any]) -> str:
         """Add contextual information to the response"""
         
         # Add location context for weather and location-based queries
-        if intent_plugin == 'weather' and self.current_context.location_context:
+        if intent_plugin == 'weather' and context.location_context:
             if not any(loc in base_response.lower() for loc in [
-                self.current_context.location_context.lower()
+                context.location_context.lower()
             ]):
-                location_hint = f"\n(I remember you usually ask about {self.current_context.location_context})"
+                location_hint = f"\n(I remember you usually ask about {context.location_context})"
                 base_response += location_hint
         
         # Add topic continuity
-        if (self.current_context.active_topic and 
+        if (context.active_topic and 
             intent_plugin in ['wiki', 'google', 'youtube', 'github']):
-            if self.current_context.active_topic.lower() not in base_response.lower():
-                topic_hint = f"\n(Related to our discussion about {self.current_context.active_topic})"
+            if context.active_topic.lower() not in base_response.lower():
+                topic_hint = f"\n(Related to our discussion about {context.active_topic})"
                 base_response += topic_hint
         
         return base_response
     
+    def _expired(self, context: ConversationContext) -> bool:
+        return datetime.now() - context.last_interaction >= self.session_timeout
+    
     def _cleanup_old_sessions(self) -> None:
         """Remove old conversation sessions to manage memory"""
-        cutoff_time = datetime.now() - self.session_timeout
-        
-        sessions_to_remove = []
-        for session_id, context in self.conversation_history.items():
-            if context.last_interaction < cutoff_time:
-                sessions_to_remove.append(session_id)
-        
-        for session_id in sessions_to_remove:
-            del self.conversation_history[session_id]
+        # Only the expired sessions at the front of the table are visited
+        sessions_to_remove = self.conversation_history.expire(datetime.now() - self.session_timeout)
         
         if sessions_to_remove:
             logger.info(f"Cleaned up {len(sessions_to_remove)} old conversation sessions")
     
+    def start_sweeper(self, interval_seconds: float = 60) -> None:
+        """Expire idle sessions on a daemon thread, for long-lived agents"""
+        self._sweeper_stop.clear()
+        threading.Thread(target=self._sweep, args=(interval_seconds,), name="session-sweeper",
+                         daemon=True).start()
+    
+    def stop_sweeper(self) -> None:
+        self._sweeper_stop.set()
+    
+    def _sweep(self, interval_seconds: float) -> None:
+        while not self._sweeper_stop.wait(interval_seconds):
+            self._cleanup_old_sessions()
+    
+    def open_log(self, log, retention_days: float = 30, max_sessions: int = 500,
+                 compact_after: int = 1000) -> None:
+        """
+        Rebuild the history from a conversation log and record all changes to it
+        
+        Args:
+            log: ConversationLog to read and append to
+            retention_days: Sessions idle for longer are dropped when the log is compacted
+            max_sessions: Most sessions kept when the log is compacted
+            compact_after: Compact once the log holds this many records (and twice
+                as many as there are sessions)
+        """
+        self.log = log
+        self.retention = timedelta(days=retention_days)
+        self.max_sessions = max_sessions
+        self.compact_after = compact_after
+        
+        self.load_log(log)
+        # A compacted log holds about one record per session
+        self._compact_threshold = max(compact_after, 2 * len(self.conversation_history))
+        if log.records >= self._compact_threshold:
+            try:
+                self.compact_log()
+            except OSError as e:
+                logger.warning(f"Failed to compact conversation log: {e}")
+        self._expire_index()
+        
+        logger.info(f"Loaded {len(self.conversation_history)} sessions from {log.path}")
+    
+    def load_log(self, log) -> None:
+        """Rebuild the history from a conversation log without attaching it"""
+        self.conversation_history.replace(self._replay(log.read()))
+        self.stats.seed(self.get_user_preferences())
+    
+    def open_store(self, store, retention_days: float = 30) -> None:
+        """
+        Load the latest session from a session store and record all changes to it
+        
+        Only that session and its last `max_context_turns` turns are read; it
+        carries the learned preferences, and start_conversation(resume=True)
+        continues it if it has not timed out. Sessions idle for more than
+        `retention_days` are deleted, and so are older turns of the history
+        index if one is attached.
+        """
+        self.store = store
+        self.retention = timedelta(days=retention_days)
+        self._expire_index()
+        
+        try:
+            deleted = store.delete_before(datetime.now() - self.retention)
+            if deleted:
+                logger.info(f"Deleted {deleted} expired conversation sessions")
+            latest = store.latest_session(max_turns=self.max_context_turns)
+        except Exception as e:
+            logger.warning(f"Failed to read session store: {e}")
+            return
+        
+        if latest is not None:
+            self.conversation_history[latest.session_id] = latest
+            self.stats.seed(latest.user_preferences)
+    
+    def get_turns_between(self, start: datetime = None, end: datetime = None,
+                          limit: int = 100) -> List[Dict[str, Any]]:
+        """Get stored turns in a time range, newest first, with their session ids"""
+        if self.store:
+            self.flush_history()
+            return self.store.turns_between(start, end, limit)
+        
+        turns = [{'session_id': context.session_id, 'turn': turn}
+                 for context in self.conversation_history.values() for turn in context.turns
+                 if (start is None or turn.timestamp >= start) and (end is None or turn.timestamp < end)]
+        turns.sort(key=lambda item: item['turn'].timestamp, reverse=True)
+        return turns[:limit]
+    
+    def _write_to_store(self, write, *args) -> None:
+        try:
+            write(*args)
+        except Exception as e:
+            logger.warning(f"Failed to write session store: {e}")
+    
+    def attach_index(self, index) -> None:
+        """
+        Index every turn added from now on (that comes with an embedding) in a HistoryIndex
+        
+        Attach it before opening the store or log, which drop its turns older
+        than the retention period.
+        """
+        self.index = index
+    
+    def _expire_index(self) -> None:
+        if self.index is None:
+            return
+        try:
+            dropped = self.index.compact(datetime.now() - self.retention)
+            if dropped:
+                logger.info(f"Dropped {dropped} expired turns from the history index")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to compact history index: {e}")
+    
+    def search_history(self, embedding, k: int = 5, start: datetime = None, end: datetime = None,
+                       plugin: str = None) -> List[Dict[str, Any]]:
+        """Find the past turns most similar to a query embedding, most similar first"""
+        if self.index is None:
+            return []
+        self.flush_history()
+        return self.index.search(embedding, k, start, end, plugin)
+    
+    def _write_to_index(self, embedding, session_id: str, turn: ConversationTurn) -> None:
+        try:
+            self.index.add(embedding, session_id, turn)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to index conversation turn: {e}")
+    
+    def compact_log(self) -> None:
+        """Rewrite the log as one snapshot record per retained session"""
+        if not self.log:
+            return
+        
+        with self.log.exclusive():
+            # Re-read under the lock to include what other processes appended
+            sessions = self._replay(self.log.read())
+            records = []
+            for context in self._retained_sessions(sessions):
+                record = self._context_to_dict(context)
+                record['type'] = 'session'
+                records.append(record)
+            self.log.rewrite(records)
+        
+        self._compact_threshold = max(self.compact_after, 2 * self.log.records)
+        logger.info(f"Compacted conversation log to {self.log.records} sessions")
+    
+    def start_writer(self, max_delay: float = 1.0, max_batch: int = 64, max_pending: int = 1024) -> None:
+        """
+        Save history writes on a background thread instead of while adding turns
+        
+        Writes are applied in batches at most `max_delay` seconds after they
+        are made (the window of turns a killed process can lose), or as soon as
+        `max_batch` are waiting; adding a turn blocks while `max_pending` are.
+        """
+        if self.writer is None:
+            self.writer = create_history_writer(self._write_batch, max_delay, max_batch, max_pending)
+    
+    def stop_writer(self, timeout: float = 10) -> None:
+        """Save the pending writes and go back to saving each one as it is made"""
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.close(timeout)
+    
+    def flush_history(self, timeout: float = None) -> bool:
+        """Save the pending writes now, e.g. before reading the store"""
+        return self.writer.flush(timeout) if self.writer is not None else True
+    
+    def writer_stats(self) -> Optional[Dict[str, Any]]:
+        return self.writer.stats() if self.writer is not None else None
+    
+    def _persist(self, *write) -> None:
+        """Save a write (its kind, then its arguments) now, or queue it for the writer"""
+        writer = self.writer
+        if writer is not None:
+            writer.submit(write)
+        else:
+            self._write_batch([write])
+    
+    def _write_batch(self, writes: List[tuple]) -> None:
+        """Apply writes in order: log records in one append, store turns in one call"""
+        records = [write[1] for write in writes if write[0] == 'log']
+        if records and self.log:
+            self._append_to_log(records)
+        
+        if self.store:
+            turns = []
+            for write in writes:
+                if write[0] == 'turn':
+                    turns.append(write[1:])
+                elif write[0] == 'session':
+                    if turns:
+                        self._write_to_store(self.store.append_turns, turns)
+                        turns = []
+                    self._write_to_store(self.store.save_session, write[1])
+            if turns:
+                self._write_to_store(self.store.append_turns, turns)
+        
+        if self.index is not None:
+            for write in writes:
+                if write[0] == 'index':
+                    self._write_to_index(*write[1:])
+    
+    def _snapshot(self, context: ConversationContext) -> ConversationContext:
+        """Copy a session's header for a queued write, so later turns don't change it meanwhile"""
+        if self.writer is None:
+            return context
+        return ConversationContext(
+            session_id=context.session_id,
+            started_at=context.started_at,
+            last_interaction=context.last_interaction,
+            turns=[],
+            active_topic=context.active_topic,
+            user_preferences=copy.deepcopy(context.user_preferences),
+            location_context=context.location_context
+        )
+    
+    def _append_to_log(self, records: List[Dict[str, Any]]) -> None:
+        """Append records with one write, compacting the log once it has grown enough"""
+        try:
+            self.log.append_many(records)
+            with self._log_lock:
+                compact = self.log.records >= self._compact_threshold
+                if compact:
+                    # Other threads don't need to compact too
+                    self._compact_threshold = float('inf')
+            if compact:
+                self.compact_log()
+        except OSError as e:
+            logger.warning(f"Failed to write conversation log: {e}")
+            self._compact_threshold = max(self.compact_after, 2 * self.log.records)
+    
+    def _replay(self, records) -> Dict[str, ConversationContext]:
+        """Rebuild sessions from log records"""
+        sessions: Dict[str, ConversationContext] = {}
+        for record in records:
+            try:
+                if record.get('type') == 'session':
+                    context = self._context_from_dict(record)
+                    sessions[context.session_id] = context
+                elif record.get('type') == 'turn':
+                    turn = self._turn_from_dict(record)
+                    context = sessions.get(record['session_id'])
+                    if context is None:
+                        # Its session record was lost; start it from the turn
+                        context = ConversationContext(record['session_id'], turn.timestamp,
+                                                      turn.timestamp, [])
+                        sessions[context.session_id] = context
+                    self._apply_turn(context, turn)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping unreadable conversation record: {e}")
+        return sessions
+    
+    def _retained_sessions(self, sessions: Dict[str, ConversationContext]) -> List[ConversationContext]:
+        """Get the sessions a compaction keeps, oldest first"""
+        newest_first = sorted(sessions.values(), key=lambda context: context.last_interaction, reverse=True)
+        cutoff = datetime.now() - self.retention
+        # The newest session is always kept, since it carries the learned preferences
+        kept = newest_first[:1] + [context for context in newest_first[1:self.max_sessions]
+                                   if context.last_interaction >= cutoff]
+        return kept[::-1]
+    
+    @staticmethod
+    def _turn_to_dict(turn: ConversationTurn) -> Dict[str, Any]:
+        turn_dict = asdict(turn)
+        turn_dict['timestamp'] = turn.timestamp.isoformat()
+        if turn_dict['result'] is None:
+            del turn_dict['result']
+        return turn_dict
+    
+    @staticmethod
+    def _turn_from_dict(turn_dict: Dict[str, Any]) -> ConversationTurn:
+        return ConversationTurn(
+            timestamp=datetime.fromisoformat(turn_dict['timestamp']),
+            user_input=turn_dict['user_input'],
+            intent_plugin=turn_dict['intent_plugin'],
+            intent_confidence=turn_dict['intent_confidence'],
+            entities=turn_dict['entities'],
+            sarah_response=turn_dict['sarah_response'],
+            execution_successful=turn_dict['execution_successful'],
+            result=turn_dict.get('result')
+        )
+    
+    def _context_to_dict(self, context: ConversationContext) -> Dict[str, Any]:
+        return {
+            'session_id': context.session_id,
+            'started_at': context.started_at.isoformat(),
+            'last_interaction': context.last_interaction.isoformat(),
+            'turns': [self._turn_to_dict(turn) for turn in context.turns],
+            'active_topic': context.active_topic,
+            'user_preferences': context.user_preferences,
+            'location_context': context.location_context
+        }
+    
+    def _context_from_dict(self, context_dict: Dict[str, Any]) -> ConversationContext:
+        return ConversationContext(
+            session_id=context_dict['session_id'],
+            started_at=datetime.fromisoformat(context_dict['started_at']),
+            last_interaction=datetime.fromisoformat(context_dict['last_interaction']),
+            turns=[self._turn_from_dict(turn) for turn in context_dict.get('turns', [])],
+            active_topic=context_dict.get('active_topic'),
+            user_preferences=context_dict.get('user_preferences'),
+            location_context=context_dict.get('location_context')
+        )
+    
     def save_conversation_history(self, filepath: str) -> None:
-        """Save conversation history to file"""
+        """Save conversation history to a JSON file (an export; the log is kept up to date as it goes)"""
         try:
-            # Convert conversation history to serializable format
-            history_data = {}
-            for session_id, context in self.conversation_history.items():
-                turns_data = []
-                for turn in context.turns:
-                    turn_dict = asdict(turn)
-                    turn_dict['timestamp'] = turn.timestamp.isoformat()
-                    turns_data.append(turn_dict)
-                
-                context_dict = asdict(context)
-                context_dict['started_at'] = context.started_at.isoformat()
-                context_dict['last_interaction'] = context.last_interaction.isoformat()
-                context_dict['turns'] = turns_data
-                
-                history_data[session_id] = context_dict
+            history_data = {session_id: self._context_to_dict(context)
+                            for session_id, context in self.conversation_history.items()}
             
             with open(filepath, 'w') as f:
                 json.dump(history_data, f, indent=2)
@@ -327,35 +834,38 @@ class ConversationManager:
             logger.error(f"Failed to save conversation history: {e}")
     
     def load_conversation_history(self, filepath: str) -> None:
-        """Load conversation history from file"""
+        """Load conversation history from a JSON file"""
         try:
             with open(filepath, 'r') as f:
                 history_data = json.load(f)
             
-            self.conversation_history = {}
-            for session_id, context_dict in history_data.items():
-                # Reconstruct turns
-                turns = []
-                for turn_dict in context_dict['turns']:
-                    turn_dict['timestamp'] = datetime.fromisoformat(turn_dict['timestamp'])
-                    turns.append(ConversationTurn(**turn_dict))
-                
-                # Reconstruct context
-                context_dict['started_at'] = datetime.fromisoformat(context_dict['started_at'])
-                context_dict['last_interaction'] = datetime.fromisoformat(context_dict['last_interaction'])
-                context_dict['turns'] = turns
-                
-                self.conversation_history[session_id] = ConversationContext(**context_dict)
+            self.conversation_history.replace({session_id: self._context_from_dict(context_dict)
+                                               for session_id, context_dict in history_data.items()})
+            self.stats.seed(self.get_user_preferences())
             
             logger.info(f"Loaded conversation history from {filepath}")
         except Exception as e:
             logger.error(f"Failed to load conversation history: {e}")
+    
+    def import_into_log(self) -> None:
+        """Write the sessions held in memory (e.g. loaded from JSON) to the attached log"""
+        if not self.log:
+            return
+        
+        records = []
+        for context in self.conversation_history.values():
+            record = self._context_to_dict(context)
+            record['type'] = 'session'
+            records.append(record)
+        self.log.append_many(records)
 
 
 def create_conversation_manager(max_context_turns: int = 10, 
-                              session_timeout_minutes: int = 30) -> ConversationManager:
+                              session_timeout_minutes: int = 30,
+                              max_active_sessions: int = 0,
+                              dialogue_acts: Dict[str, List[str]] = None) -> ConversationManager:
     """Factory function to create conversation manager"""
-    return ConversationManager(max_context_turns, session_timeout_minutes)
+    return ConversationManager(max_context_turns, session_timeout_minutes, max_active_sessions, dialogue_acts)
 
 
 if __name__ == "__main__":
@@ -385,4 +895,53 @@ if __name__ == "__main__":
     
     # Show conversation summary
     summary = conv_mgr.get_conversation_summary()
-    print("Conversation Summary:", json.dumps(summary, indent=2)) 
\ No newline at end of file
+    print("Conversation Summary:", json.dumps(summary, indent=2))
+    
+    # Compare the memory held per turn as dataclasses and as compact turns
+    import tracemalloc
+    
+    def bytes_per_turn(container, count=20000):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        turns = container(
+            ConversationTurn(datetime.now(), f"weather in city {n}", ''.join(['wea', 'ther']), 0.9,
+                             {"gpe": f"City {n}", "search_terms": ["weather", f"city{n}"]},
+                             f"Sunny in city {n}", True)
+            for n in range(count)
+        )
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del turns
+        return held / count
+    
+    dataclass_bytes = bytes_per_turn(list)
+    compact_bytes = bytes_per_turn(TurnList)
+    print(f"Bytes per turn: {dataclass_bytes:.0f} as dataclasses, {compact_bytes:.0f} compact "
+          f"({1 - compact_bytes / dataclass_bytes:.0%} less)")
+    
+    # Stress concurrent users: every turn must land in its own session
+    from concurrent.futures import ThreadPoolExecutor
+    
+    threads, sessions_per_run, turns_per_thread = 32, 8, 500
+    stress_mgr = create_conversation_manager(max_context_turns=threads * turns_per_thread)
+    handles = [stress_mgr.new_session() for _ in range(sessions_per_run)]
+    
+    def user(thread: int) -> None:
+        session = handles[thread % sessions_per_run]
+        for n in range(turns_per_thread):
+            stress_mgr.add_turn(f"weather {thread} {n}", f"plugin{n % 4}", 0.9, {"gpe": f"City {n}"},
+                                "Sunny", session=session)
+            stress_mgr.get_conversation_summary(session)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(user, range(threads)))
+    recorded = sum(len(session.turns) for session in handles)
+    counted = sum(sum(session.user_preferences['preferred_plugins'].values()) for session in handles)
+    totals = stress_mgr.stats.turns
+    expected = threads * turns_per_thread
+    lost = expected - min(recorded, counted, totals)
+    print(f"{threads} threads added {recorded} turns ({counted} counted in preferences, {totals} in the totals) "
+          f"of {expected} in {time.perf_counter() - started:.2f}s; lost: {lost}")
+    if lost:
+        sys.exit(f"{lost} concurrently added turns were lost")
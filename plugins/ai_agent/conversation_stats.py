@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversation Statistics for Sarah AI Agent
+
+Running aggregates over conversation turns, updated as each turn is added
+so that reading them never walks the history:
+
+- SessionStats: the plugins and topics of a session's last few turns, for
+  its conversation summary
+- ConversationStats: totals across all sessions (turns, sessions, uses and
+  success rate of each plugin), the topics of the last `topic_window` turns,
+  and the preferred location, where each mention counts half as much after
+  every `location_half_life_days`
+
+Recency decay is kept without touching old scores: a mention at time t adds
+2^((t - origin) / half_life) to its location, which ranks the locations the
+same as decaying every score would. The origin moves forward (rescaling the
+few scores) only before the weights get too large for a float.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Turns a session summary covers
+RECENT_TURNS = 5
+
+# Rebase location weights before they reach this
+_MAX_WEIGHT = 2.0 ** 64
+
+
+class TopicWindow:
+    """
+    Topic terms of the last `size` turns, with a count per term
+    """
+    __slots__ = ('_turns', '_counts')
+
+    def __init__(self, size: int = RECENT_TURNS):
+        self._turns: deque = deque(maxlen=max(1, size))
+        self._counts: Dict[str, int] = {}
+
+    def add(self, terms: Iterable[str]) -> None:
+        terms = tuple(terms)
+        if len(self._turns) == self._turns.maxlen:
+            for term in self._turns[0]:
+                remaining = self._counts[term] - 1
+                if remaining:
+                    self._counts[term] = remaining
+                else:
+                    del self._counts[term]
+        self._turns.append(terms)
+        for term in terms:
+            self._counts[term] = self._counts.get(term, 0) + 1
+
+    def terms(self) -> List[str]:
+        return list(self._counts)
+
+
+class SessionStats:
+    """
+    Plugins and topics of the last RECENT_TURNS turns of a session
+    """
+    __slots__ = ('plugins', 'topics')
+
+    def __init__(self):
+        self.plugins: deque = deque(maxlen=RECENT_TURNS)
+        self.topics = TopicWindow(RECENT_TURNS)
+
+    def add(self, plugin: str, topics: Iterable[str]) -> None:
+        self.plugins.append(plugin)
+        self.topics.add(topics)
+
+    def recent_plugins(self) -> List[str]:
+        """Distinct plugins of the recent turns, in order of first use"""
+        return list(dict.fromkeys(self.plugins))
+
+
+class ConversationStats:
+    """
+    Aggregates across all sessions, updated turn by turn
+    """
+
+    def __init__(self, topic_window: int = 20, location_half_life_days: float = 7):
+        """
+        Args:
+            topic_window: Turns whose topics are kept as the recent topics
+            location_half_life_days: A location mention counts half as much after this long
+        """
+        self.turns = 0
+        self.sessions = 0
+        self.plugin_counts: Dict[str, int] = {}
+        # Plugin -> [turns with a known outcome, successful ones]
+        self._outcomes: Dict[str, List[int]] = {}
+        self.topics = TopicWindow(topic_window)
+        self.half_life = max(1.0, location_half_life_days * 86400)
+        self._location_scores: Dict[str, float] = {}
+        self._origin = time.time()
+        self.preferred_location: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_session(self) -> None:
+        with self._lock:
+            self.sessions += 1
+
+    def add_turn(self, plugin: str, successful: bool, topics: Iterable[str] = (),
+                 location: str = None, timestamp: float = None) -> None:
+        """Fold one turn into the aggregates"""
+        with self._lock:
+            self.turns += 1
+            self.plugin_counts[plugin] = self.plugin_counts.get(plugin, 0) + 1
+            outcome = self._outcomes.setdefault(plugin, [0, 0])
+            outcome[0] += 1
+            outcome[1] += bool(successful)
+            self.topics.add(topics)
+            if location:
+                self._add_location(location, time.time() if timestamp is None else timestamp)
+
+    def seed(self, preferences: Dict[str, Any]) -> None:
+        """
+        Start from the preferences a stored session carries over
+
+        Only the plugin use counts and the preferred location are known from
+        them; success rates start from the turns seen from now on.
+        """
+        if not preferences:
+            return
+        with self._lock:
+            for plugin, count in preferences.get('preferred_plugins', {}).items():
+                self.plugin_counts[plugin] = max(self.plugin_counts.get(plugin, 0), count)
+            location = preferences.get('preferred_location')
+            if location and self.preferred_location is None:
+                self._add_location(location, time.time())
+
+    def success_rate(self, plugin: str) -> Optional[float]:
+        """Share of a plugin's turns that succeeded, or None before its first turn"""
+        outcome = self._outcomes.get(plugin)
+        if not outcome:
+            return None
+        return outcome[1] / outcome[0]
+
+    def top_plugins(self, count: Optional[int] = 3) -> List[Tuple[str, int]]:
+        """The most used plugins (all of them for a count of None) with their use counts"""
+        with self._lock:
+            return self._ranked(count)
+
+    def snapshot(self, top: int = 3) -> Dict[str, Any]:
+        """All aggregates, read together so a concurrent turn can't change them midway"""
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "sessions": self.sessions,
+                "top_plugins": [(plugin, count, self.success_rate(plugin)) for plugin, count in self._ranked(top)],
+                "preferred_location": self.preferred_location,
+                "recent_topics": self.topics.terms()
+            }
+
+    def _ranked(self, count: Optional[int]) -> List[Tuple[str, int]]:
+        return sorted(self.plugin_counts.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def _add_location(self, location: str, timestamp: float) -> None:
+        weight = 2.0 ** ((timestamp - self._origin) / self.half_life)
+        if weight > _MAX_WEIGHT:
+            # Scale every score down together; the ranking is unchanged
+            self._location_scores = {name: score / weight for name, score in self._location_scores.items()}
+            self._origin = timestamp
+            weight = 1.0
+
+        score = self._location_scores.get(location, 0.0) + weight
+        self._location_scores[location] = score
+        # Scores only change here, so the leader can only change to this location
+        if self.preferred_location is None or score > self._location_scores.get(self.preferred_location, 0.0):
+            self.preferred_location = location
+
+
+def create_conversation_stats(topic_window: int = 20, location_half_life_days: float = 7) -> ConversationStats:
+    """Factory function to create conversation statistics"""
+    return ConversationStats(topic_window, location_half_life_days)
+
+
+if __name__ == "__main__":
+    # Recency decay: London was mentioned often a month ago, Paris a few times this week
+    day = 86400
+    now = time.time()
+    stats = create_conversation_stats(location_half_life_days=7)
+    for n in range(10):
+        stats.add_turn('weather', True, location='London', timestamp=now - 30 * day + n)
+    for n in range(3):
+        stats.add_turn('weather', n > 0, location='Paris', timestamp=now - 2 * day + n)
+    stats.add_turn('google', True, ['python', 'decorators'], timestamp=now)
+    print(stats.snapshot())
+
+    # Reading the aggregates costs the same however many turns were added
+    for count in (1000, 100000):
+        stats = create_conversation_stats()
+        for n in range(count):
+            stats.add_turn(f"plugin_{n % 20}", n % 7 != 0, [f"topic_{n % 50}"], f"city_{n % 30}", now + n)
+        started = time.perf_counter()
+        for _ in range(1000):
+            stats.snapshot()
+        print(f"{count} turns: snapshot in {(time.perf_counter() - started) * 1000:.3f}us")
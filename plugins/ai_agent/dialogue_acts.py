@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dialogue Act Classifier for Sarah AI Agent
+
+Recognizes the conversational acts of an input (a greeting, a farewell, a
+follow-up) from their cue phrases. All phrases of all acts are compiled into
+one case-insensitive regular expression, matched on word boundaries, so an
+input is classified in a single pass without lowercasing or splitting it,
+and "hi" is no longer found inside "this" nor "and" inside "understand".
+The phrases are factored into a trie ("h(?:e(?:llo|y)|i|ow...)"), so at
+each position of the input the expression fails after a character or two
+instead of trying every phrase.
+
+The phrases of each act can be replaced from the `dialogue_acts` section of
+the conversation configuration.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+GREETING = "greeting"
+FAREWELL = "farewell"
+FOLLOW_UP = "follow_up"
+NO_ACTS: FrozenSet[str] = frozenset()
+
+DEFAULT_PATTERNS: Dict[str, List[str]] = {
+    GREETING: ['hello', 'hi', 'hey', 'good morning', 'good afternoon',
+               'good evening', 'greetings', 'howdy'],
+    FAREWELL: ['goodbye', 'bye', 'see you', 'farewell', 'exit', 'quit',
+               'thanks', 'thank you', "that's all"],
+    FOLLOW_UP: ['also', 'and', 'what about', 'how about', 'more', 'another']
+}
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Regex matching the phrases of a character trie, allowing any whitespace between words"""
+    alternatives = [(r'\s+' if char == ' ' else re.escape(char)) + _trie_pattern(child)
+                    for char, child in sorted(node.items()) if char]
+    if not alternatives:
+        return ''
+    group = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    # '' marks the end of a phrase; greedy, so the longest phrase wins
+    return '(?:' + group + ')?' if '' in node else group
+
+
+def _normalize(phrase: str) -> str:
+    return ' '.join(phrase.lower().split())
+
+
+class DialogueActClassifier:
+    """
+    Single-pass, word-boundary matcher of conversational cue phrases
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[str]] = None):
+        """
+        Args:
+            patterns: Cue phrases by act; acts not given keep their default phrases
+        """
+        self.patterns = {act: list(phrases) for act, phrases in DEFAULT_PATTERNS.items()}
+        for act, phrases in (patterns or {}).items():
+            self.patterns[act] = list(phrases)
+
+        # A phrase can cue several acts
+        self._acts: Dict[str, FrozenSet[str]] = {}
+        for act, phrases in self.patterns.items():
+            for phrase in phrases:
+                key = _normalize(phrase)
+                if key:
+                    self._acts[key] = self._acts.get(key, frozenset()) | {act}
+
+        trie: Dict[str, dict] = {}
+        for phrase in self._acts:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        self._regex = re.compile(r'(?<!\w)' + _trie_pattern(trie) + r'(?!\w)', re.IGNORECASE) if trie else None
+
+    def classify(self, text: str) -> FrozenSet[str]:
+        """Get the acts whose cue phrases occur in a text"""
+        matches = self._regex.findall(text) if self._regex is not None else None
+        if not matches:
+            return NO_ACTS
+        acts = NO_ACTS
+        for match in matches:
+            acts |= self._acts.get(match) or self._acts[_normalize(match)]
+        return acts
+
+    def matches(self, text: str, act: str) -> bool:
+        return act in self.classify(text)
+
+
+def create_dialogue_act_classifier(patterns: Dict[str, Iterable[str]] = None) -> DialogueActClassifier:
+    """Factory function to create dialogue act classifier"""
+    return DialogueActClassifier(patterns)
+
+
+if __name__ == "__main__":
+    # Compare with the substring scans the conversation manager used before
+    import random
+    import time
+
+    def substring_acts(text: str) -> FrozenSet[str]:
+        acts = set()
+        for act in (GREETING, FAREWELL, FOLLOW_UP):
+            if any(phrase in text.lower() for phrase in DEFAULT_PATTERNS[act]):
+                acts.add(act)
+        return frozenset(acts)
+
+    # Mostly requests, with some conversational inputs mixed in
+    random.seed(0)
+    requests = ["what's the weather like in New York tomorrow", "search for python tutorials on youtube",
+                "tell me about Albert Einstein", "show me the stock price for Apple", "test my internet speed",
+                "what time is it in Tokyo", "play some relaxing music", "translate this sentence into French",
+                "how far is the moon", "set a timer for ten minutes", "do you understand this"]
+    conversational = ["hello there", "thanks, that's all", "and in Paris?", "what about tomorrow", "bye",
+                      "hi sarah", "how about Berlin", "Good  Morning!"]
+    corpus = [random.choice(requests) if random.random() < 0.8 else random.choice(conversational)
+              for _ in range(200000)]
+    classifier = create_dialogue_act_classifier()
+
+    started = time.perf_counter()
+    old = [substring_acts(text) for text in corpus]
+    old_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new = [classifier.classify(text) for text in corpus]
+    new_s = time.perf_counter() - started
+
+    print(f"Classified {len(corpus)} inputs: substring scans {old_s * 1000:.0f}ms, "
+          f"compiled matcher {new_s * 1000:.0f}ms ({old_s / new_s:.1f}x)")
+    print("Classified differently:")
+    for text in requests + conversational:
+        if substring_acts(text) != classifier.classify(text):
+            print(f"  {text!r}: substring scans {sorted(substring_acts(text))}, "
+                  f"compiled matcher {sorted(classifier.classify(text))}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process Redis stand-in for Sarah AI Agent
+
+Implements the few Redis commands the Redis session backend uses (hashes,
+lists, sorted sets, key expiry and pipelines) on plain dicts, with the same
+call signatures and return values as a redis-py client created with
+`decode_responses=True`. It lets the backend run without a server, e.g. in
+development or when trying out the configuration (`"fake": true`).
+
+Data lives only as long as the object, and expiry is checked when a key is
+read rather than by a background task.
+"""
+
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _score_bound(value) -> Tuple[float, bool]:
+    """Parse a sorted set range bound into (score, exclusive)"""
+    if isinstance(value, str):
+        if value in ('-inf', '+inf', 'inf'):
+            return float(value), False
+        if value.startswith('('):
+            return float(value[1:]), True
+    return float(value), False
+
+
+class FakeRedis:
+    """
+    Dict-backed subset of a redis-py client
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def pipeline(self, transaction: bool = True) -> 'FakePipeline':
+        return FakePipeline(self)
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    # Keys
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            deleted = 0
+            for name in names:
+                if self._get(name) is not None:
+                    deleted += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return deleted
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._get(name) is not None)
+
+    def expire(self, name: str, seconds: float) -> bool:
+        with self._lock:
+            if self._get(name) is None:
+                return False
+            self._expires[name] = time.time() + seconds
+            return True
+
+    def expireat(self, name: str, when: float) -> bool:
+        with self._lock:
+            if self._get(name) is None:
+                return False
+            self._expires[name] = float(when)
+            return True
+
+    def ttl(self, name: str) -> int:
+        with self._lock:
+            if self._get(name) is None:
+                return -2
+            if name not in self._expires:
+                return -1
+            return max(0, round(self._expires[name] - time.time()))
+
+    # Hashes
+
+    def hset(self, name: str, key: str = None, value: Any = None, mapping: Dict[str, Any] = None) -> int:
+        with self._lock:
+            fields = self._get(name, create=dict)
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            added = sum(1 for field in items if field not in fields)
+            fields.update({field: str(value) for field, value in items.items()})
+            return added
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._get(name) or {})
+
+    # Lists
+
+    def rpush(self, name: str, *values: Any) -> int:
+        with self._lock:
+            items = self._get(name, create=list)
+            items.extend(str(value) for value in values)
+            return len(items)
+
+    def lrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = self._get(name) or []
+            return items[self._slice(len(items), start, end)]
+
+    def ltrim(self, name: str, start: int, end: int) -> bool:
+        with self._lock:
+            items = self._get(name)
+            if items is not None:
+                items[:] = items[self._slice(len(items), start, end)]
+                if not items:
+                    self.delete(name)
+            return True
+
+    # Sorted sets
+
+    def zadd(self, name: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            members = self._get(name, create=dict)
+            added = sum(1 for member in mapping if member not in members)
+            members.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, name: str, *members: str) -> int:
+        with self._lock:
+            scores = self._get(name) or {}
+            removed = sum(1 for member in members if scores.pop(member, None) is not None)
+            if name in self._data and not scores:
+                self.delete(name)
+            return removed
+
+    def zcard(self, name: str) -> int:
+        with self._lock:
+            return len(self._get(name) or {})
+
+    def zrevrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            ordered = self._ordered(name, reverse=True)
+            return ordered[self._slice(len(ordered), start, end)]
+
+    def zrangebyscore(self, name: str, min, max, start: int = None, num: int = None) -> List[str]:
+        with self._lock:
+            return self._by_score(name, min, max, start, num)
+
+    def zrevrangebyscore(self, name: str, max, min, start: int = None, num: int = None) -> List[str]:
+        with self._lock:
+            return self._by_score(name, min, max, start, num, reverse=True)
+
+    def zremrangebyscore(self, name: str, min, max) -> int:
+        with self._lock:
+            members = self._by_score(name, min, max)
+            return self.zrem(name, *members) if members else 0
+
+    def _get(self, name: str, create=None):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= time.time():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        if name not in self._data and create is not None:
+            self._data[name] = create()
+        return self._data.get(name)
+
+    def _ordered(self, name: str, reverse: bool = False) -> List[str]:
+        scores = self._get(name) or {}
+        return sorted(scores, key=lambda member: (scores[member], member), reverse=reverse)
+
+    def _by_score(self, name: str, min, max, start: Optional[int] = None,
+                  num: Optional[int] = None, reverse: bool = False) -> List[str]:
+        scores = self._get(name) or {}
+        low, low_open = _score_bound(min)
+        high, high_open = _score_bound(max)
+        matched = [member for member in self._ordered(name, reverse)
+                   if (scores[member] > low if low_open else scores[member] >= low)
+                   and (scores[member] < high if high_open else scores[member] <= high)]
+        if start is not None and num is not None:
+            matched = matched[start:start + num if num >= 0 else None]
+        return matched
+
+    @staticmethod
+    def _slice(length: int, start: int, end: int) -> slice:
+        """Turn Redis's inclusive, possibly negative, range into a slice"""
+        if start < 0:
+            start = max(0, length + start)
+        if end < 0:
+            end = length + end
+        return slice(start, end + 1)
+
+
+class FakePipeline:
+    """
+    Queues commands and applies them together, like a MULTI/EXEC pipeline
+    """
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands: List[tuple] = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        with self._client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._commands = []
+
+
+def create_fake_redis() -> FakeRedis:
+    """Factory function to create an in-process Redis stand-in"""
+    return FakeRedis()
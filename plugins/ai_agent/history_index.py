@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+History Index for Sarah AI Agent
+
+A vector index over past conversation turns, for questions like "what did I
+look up about Python last week?". Each turn is added with the sentence
+embedding the AI core computed for its input when it was understood, so old
+text is never encoded again.
+
+The index is a directory of append-only files:
+
+- vectors.i8: the unit-length embeddings, quantized to rows of int8
+- rows.bin: a fixed-size record per row (timestamp, plugin id, the scale
+  of its quantized embedding, and the offset of its turn in turns.jsonl)
+- turns.jsonl: the input, response and session of each turn
+- index.json: the embedding dimension and the plugin names behind the ids
+
+Adding a turn appends to each file. A search filters the rows by time and
+plugin on the in-memory row records, scores the remaining embeddings
+against the query straight from the memory-mapped vector file, in blocks,
+and reads only the top matches' turns from disk. Rows added by other agent
+processes are picked up before each search.
+
+compact() drops the turns older than the retention period by writing new
+files next to the old ones and committing them with a marker file: once the
+marker exists the new files replace the old, finishing after a crash the
+next time the index is opened.
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; locking is skipped there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ROW_DTYPE = np.dtype([('timestamp', '<f8'), ('plugin', '<u4'), ('scale', '<f4'), ('offset', '<u8')])
+VECTOR_DTYPE = np.dtype('i1')
+VECTOR_FILE = 'vectors.i8'
+DATA_FILES = ('turns.jsonl', VECTOR_FILE, 'rows.bin')
+# Present while compacted files are replacing the old ones
+COMPACT_MARKER = 'compact.commit'
+
+# Rows scored per block: small enough to stay in cache while converted and scored
+BLOCK_ROWS = 8192
+
+
+class HistoryIndex:
+    """
+    Appendable on-disk vector index of conversation turns
+    """
+
+    def __init__(self, path: str = '~/.sarah/history_index'):
+        self.path = os.path.expanduser(path)
+        self.dimension: Optional[int] = None
+        self.plugins: List[str] = []
+        self._plugin_ids: Dict[str, int] = {}
+        # Row records, with room to grow so adding a row doesn't copy them all
+        self._buffer = np.zeros(1024, dtype=ROW_DTYPE)
+        self._count = 0
+        self._vectors: Optional[np.memmap] = None
+        # Identity of the rows file read, to notice it being replaced by compaction
+        self._rows_file: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        with self._locked(exclusive=True):
+            self._finish_compaction()
+            self._load_header()
+            self._repair()
+            self._refresh()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def _rows(self) -> np.ndarray:
+        return self._buffer[:self._count]
+
+    def _extend(self, rows: np.ndarray) -> None:
+        needed = self._count + len(rows)
+        if needed > len(self._buffer):
+            buffer = np.zeros(max(needed, 2 * len(self._buffer)), dtype=ROW_DTYPE)
+            buffer[:self._count] = self._rows
+            self._buffer = buffer
+        self._buffer[self._count:needed] = rows
+        self._count = needed
+
+    def add(self, embedding, session_id: str, turn) -> bool:
+        """
+        Add a turn with the embedding of its input
+
+        Returns:
+            False if the embedding can't be indexed (none, or of another dimension)
+        """
+        vector = self._unit(embedding)
+        if vector is None:
+            return False
+
+        with self._lock, self._locked(exclusive=True):
+            self._refresh()
+            if self.dimension is None:
+                self.dimension = len(vector)
+                self._save_header()
+            elif len(vector) != self.dimension:
+                # The sentence model changed; its embeddings can't be compared with these
+                self.skipped += 1
+                return False
+
+            plugin = self._plugin_id(turn.intent_plugin)
+            line = json.dumps({
+                'session_id': session_id,
+                'user_input': turn.user_input,
+                'sarah_response': turn.sarah_response
+            }, ensure_ascii=False, default=str) + "\n"
+
+            # The row record goes last: a row only exists once all its parts do
+            quantized, scale = self._quantize(vector[np.newaxis, :])
+            offset = self._append('turns.jsonl', line.encode('utf-8'))
+            self._append(VECTOR_FILE, quantized.tobytes())
+            row = np.array([(turn.timestamp.timestamp(), plugin, scale[0], offset)], dtype=ROW_DTYPE)
+            self._append('rows.bin', row.tobytes())
+            self._extend(row)
+        return True
+
+    def search(self, embedding, k: int = 5, start: datetime = None, end: datetime = None,
+               plugin: str = None, min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Find the past turns whose input is most similar to a query
+
+        Args:
+            embedding: Sentence embedding of the query
+            k: Most results returned
+            start, end: Only turns in this time range
+            plugin: Only turns handled by this plugin
+
+        Returns:
+            Dicts with the similarity, timestamp, plugin, session id, input and
+            response of each turn, most similar first
+        """
+        query = self._unit(embedding)
+        with self._lock:
+            with self._locked(exclusive=False):
+                self._refresh()
+            if query is None or self.dimension is None or len(query) != self.dimension or not len(self._rows):
+                return []
+
+            candidates = self._filter(start, end, plugin)
+            if candidates is not None and not len(candidates):
+                return []
+            rows, scores = self._score(query, candidates)
+            if not len(rows):
+                return []
+
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [self._result(int(rows[i]), float(scores[i])) for i in top
+                    if scores[i] >= min_similarity]
+
+    def compact(self, before: datetime) -> int:
+        """
+        Drop the turns from before a time
+
+        Returns:
+            The number of turns dropped
+        """
+        with self._lock, self._locked(exclusive=True):
+            self._refresh()
+            keep = np.flatnonzero(self._rows['timestamp'] >= before.timestamp())
+            dropped = len(self._rows) - len(keep)
+            if not dropped:
+                return 0
+
+            with open(os.path.join(self.path, 'turns.jsonl'), 'rb') as f:
+                turns = f.read()
+            rows = self._rows[keep].copy()
+            lines = []
+            offset = 0
+            for n, start in enumerate(rows['offset'].tolist()):
+                line = turns[start:turns.index(b"\n", start) + 1]
+                rows['offset'][n] = offset
+                offset += len(line)
+                lines.append(line)
+            vectors = self._vectors[keep].tobytes() if len(keep) else b''
+
+            for name, data in (('turns.jsonl', b''.join(lines)), (VECTOR_FILE, vectors),
+                               ('rows.bin', rows.tobytes())):
+                self._write_new(name, data)
+            self._write_new(COMPACT_MARKER, b'')
+            self._finish_compaction()
+
+            self._count = 0
+            self._vectors = None
+            self._rows_file = None
+            self._refresh()
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {"turns": self._count, "dimension": self.dimension, "skipped": self.skipped}
+
+    def _filter(self, start: Optional[datetime], end: Optional[datetime],
+                plugin: Optional[str]) -> Optional[np.ndarray]:
+        """Get the rows that pass the filters, or None for all rows"""
+        if start is None and end is None and plugin is None:
+            return None
+
+        mask = np.ones(len(self._rows), dtype=bool)
+        if start is not None:
+            mask &= self._rows['timestamp'] >= start.timestamp()
+        if end is not None:
+            mask &= self._rows['timestamp'] < end.timestamp()
+        if plugin is not None:
+            plugin_id = self._plugin_ids.get(plugin)
+            if plugin_id is None:
+                return np.zeros(0, dtype=np.int64)
+            mask &= self._rows['plugin'] == plugin_id
+        return np.flatnonzero(mask)
+
+    def _score(self, query: np.ndarray, candidates: Optional[np.ndarray]):
+        """Get the cosine similarity of the query with each candidate row"""
+        vectors = self._vectors
+        scales = self._rows['scale']
+        if candidates is None:
+            rows = np.arange(len(self._rows))
+            scores = np.concatenate([
+                vectors[block:block + BLOCK_ROWS].astype(np.float32) @ query
+                for block in range(0, len(self._rows), BLOCK_ROWS)
+            ]) * scales
+            return rows, scores
+
+        scores = np.concatenate([
+            vectors[candidates[block:block + BLOCK_ROWS]].astype(np.float32) @ query
+            for block in range(0, len(candidates), BLOCK_ROWS)
+        ]) * scales[candidates]
+        return candidates, scores
+
+    def _result(self, row: int, similarity: float) -> Dict[str, Any]:
+        record = self._rows[row]
+        with open(os.path.join(self.path, 'turns.jsonl'), 'rb') as f:
+            f.seek(int(record['offset']))
+            turn = json.loads(f.readline().decode('utf-8'))
+        return {
+            'similarity': similarity,
+            'timestamp': datetime.fromtimestamp(float(record['timestamp'])),
+            'plugin': self.plugins[int(record['plugin'])],
+            'session_id': turn.get('session_id'),
+            'user_input': turn.get('user_input', ''),
+            'sarah_response': turn.get('sarah_response', '')
+        }
+
+    def _refresh(self) -> None:
+        """Pick up rows appended since the last look, by this or another process"""
+        try:
+            status = os.stat(os.path.join(self.path, 'rows.bin'))
+            size, identity = status.st_size, (status.st_dev, status.st_ino)
+        except OSError:
+            size, identity = 0, None
+        if identity != self._rows_file:
+            # Compacted by another process: read the rows afresh
+            if self._rows_file is not None:
+                self._count = 0
+                self._vectors = None
+            self._rows_file = identity
+
+        known = len(self._rows) * ROW_DTYPE.itemsize
+        if size > known:
+            with open(os.path.join(self.path, 'rows.bin'), 'rb') as f:
+                f.seek(known)
+                data = f.read(size - known)
+            usable = len(data) - len(data) % ROW_DTYPE.itemsize
+            new_rows = np.frombuffer(data[:usable], dtype=ROW_DTYPE)
+            self._extend(new_rows)
+            if len(new_rows) and int(new_rows['plugin'].max()) >= len(self.plugins):
+                self._load_header()
+
+        # The header is saved before the first row's data, so the vector file
+        # can be missing or empty; there is nothing to map until it holds a row
+        if self.dimension and len(self._rows) and (self._vectors is None
+                                                   or len(self._vectors) < len(self._rows)):
+            self._vectors = np.memmap(os.path.join(self.path, VECTOR_FILE), dtype=VECTOR_DTYPE,
+                                      mode='r', shape=(len(self._rows), self.dimension))
+
+    def _repair(self) -> None:
+        """Drop parts of rows a crash left unfinished"""
+        if not self.dimension:
+            return
+        rows = self._size('rows.bin') // ROW_DTYPE.itemsize
+        vector_bytes = self.dimension * VECTOR_DTYPE.itemsize
+        # Zero when the first row never got its data; the files are then emptied
+        rows = min(rows, self._size(VECTOR_FILE) // vector_bytes)
+        for name, size in (('rows.bin', rows * ROW_DTYPE.itemsize), (VECTOR_FILE, rows * vector_bytes)):
+            if self._size(name) > size:
+                logger.warning(f"Truncating unfinished rows of {name} in {self.path}")
+                os.truncate(os.path.join(self.path, name), size)
+
+    def _write_new(self, name: str, data: bytes) -> None:
+        """Write the compacted version of an index file, or the marker committing them"""
+        path = os.path.join(self.path, name if name == COMPACT_MARKER else f"{name}.new")
+        with open(path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _finish_compaction(self) -> None:
+        """Put committed compacted files in place, or discard uncommitted ones"""
+        marker = os.path.join(self.path, COMPACT_MARKER)
+        committed = os.path.exists(marker)
+        for name in DATA_FILES:
+            path = os.path.join(self.path, name)
+            if os.path.exists(f"{path}.new"):
+                if committed:
+                    os.replace(f"{path}.new", path)
+                else:
+                    os.remove(f"{path}.new")
+        if committed:
+            os.remove(marker)
+
+    def _plugin_id(self, plugin: str) -> int:
+        plugin_id = self._plugin_ids.get(plugin)
+        if plugin_id is None:
+            self.plugins.append(plugin)
+            plugin_id = self._plugin_ids[plugin] = len(self.plugins) - 1
+            self._save_header()
+        return plugin_id
+
+    def _load_header(self) -> None:
+        try:
+            with open(os.path.join(self.path, 'index.json'), 'r') as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            return
+        self.dimension = header.get('dimension')
+        self.plugins = list(header.get('plugins', []))
+        self._plugin_ids = {name: index for index, name in enumerate(self.plugins)}
+
+    def _save_header(self) -> None:
+        path = os.path.join(self.path, 'index.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'dimension': self.dimension, 'plugins': self.plugins}, f)
+        os.replace(tmp_path, path)
+
+    def _append(self, name: str, data: bytes) -> int:
+        """Append to one of the index files, returning the offset written at"""
+        with open(os.path.join(self.path, name), 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        return offset
+
+    def _size(self, name: str) -> int:
+        try:
+            return os.path.getsize(os.path.join(self.path, name))
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray):
+        """Quantize unit vectors to int8, returning them and the scale that restores each"""
+        peaks = np.abs(vectors).max(axis=1)
+        peaks[peaks == 0] = 1
+        quantized = np.round(vectors * (127 / peaks)[:, np.newaxis]).astype(VECTOR_DTYPE)
+        return quantized, (peaks / 127).astype(np.float32)
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+
+        with open(os.path.join(self.path, 'index.lock'), 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def create_history_index(path: str = '~/.sarah/history_index') -> HistoryIndex:
+    """Factory function to create history index"""
+    return HistoryIndex(path)
+
+
+if __name__ == "__main__":
+    # Time searches over a large index of random embeddings
+    import time
+    import tempfile
+    from types import SimpleNamespace
+    from datetime import timedelta
+
+    index = create_history_index(os.path.join(tempfile.mkdtemp(), 'history_index'))
+    rng = np.random.default_rng(0)
+    count, dimension = 300000, 384
+    now = datetime.now()
+
+    # Bulk-write the files the way add() does, which would take a while row by row
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index.dimension = dimension
+    for plugin in ('weather', 'wiki', 'google', 'youtube'):
+        index._plugin_id(plugin)
+    lines = [json.dumps({'session_id': 'bulk', 'user_input': f"query {n}", 'sarah_response': 'ok'}) + "\n"
+             for n in range(count)]
+    offsets = np.cumsum([0] + [len(line) for line in lines[:-1]])
+    rows = np.zeros(count, dtype=ROW_DTYPE)
+    rows['timestamp'] = [(now - timedelta(minutes=count - n)).timestamp() for n in range(count)]
+    rows['plugin'] = np.arange(count) % 4
+    rows['offset'] = offsets
+    quantized, rows['scale'] = index._quantize(vectors)
+    index._append('turns.jsonl', ''.join(lines).encode('utf-8'))
+    index._append(VECTOR_FILE, quantized.tobytes())
+    index._append('rows.bin', rows.tobytes())
+
+    # A new turn added the normal way, then found again by a similar query
+    turn = SimpleNamespace(timestamp=now, intent_plugin='wiki', user_input="python decorators",
+                           sarah_response="Decorators wrap functions")
+    target = rng.standard_normal(dimension)
+    index.add(target, 'session_demo', turn)
+
+    for label, filters in (("all turns", {}), ("last week, wiki only",
+                                               {'start': now - timedelta(days=7), 'plugin': 'wiki'})):
+        started = time.perf_counter()
+        results = index.search(target + rng.standard_normal(dimension) * 0.3, k=5, **filters)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Searched {len(index)} turns ({label}) in {elapsed_ms:.1f}ms: "
+              f"{results[0]['user_input']!r} at {results[0]['similarity']:.2f}")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+History Writer for Sarah AI Agent
+
+Write-behind persistence for the conversation history. Writes are queued
+and applied by a dedicated thread, so recording a turn costs no disk I/O.
+The thread waits for up to `max_delay` seconds after the first queued write
+(or until `max_batch` writes are waiting) and applies them together: one
+append and one fsync for the conversation log, one transaction for the
+session store. `max_delay` is the durability window: a turn is on disk at
+most that long after it was added, and a process killed outright loses at
+most the turns of that window.
+
+When `max_pending` writes are waiting, adding another blocks until the
+thread has caught up, so a slow disk slows the agent down rather than
+growing the queue without bound. Pending writes are flushed on close and
+when the interpreter exits.
+"""
+
+import time
+import queue
+import atexit
+import threading
+from typing import Any, Callable, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Queue markers asking the writer thread to write at once, or to stop
+_FLUSH = object()
+_STOP = object()
+
+
+class HistoryWriter:
+    """
+    Queue of history writes applied in batches by a background thread
+    """
+
+    def __init__(self, write_batch: Callable[[List[Any]], None], max_delay: float = 1.0,
+                 max_batch: int = 64, max_pending: int = 1024):
+        """
+        Args:
+            write_batch: Applies a list of queued writes, in order
+            max_delay: Longest a write waits to be applied, in seconds
+            max_batch: Apply a batch once this many writes are waiting
+            max_pending: Most writes queued before adding one blocks
+        """
+        self.write_batch = write_batch
+        self.max_delay = max(0.0, max_delay)
+        self.max_batch = max(1, max_batch)
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.stalls = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(max(1, max_pending))
+        # Writes submitted but not yet applied, for flush()
+        self._unwritten = 0
+        self._written_cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, item: Any) -> None:
+        """Queue a write, blocking while `max_pending` writes are waiting"""
+        with self._written_cond:
+            self._unwritten += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.stalls += 1
+            self._queue.put(item)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Apply every write queued so far, without waiting out the delay
+
+        Returns:
+            False if they were not all applied within the timeout
+        """
+        if not self._thread.is_alive():
+            return self._unwritten == 0
+        self._queue.put(_FLUSH)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._written_cond:
+            while self._unwritten:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._written_cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10) -> bool:
+        """Flush pending writes and stop the thread"""
+        if self._closed:
+            return True
+        self._closed = True
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        if self._unwritten:
+            logger.warning(f"{self._unwritten} conversation history writes were not saved")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": self._unwritten, "written": self.written, "batches": self.batches,
+                "failures": self.failures, "stalls": self.stalls}
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.max_delay
+            # Gather writes until the delay is up, the batch is full, or a flush is asked for
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # Whatever is still queued was submitted before close()
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP and item is not _FLUSH:
+                        batch.append(item)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Any]) -> None:
+        try:
+            self.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Failed to save {len(batch)} conversation history writes: {e}")
+        finally:
+            self.batches += 1
+            with self._written_cond:
+                self._unwritten -= len(batch)
+                self._written_cond.notify_all()
+
+
+def create_history_writer(write_batch: Callable[[List[Any]], None], max_delay: float = 1.0,
+                          max_batch: int = 64, max_pending: int = 1024) -> HistoryWriter:
+    """Factory function to create history writer"""
+    return HistoryWriter(write_batch, max_delay, max_batch, max_pending)
+
+
+if __name__ == "__main__":
+    # Per-turn latency with the log fsync'ed on every turn, and written behind
+    import os
+    import tempfile
+
+    try:
+        from .conversation_manager import create_conversation_manager
+        from .conversation_log import create_conversation_log
+    except ImportError:
+        # Fallback for direct execution
+        from conversation_manager import create_conversation_manager
+        from conversation_log import create_conversation_log
+
+    directory = tempfile.mkdtemp()
+    turns = 500
+    for label, write_behind in (("synchronous", False), ("write-behind", True)):
+        manager = create_conversation_manager()
+        log = create_conversation_log(os.path.join(directory, f"{label}.jsonl"), fsync=True)
+        manager.open_log(log, compact_after=10 ** 9)
+        if write_behind:
+            manager.start_writer(max_delay=0.5, max_batch=128)
+        manager.start_conversation()
+
+        latencies = []
+        for n in range(turns):
+            started = time.perf_counter()
+            manager.add_turn(f"weather {n}", "weather", 0.9, {"gpe": "London"}, "Sunny", True)
+            latencies.append(time.perf_counter() - started)
+        writer = manager.writer
+        started = time.perf_counter()
+        manager.stop_writer()
+        flush_ms = (time.perf_counter() - started) * 1000
+
+        latencies.sort()
+        saved = sum(1 for record in log.read() if record.get('type') == 'turn')
+        print(f"{label:>12}: median {latencies[turns // 2] * 1e6:.0f}us, "
+              f"p99 {latencies[int(turns * 0.99)] * 1e6:.0f}us per turn; {saved} of {turns} turns saved"
+              + (f" in {writer.stats()['batches']} batches, final flush {flush_ms:.1f}ms" if writer else ""))
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Fallback for Sarah AI Agent
+
+When an input doesn't match any plugin with enough confidence, the agent can
+hand it to an OpenAI chat model instead of only listing suggestions. The
+answer is streamed to the terminal token by token as it arrives.
+
+Answers are stored in a semantic cache keyed by the input's sentence
+embedding, so a near-duplicate question is answered locally without a paid
+round trip. Any OpenAI-compatible endpoint can be used through `base_url`,
+including the offline stub in `openai_stub.py`.
+"""
+
+import os
+from typing import Any, Dict, Optional, TextIO
+import logging
+
+try:
+    from .semantic_cache import SemanticCache
+except ImportError:
+    # Fallback for direct execution
+    from semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = ("You are Sarah, a helpful command-line assistant. "
+                 "Answer briefly and in plain text, without markdown.")
+
+
+class LLMFallback:
+    """
+    Answers low-confidence inputs with a streamed chat completion
+    """
+
+    def __init__(self, config: Dict[str, Any] = None, cache: Optional[SemanticCache] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', False) and config.get('use_for_fallback', False)
+        self.model = config.get('model', 'gpt-3.5-turbo')
+        self.max_tokens = config.get('max_tokens', 150)
+        self.temperature = config.get('temperature', 0.7)
+        self.timeout = config.get('timeout', 30)
+        self.base_url = config.get('base_url') or None
+        self.api_key = config.get('api_key') or os.environ.get('OPENAI_API_KEY', '')
+        self.cache = cache
+        self.requests = 0
+        self.failures = 0
+        self._client = None
+
+    @property
+    def available(self) -> bool:
+        """Check whether fallback is enabled and has credentials (a local base_url needs none)"""
+        return self.enabled and bool(self.api_key or self.base_url)
+
+    def answer(self, question: str, stream: TextIO, embedding=None) -> Optional[str]:
+        """
+        Write the answer to a question to `stream`, from the cache if possible
+
+        Args:
+            question: The user's input
+            stream: Where the answer is written as it arrives
+            embedding: Sentence embedding of the input, used as the cache key
+
+        Returns:
+            The answer, or None if the model could not be reached
+        """
+        if self.cache:
+            match = self.cache.lookup(question, embedding)
+            if match:
+                entry, similarity = match
+                logger.debug(f"Semantic cache hit ({similarity:.2f}): {entry.query!r}")
+                stream.write(entry.response + "\n")
+                stream.flush()
+                return entry.response
+
+        response = self._complete(question, stream)
+        if response and self.cache:
+            self.cache.put(question, response, embedding)
+        return response
+
+    def _complete(self, question: str, stream: TextIO) -> Optional[str]:
+        """Stream a chat completion to `stream`"""
+        client = self._get_client()
+        if client is None:
+            return None
+
+        self.requests += 1
+        parts = []
+        try:
+            chunks = client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "system", "content": SYSTEM_PROMPT},
+                          {"role": "user", "content": question}],
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+            for chunk in chunks:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    parts.append(token)
+                    stream.write(token)
+                    stream.flush()
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"LLM fallback request failed: {e}")
+            if parts:
+                stream.write("\n")
+            # A partial answer is not worth caching
+            return None
+
+        stream.write("\n")
+        stream.flush()
+        return ''.join(parts)
+
+    def _get_client(self):
+        """Create the OpenAI client on first use"""
+        if self._client is None:
+            try:
+                from openai import OpenAI
+            except ImportError:
+                logger.warning("openai package not available, LLM fallback disabled")
+                self.enabled = False
+                return None
+
+            self._client = OpenAI(
+                # Local OpenAI-compatible servers accept any key
+                api_key=self.api_key or 'not-needed',
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0
+            )
+        return self._client
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"requests": self.requests, "failures": self.failures}
+        if self.cache:
+            stats.update({"cache_" + key: value for key, value in self.cache.stats().items()})
+        return stats
+
+
+def create_llm_fallback(config: Dict[str, Any] = None, cache: Optional[SemanticCache] = None) -> LLMFallback:
+    """Factory function to create LLM fallback"""
+    return LLMFallback(config, cache)
+
+
+if __name__ == "__main__":
+    # Ask the offline stub server (start it with `python openai_stub.py`)
+    import sys
+
+    try:
+        from .semantic_cache import create_semantic_cache
+    except ImportError:
+        from semantic_cache import create_semantic_cache
+
+    fallback = create_llm_fallback(
+        {'enabled': True, 'use_for_fallback': True, 'base_url': 'http://127.0.0.1:8765/v1'},
+        create_semantic_cache({'path': None})
+    )
+    question = ' '.join(sys.argv[1:]) or "what is the meaning of life"
+    fallback.answer(question, sys.stdout)
+    fallback.answer(question, sys.stdout)
+    print(fallback.stats())
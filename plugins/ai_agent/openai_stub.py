@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenAI-compatible Stub Server for Sarah AI Agent
+
+A tiny local server implementing the parts of the OpenAI API the agent's
+LLM fallback uses (`POST /v1/chat/completions`, streamed or not, and
+`GET /v1/models`), so the fallback path can be exercised offline. Answers are
+canned: the last user message is echoed back, one word per streamed chunk.
+
+Usage:
+    python openai_stub.py [--port 8765] [--delay 0.05]
+
+then set `"base_url": "http://127.0.0.1:8765/v1"` in the `openai` section
+of config.json.
+"""
+
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+STUB_MODEL = "sarah-stub"
+
+
+def _answer(messages: List[Dict[str, Any]]) -> str:
+    question = next((message.get('content', '') for message in reversed(messages)
+                     if message.get('role') == 'user'), '')
+    return f"(stub answer) You asked: {question}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves chat completions in the OpenAI wire format"""
+
+    server_version = "SarahOpenAIStub/1.0"
+    chunk_delay = 0.05
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/v1/models':
+            self._send_json({"object": "list", "data": [{"id": STUB_MODEL, "object": "model"}]})
+        else:
+            self._send_json({"error": {"message": "not found"}}, 404)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json({"error": {"message": "not found"}}, 404)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json({"error": {"message": "invalid JSON"}}, 400)
+            return
+
+        answer = _answer(request.get('messages', []))
+        model = request.get('model', STUB_MODEL)
+        completion_id = f"chatcmpl-stub-{int(time.time() * 1000)}"
+
+        if request.get('stream'):
+            self._stream(completion_id, model, answer)
+        else:
+            self._send_json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": answer}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(answer.split()), "total_tokens": 0}
+            })
+
+    def _stream(self, completion_id: str, model: str, answer: str) -> None:
+        """Send the answer as server-sent events, one word per chunk"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        words = answer.split(' ')
+        for index, word in enumerate(words):
+            delta = {"content": word if index == 0 else f" {word}"}
+            self._send_event(completion_id, model, delta, None)
+            time.sleep(self.chunk_delay)
+        self._send_event(completion_id, model, {}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, completion_id: str, model: str, delta: Dict[str, Any], finish_reason) -> None:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _send_json(self, data: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_stub_server(host: str = '127.0.0.1', port: int = 8765, delay: float = 0.05) -> ThreadingHTTPServer:
+    """Factory function to create the stub server (call serve_forever() to run it)"""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'chunk_delay': delay})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.05, help="Seconds between streamed chunks")
+    options = parser.parse_args()
+
+    server = create_stub_server(options.host, options.port, options.delay)
+    print(f"OpenAI stub listening on http://{options.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,845 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plugin Executor for Sarah AI Agent
+
+This module runs Sarah plugins on behalf of the agent. Plugins are activated
+directly through the libpeas engine the agent is already loaded in, with
+their output captured in-process. Plugins listed as isolated are still run
+as separate `sarah <plugin>` processes.
+
+Output is relayed line by line as it is produced, and only a bounded tail is
+kept for the conversation history, so memory use does not grow with the size
+of a plugin's output.
+
+Execution is driven by asyncio: every call gets a per-plugin timeout, a
+request can carry an overall deadline shared by all its calls, independent
+calls run concurrently, and cancellation (e.g. Ctrl-C) kills the process
+groups of running isolated plugins.
+
+Successful results of side-effect-free plugins can be served from a
+ResultCache, in which case the cached output is replayed to the stream
+without running the plugin. A stale result is replayed the same way while an
+isolated run refreshes it in the background, and plugins whose upstream
+service keeps failing are failed fast by a per-upstream circuit breaker.
+
+Plugins that publish a structured result (see plugin_result) have it read
+from their extension in-process, or from a side descriptor when isolated.
+Its status decides success, and its cacheability hint is honoured.
+"""
+
+import io
+import os
+import sys
+import signal
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, TextIO, Tuple
+from dataclasses import dataclass
+import logging
+
+try:
+    import gi
+    gi.require_version('Peas', '1.0')
+    gi.require_version('Sarah', '1.0')
+    from gi.repository import Peas, Sarah
+except (ImportError, ValueError):
+    # Running outside Sarah (e.g. direct execution); only subprocess mode works
+    Peas = None
+    Sarah = None
+
+try:
+    from .plugin_result import (PluginResult, RESULT_ATTRIBUTE, RESULT_FD_ENV,
+                                coerce as coerce_result, decode_frames)
+except ImportError:
+    # Fallback for direct execution
+    from plugin_result import (PluginResult, RESULT_ATTRIBUTE, RESULT_FD_ENV,
+                               coerce as coerce_result, decode_frames)
+
+logger = logging.getLogger(__name__)
+
+# File descriptors 1 and 2 are process-wide, so only one in-process plugin
+# can have its output captured at a time. A plugin left running past its
+# timeout keeps the capture, and the lock, until its thread ends; the event
+# is set meanwhile.
+_capture_lock = threading.Lock()
+_capture_abandoned = threading.Event()
+
+# Duplicate of fd 2 that log handlers write to, so log lines from other
+# threads never end up in a plugin's captured output
+_log_stream: Optional[TextIO] = None
+
+# Longest single line read from an isolated plugin's pipes
+_LINE_LIMIT = 1024 * 1024
+
+
+@dataclass
+class PluginCall:
+    """A single plugin invocation requested by the agent"""
+    plugin_name: str
+    args: List[str]
+    use_cache: bool = True
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of running a single plugin"""
+    plugin_name: str
+    args: List[str]
+    success: bool
+    output: str
+    error: Optional[str] = None
+    in_process: bool = True
+    truncated: bool = False
+    duration: float = 0.0
+    cached: bool = False
+    stale: bool = False
+    record: Optional[PluginResult] = None  # Structured result, if the plugin published one
+
+
+class OutputBuffer:
+    """Keeps the most recent lines of output up to a fixed number of characters"""
+
+    def __init__(self, max_chars: int = 4096):
+        self.max_chars = max_chars
+        self.truncated = False
+        self._lines: Deque[str] = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            if len(line) > self.max_chars:
+                line = line[-self.max_chars:]
+                self.truncated = True
+
+            self._lines.append(line)
+            self._size += len(line)
+
+            while self._size > self.max_chars:
+                self._size -= len(self._lines.popleft())
+                self.truncated = True
+
+    def getvalue(self) -> str:
+        with self._lock:
+            return ''.join(self._lines)
+
+
+class OrderedOutput:
+    """
+    Writes the output of concurrent calls to one stream in call order
+
+    Output of the earliest unfinished call is written through as it arrives;
+    output of later calls is held back until every call before them is done.
+    """
+
+    def __init__(self, stream: TextIO, count: int):
+        self.stream = stream
+        self._pending: List[List[str]] = [[] for _ in range(count)]
+        self._done = [False] * count
+        self._current = 0
+        self._lock = threading.Lock()
+
+    def slot(self, index: int) -> '_OrderedSlot':
+        """Get the stream that call `index` should write to"""
+        return _OrderedSlot(self, index)
+
+    def write(self, index: int, text: str) -> None:
+        with self._lock:
+            if index == self._current:
+                _write(self.stream, text)
+            else:
+                self._pending[index].append(text)
+
+    def finish(self, index: int) -> None:
+        """Mark call `index` complete, releasing held back output of later calls"""
+        with self._lock:
+            self._done[index] = True
+            while self._current < len(self._done) and self._done[self._current]:
+                self._current += 1
+                if self._current < len(self._pending):
+                    _write(self.stream, ''.join(self._pending[self._current]))
+                    self._pending[self._current] = []
+
+
+class _OrderedSlot:
+    """File-like view of one call's position in an OrderedOutput"""
+
+    def __init__(self, ordered: OrderedOutput, index: int):
+        self.ordered = ordered
+        self.index = index
+
+    def write(self, text: str) -> int:
+        if text:
+            self.ordered.write(self.index, text)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+class NullOutput(io.TextIOBase):
+    """Discards relayed plugin output; results keep their own bounded copy"""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def _write(stream: TextIO, text: str) -> None:
+    """Write relayed output, ignoring a reader that has gone away"""
+    try:
+        stream.write(text)
+        stream.flush()
+    except (OSError, ValueError):
+        pass
+
+
+class _OutputCapture:
+    """
+    Redirects stdout/stderr file descriptors into a pipe while a plugin runs
+
+    Capturing at the descriptor level also catches output from `os.system`
+    children, which most Sarah plugins use. Captured text is relayed to
+    `stream`; if that stream is the terminal itself it is swapped for a
+    duplicate of the original descriptor so relayed output is not captured
+    again.
+    """
+
+    def __init__(self, stream: TextIO, max_chars: int = 4096, lock: threading.Lock = None):
+        """
+        Args:
+            stream: Where captured output is relayed
+            max_chars: Characters of output kept in `buffer`
+            lock: Held by the caller; released once the descriptors are restored
+        """
+        self.stream = stream
+        self.buffer = OutputBuffer(max_chars)
+        self._lock = lock
+        self._saved_fds: Dict[int, int] = {}
+        self._terminal: Optional[TextIO] = None
+        self._reader: Optional[threading.Thread] = None
+        self._abandoned = False
+        self._holder: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        try:
+            return self._redirect()
+        except BaseException:
+            if self._lock is not None:
+                self._lock.release()
+            raise
+
+    def _redirect(self):
+        _detach_logging()
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        if _writes_to_std_fd(self.stream):
+            self._terminal = os.fdopen(os.dup(self.stream.fileno()), 'w',
+                                       encoding='utf-8', errors='replace')
+            self.stream = self._terminal
+
+        read_fd, write_fd = os.pipe()
+        for fd in (1, 2):
+            self._saved_fds[fd] = os.dup(fd)
+            os.dup2(write_fd, fd)
+        os.close(write_fd)
+
+        self._reader = threading.Thread(target=self._relay, args=(read_fd,), daemon=True)
+        self._reader.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._abandoned = True
+
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except (OSError, ValueError):
+            pass
+
+        for fd, saved in self._saved_fds.items():
+            os.dup2(saved, fd)
+            os.close(saved)
+
+        # All write ends are closed now, so the reader sees EOF. An abandoned
+        # plugin may still hold one through a child process, so don't wait.
+        if not self._abandoned:
+            self._reader.join()
+            if self._terminal:
+                self._terminal.close()
+
+        # The agent's own output needs the descriptors back, but no other
+        # capture may start while the abandoned plugin still runs
+        holder = self._holder
+        if holder is not None and holder.is_alive():
+            _capture_abandoned.set()
+            threading.Thread(target=self._release_after, args=(holder,), daemon=True).start()
+        else:
+            self._release()
+        return False
+
+    def abandon(self, holder: threading.Thread = None) -> None:
+        """
+        Stop relaying output of a plugin that is being left behind
+
+        The capture lock stays held until `holder` (the thread running the
+        plugin) ends, so its late output can't land in the capture of the
+        next plugin, nor its late result be read as that of a later run.
+        """
+        self._abandoned = True
+        self._holder = holder
+
+    def _release_after(self, holder: threading.Thread) -> None:
+        holder.join()
+        self._release()
+
+    def _release(self) -> None:
+        _capture_abandoned.clear()
+        if self._lock is not None:
+            self._lock.release()
+
+    def _relay(self, read_fd: int) -> None:
+        with os.fdopen(read_fd, 'r', encoding='utf-8', errors='replace') as pipe:
+            for line in pipe:
+                if self._abandoned:
+                    continue
+                self.buffer.append(line)
+                _write(self.stream, line)
+
+
+def _writes_to_std_fd(stream: TextIO) -> bool:
+    """Check whether a stream writes to the stdout/stderr descriptors"""
+    try:
+        return stream.fileno() in (1, 2)
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def _detach_logging() -> None:
+    """
+    Point log handlers writing to stdout/stderr at a duplicate of fd 2
+
+    While a plugin's output is captured, anything the daemon or the
+    prefetcher logs to fd 2 would otherwise go into the user's reply. Called
+    before the descriptors are redirected, with the capture lock held.
+    """
+    global _log_stream
+    if _log_stream is None:
+        _log_stream = os.fdopen(os.dup(2), 'w', encoding='utf-8', errors='replace', buffering=1)
+
+    loggers = [logging.getLogger()] + [entry for entry in logging.Logger.manager.loggerDict.values()
+                                       if isinstance(entry, logging.Logger)]
+    for each in loggers:
+        for handler in each.handlers:
+            if (type(handler) is logging.StreamHandler and handler.stream is not _log_stream
+                    and _writes_to_std_fd(handler.stream)):
+                handler.setStream(_log_stream)
+
+
+async def _relay_stream(reader: asyncio.StreamReader, stream: TextIO, buffer: OutputBuffer) -> None:
+    """Copy lines from a subprocess pipe to a stream as they arrive, keeping a bounded tail"""
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            # Line longer than the reader limit; relay what is buffered
+            line = await reader.read(_LINE_LIMIT)
+
+        if not line:
+            return
+
+        text = line.decode('utf-8', errors='replace')
+        buffer.append(text)
+        _write(stream, text)
+
+
+async def _read_frames(pipe, frames: bytearray) -> None:
+    """Collect what an isolated plugin writes to its result descriptor, up to a limit"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            if len(frames) + len(chunk) <= _LINE_LIMIT + 64:
+                frames.extend(chunk)
+    finally:
+        transport.close()
+
+
+def _apply_record(result: ExecutionResult, record: Optional[PluginResult]) -> ExecutionResult:
+    """Attach a published result, letting its status override the exit status"""
+    if record is None:
+        return result
+
+    if record.plugin != result.plugin_name:
+        logger.warning(f"Ignoring result published for {record.plugin} by {result.plugin_name}")
+        return result
+
+    result.record = record
+    if result.success and record.failed:
+        result.success = False
+        result.error = record.summary or "plugin reported an error"
+    return result
+
+
+def _kill_process_group(pid: int) -> None:
+    """Kill an isolated plugin together with any children it started"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class PluginExecutor:
+    """
+    Runs Sarah plugins in-process through libpeas, or isolated in a subprocess
+    """
+
+    def __init__(self, core: Any = None, config: Dict[str, Any] = None, cache: Any = None,
+                 breakers: Any = None, is_side_effect_free: Callable[[str], bool] = None):
+        """
+        Args:
+            core: The Sarah.Core whose libpeas engine runs plugins in-process
+            config: The `plugins` section of the agent configuration
+            cache: ResultCache for the results of side-effect-free plugins
+            breakers: Circuit breakers of the plugins' upstream services
+            is_side_effect_free: Whether a plugin only looks things up; others
+                are never cached, since replaying their output skips the effect
+                (e.g. opening a browser). Without it, the cache TTLs decide alone.
+        """
+        self.core = core
+        self.config = config or {}
+        self.cache = cache
+        self.breakers = breakers
+        self.is_side_effect_free = is_side_effect_free
+        self.isolated_plugins = set(self.config.get('isolated_plugins', []))
+        self.enable_subprocess = self.config.get('enable_subprocess', True)
+        self.default_timeout = self.config.get('execution_timeout', 30)
+        self.timeouts = self.config.get('timeouts', {})
+        self.request_deadline = self.config.get('request_deadline', 60)
+        self.max_parallel = max(1, self.config.get('max_parallel', 4))
+        self.isolate_parallel_calls = self.config.get('isolate_parallel_calls', True)
+        self.capture_chars = self.config.get('history_capture_chars', 4096)
+        self._extensions: Dict[str, Any] = {}
+        # Plugins that overran their timeout in-process; run isolated from then on
+        self._timed_out = set()
+        self._background = set()
+        self._background_lock = threading.Lock()
+
+    def timeout_for(self, plugin_name: str) -> float:
+        """Get the execution timeout configured for a plugin"""
+        return self.timeouts.get(plugin_name, self.default_timeout)
+
+    def deadline_for(self, calls: Sequence[PluginCall]) -> float:
+        """
+        Get how long a request making these calls may take, in seconds
+
+        A request of a single call may use all of that plugin's timeout, even
+        one longer than `request_deadline`.
+        """
+        if len(calls) == 1:
+            return max(self.request_deadline, self.timeout_for(calls[0].plugin_name))
+        return self.request_deadline
+
+    def execute(self, plugin_name: str, args: List[str], stream: TextIO = None,
+                use_cache: bool = True) -> ExecutionResult:
+        """
+        Run a plugin and relay its output to `stream`
+
+        Args:
+            plugin_name: Name of the Sarah plugin to run
+            args: Arguments passed to the plugin
+            stream: Where plugin output is written (defaults to stdout)
+            use_cache: Serve and store the result through the result cache
+
+        Returns:
+            ExecutionResult with the captured output
+        """
+        return asyncio.run(self.run(PluginCall(plugin_name, list(args), use_cache), stream))
+
+    def execute_many(self, calls: Sequence[PluginCall], streams: Sequence[TextIO] = None,
+                     on_complete: Callable[[int, ExecutionResult], None] = None) -> List[ExecutionResult]:
+        """Run independent plugin calls concurrently under one request deadline"""
+        return asyncio.run(self.run_many(calls, streams, on_complete=on_complete))
+
+    async def run(self, call: PluginCall, stream: TextIO = None,
+                  deadline: float = None, isolate: bool = False) -> ExecutionResult:
+        """
+        Run one plugin call within its timeout and the request deadline
+
+        Args:
+            call: Plugin and arguments to run
+            stream: Where plugin output is written (defaults to stdout)
+            deadline: Event loop time by which the whole request must finish
+            isolate: Run in a subprocess even if in-process dispatch is possible
+        """
+        stream = stream or sys.stdout
+        loop = asyncio.get_running_loop()
+
+        cached = self._from_cache(call, stream)
+        if cached is not None:
+            return cached
+
+        breaker = self.breakers.for_plugin(call.plugin_name) if self.breakers else None
+        if breaker is not None and not breaker.allow():
+            return ExecutionResult(call.plugin_name, call.args, False, "",
+                                   error=f"{breaker.name} is unavailable, try again later")
+
+        if deadline is None:
+            deadline = loop.time() + self.deadline_for([call])
+
+        timeout = min(self.timeout_for(call.plugin_name), deadline - loop.time())
+        if timeout <= 0:
+            return ExecutionResult(call.plugin_name, call.args, False, "",
+                                   error="Request deadline exceeded")
+
+        started = loop.time()
+        result = await self._dispatch_and_record(call, stream, timeout, isolate, breaker)
+        result.duration = loop.time() - started
+        return result
+
+    async def _dispatch_and_record(self, call: PluginCall, stream: TextIO, timeout: float,
+                                   isolate: bool, breaker: Any) -> ExecutionResult:
+        """Dispatch a call, reporting the outcome to its breaker and the cache"""
+        result = await self._dispatch(call, stream, timeout, isolate)
+
+        if breaker is not None:
+            if result.success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+        # A truncated capture can't be replayed faithfully
+        record = result.record
+        if (self._caches(call) and result.success and not result.truncated
+                and (record is None or record.cacheable is not False)):
+            self.cache.put(call.plugin_name, call.args, result.output,
+                           record.to_dict() if record else None, record.ttl if record else None)
+        return result
+
+    def _from_cache(self, call: PluginCall, stream: TextIO) -> Optional[ExecutionResult]:
+        """
+        Replay a cached result for the call to `stream`, if there is a usable one
+
+        Stale results are only served when they can be refreshed in the
+        background, which needs an isolated run: an in-process run would
+        capture the foreground request's output along with its own.
+        """
+        if not self._caches(call):
+            return None
+
+        entry = self.cache.get(call.plugin_name, call.args, allow_stale=self.enable_subprocess)
+        if entry is None:
+            return None
+
+        stale = not entry.is_fresh()
+        if stale:
+            self.run_in_background(call)
+
+        _write(stream, entry.output)
+        return ExecutionResult(call.plugin_name, call.args, True, entry.output,
+                               cached=True, stale=stale, record=coerce_result(entry.record))
+
+    def _caches(self, call: PluginCall) -> bool:
+        """Check whether a call's result may be served from and stored in the cache"""
+        return (self.cache is not None and call.use_cache
+                and (self.is_side_effect_free is None or self.is_side_effect_free(call.plugin_name)))
+
+    def run_in_background(self, call: PluginCall) -> bool:
+        """
+        Run a call isolated on a background thread, only for its result to be cached
+
+        Used to refresh stale results and to run calls speculatively. Each
+        call runs at most once at a time, and not at all if its result is
+        already cached and fresh.
+
+        Returns:
+            True if the call was started
+        """
+        if (not self._caches(call) or not self.enable_subprocess
+                or not self.cache.is_cacheable(call.plugin_name)
+                or self.cache.contains(call.plugin_name, call.args)):
+            return False
+
+        key = self.cache.make_key(call.plugin_name, call.args)
+        with self._background_lock:
+            if key in self._background:
+                return False
+            self._background.add(key)
+
+        def run() -> None:
+            try:
+                breaker = self.breakers.for_plugin(call.plugin_name) if self.breakers else None
+                if breaker is not None and not breaker.allow():
+                    return
+                asyncio.run(self._dispatch_and_record(call, NullOutput(), self.timeout_for(call.plugin_name),
+                                                      True, breaker))
+            except Exception as e:
+                logger.warning(f"Background run of {call.plugin_name} failed: {e}")
+            finally:
+                with self._background_lock:
+                    self._background.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    async def _dispatch(self, call: PluginCall, stream: TextIO, timeout: float,
+                        isolate: bool) -> ExecutionResult:
+        """Run a call in-process when possible, otherwise in a subprocess"""
+        in_process = (not isolate
+                      and call.plugin_name not in self.isolated_plugins
+                      and self.in_process_available())
+        # Rather than wait for a plugin left running past its timeout, which
+        # holds the capture until it ends, run isolated
+        if in_process and self.enable_subprocess and (call.plugin_name in self._timed_out
+                                                      or _capture_abandoned.is_set()):
+            in_process = False
+        if in_process:
+            return await self._run_in_process(call, stream, timeout)
+
+        if not self.enable_subprocess:
+            return ExecutionResult(call.plugin_name, call.args, False, "",
+                                   error="subprocess execution is disabled",
+                                   in_process=False)
+
+        return await self._run_subprocess(call, stream, timeout)
+
+    async def run_many(self, calls: Sequence[PluginCall], streams: Sequence[TextIO] = None,
+                       deadline: float = None,
+                       on_complete: Callable[[int, ExecutionResult], None] = None) -> List[ExecutionResult]:
+        """
+        Run independent plugin calls concurrently, at most `max_parallel` at a time
+
+        In-process calls share the process's stdout, so when several calls
+        are fanned out they run isolated (unless disabled by
+        `isolate_parallel_calls`) to let them actually overlap.
+
+        Args:
+            calls: Plugin calls to run
+            streams: Output stream for each call (defaults to stdout)
+            deadline: Event loop time by which all calls must finish
+            on_complete: Called with the index and result of each call as it finishes
+
+        Returns:
+            Results in the same order as `calls`
+        """
+        loop = asyncio.get_running_loop()
+        if deadline is None:
+            deadline = loop.time() + self.deadline_for(calls)
+        if streams is None:
+            streams = [None] * len(calls)
+
+        isolate = (self.isolate_parallel_calls and self.enable_subprocess
+                   and len(calls) > 1)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def bounded(index: int, call: PluginCall, stream: TextIO) -> ExecutionResult:
+            async with semaphore:
+                result = await self.run(call, stream, deadline, isolate)
+            if on_complete:
+                on_complete(index, result)
+            return result
+
+        return list(await asyncio.gather(*(bounded(index, call, stream)
+                                           for index, (call, stream) in enumerate(zip(calls, streams)))))
+
+    def in_process_available(self) -> bool:
+        """Check whether plugins can be activated through libpeas in this process"""
+        return Peas is not None and Sarah is not None and self._get_engine() is not None
+
+    def _get_engine(self):
+        """Get the libpeas engine owned by Sarah.Core, or the default one"""
+        engine = getattr(self.core, 'engine', None)
+        if engine is None and Peas is not None:
+            engine = Peas.Engine.get_default()
+        return engine
+
+    def _get_extension(self, plugin_name: str):
+        """Load a plugin and create its Sarah.IExtension, reusing earlier ones"""
+        extension = self._extensions.get(plugin_name)
+        if extension is not None:
+            return extension
+
+        engine = self._get_engine()
+        info = engine.get_plugin_info(plugin_name)
+        if info is None:
+            raise LookupError(f"Unknown plugin: {plugin_name}")
+
+        if not info.is_loaded() and not engine.load_plugin(info):
+            raise RuntimeError(f"Failed to load plugin: {plugin_name}")
+
+        if not engine.provides_extension(info, Sarah.IExtension):
+            raise RuntimeError(f"Plugin {plugin_name} does not provide Sarah.IExtension")
+
+        extension = engine.create_extension_with_properties(info, Sarah.IExtension, [], [])
+        if self.core is not None:
+            extension.set_property('object', self.core)
+
+        self._extensions[plugin_name] = extension
+        return extension
+
+    async def _run_in_process(self, call: PluginCall, stream: TextIO,
+                              timeout: float) -> ExecutionResult:
+        """
+        Activate the plugin's extension directly, capturing its output
+
+        The activation runs on a daemon thread. Threads cannot be killed, so a
+        plugin that overruns its timeout is reported as timed out and left to
+        finish on its own. Until it does, its output is dropped and the
+        capture stays held, so nothing else runs in-process meanwhile and its
+        late result cannot be read as that of a later run. The plugin is run
+        isolated from then on.
+        """
+        try:
+            extension = self._get_extension(call.plugin_name)
+        except Exception as e:
+            return ExecutionResult(call.plugin_name, call.args, False, "", error=str(e))
+
+        # Poll rather than block a thread, so waiting stays cancellable
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not _capture_lock.acquire(blocking=False):
+            if loop.time() >= deadline:
+                return ExecutionResult(call.plugin_name, call.args, False, "",
+                                       error="Command timed out")
+            await asyncio.sleep(0.01)
+
+        # The capture releases the lock once the descriptors are restored
+        record = None
+        with _OutputCapture(stream, self.capture_chars, _capture_lock) as capture:
+            thread, outcome = self._activate(extension, call.args)
+            try:
+                error, record = await asyncio.wait_for(outcome, timeout)
+            except asyncio.TimeoutError:
+                capture.abandon(thread)
+                self._timed_out.add(call.plugin_name)
+                logger.warning(f"{call.plugin_name} overran its timeout; running it isolated from now on")
+                error = "Command timed out"
+            except BaseException:
+                capture.abandon(thread)
+                raise
+
+        return _apply_record(ExecutionResult(call.plugin_name, call.args, error is None,
+                                             capture.buffer.getvalue(), error=error,
+                                             truncated=capture.buffer.truncated), record)
+
+    def _activate(self, extension, args: List[str]) -> Tuple[threading.Thread, asyncio.Future]:
+        """
+        Call extension.activate on a daemon thread
+
+        Returns:
+            The thread, and a future resolving to an error message if it
+            raised and the structured result it published
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(outcome: Tuple[Optional[str], Optional[PluginResult]]) -> None:
+            if not future.done():
+                future.set_result(outcome)
+
+        def target() -> None:
+            error = None
+            try:
+                # Extensions are reused, so drop the result of the previous run
+                setattr(extension, RESULT_ATTRIBUTE, None)
+            except (AttributeError, TypeError):
+                pass
+            try:
+                extension.activate(args)
+            except Exception as e:
+                error = str(e)
+            record = coerce_result(getattr(extension, RESULT_ATTRIBUTE, None))
+            try:
+                loop.call_soon_threadsafe(resolve, (error, record))
+            except RuntimeError:
+                # The request was cancelled and its event loop has closed
+                pass
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread, future
+
+    async def _run_subprocess(self, call: PluginCall, stream: TextIO,
+                              timeout: float) -> ExecutionResult:
+        """
+        Run the plugin as a separate `sarah` process, streaming its output
+
+        The plugin gets the write end of a pipe for its structured result,
+        its number passed in SARAH_RESULT_FD.
+        """
+        result_read, result_write = os.pipe()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'sarah', call.plugin_name, *call.args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+                limit=_LINE_LIMIT,
+                pass_fds=(result_write,),
+                env=dict(os.environ, **{RESULT_FD_ENV: str(result_write)})
+            )
+        except OSError as e:
+            os.close(result_read)
+            return ExecutionResult(call.plugin_name, call.args, False, "", error=str(e),
+                                   in_process=False)
+        finally:
+            os.close(result_write)
+
+        output = OutputBuffer(self.capture_chars)
+        errors = OutputBuffer(self.capture_chars)
+        result_pipe = os.fdopen(result_read, 'rb', buffering=0)
+        frames = bytearray()
+        error = None
+
+        async def communicate() -> None:
+            await asyncio.gather(
+                _relay_stream(process.stdout, stream, output),
+                _relay_stream(process.stderr, stream, errors),
+                _read_frames(result_pipe, frames),
+                process.wait()
+            )
+
+        try:
+            await asyncio.wait_for(communicate(), timeout)
+        except asyncio.TimeoutError:
+            error = "Command timed out"
+        finally:
+            # Also reached on cancellation; kill the whole group so children
+            # like curl release the pipes too
+            if process.returncode is None:
+                _kill_process_group(process.pid)
+                await process.wait()
+            result_pipe.close()
+
+        success = error is None and process.returncode == 0
+        if not success and error is None:
+            error = errors.getvalue().strip() or f"exit status {process.returncode}"
+
+        records = decode_frames(bytes(frames)) if success else []
+        return _apply_record(ExecutionResult(call.plugin_name, call.args, success, output.getvalue(),
+                                             error=error, in_process=False, truncated=output.truncated),
+                             records[-1] if records else None)
+
+
+def create_plugin_executor(core: Any = None, config: Dict[str, Any] = None,
+                           cache: Any = None, breakers: Any = None,
+                           is_side_effect_free: Callable[[str], bool] = None) -> PluginExecutor:
+    """Factory function to create plugin executor"""
+    return PluginExecutor(core, config, cache, breakers, is_side_effect_free)
+
+
+if __name__ == "__main__":
+    # Run a plugin through the executor: python plugin_executor.py <plugin> [args...]
+    logging.basicConfig(level=logging.INFO)
+
+    executor = create_plugin_executor(config={'execution_timeout': 30})
+    result = executor.execute(sys.argv[1] if len(sys.argv) > 1 else 'time', sys.argv[2:])
+    print(f"success={result.success} in_process={result.in_process} error={result.error}")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Structured Plugin Results for Sarah AI Agent
+
+Sarah plugins print human-readable text, which is all the agent could see of
+what they did. This module defines an optional structured channel next to
+that text: a plugin may publish a typed record with its fields, a status and
+a hint on whether its result may be cached.
+
+A plugin run in-process publishes the record by setting it (a PluginResult
+or a plain dict) as the `sarah_result` attribute of its extension, where the
+executor reads it directly once `do_activate` returns. A plugin run as a
+`sarah <plugin>` subprocess finds a file descriptor number in the
+SARAH_RESULT_FD environment variable and writes the record there as a
+frame: the payload's length in bytes on one line, followed by the UTF-8 JSON
+payload and a newline. `publish()` does both.
+
+Plugins keep printing their text as before, so the structured channel never
+replaces what the user sees.
+"""
+
+import os
+import json
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+RESULT_ATTRIBUTE = "sarah_result"
+RESULT_FD_ENV = "SARAH_RESULT_FD"
+
+STATUS_OK = "ok"
+STATUS_EMPTY = "empty"
+STATUS_ERROR = "error"
+STATUSES = (STATUS_OK, STATUS_EMPTY, STATUS_ERROR)
+
+# Largest frame accepted from a plugin
+MAX_FRAME_BYTES = 1024 * 1024
+
+
+@dataclass
+class PluginResult:
+    """Structured outcome of a plugin run"""
+    plugin: str
+    status: str = STATUS_OK
+    fields: Dict[str, Any] = field(default_factory=dict)
+    summary: str = ""  # One line for the user and the conversation history
+    cacheable: Optional[bool] = None  # None leaves it to the cache configuration
+    ttl: Optional[float] = None  # Seconds the result stays fresh, if cacheable
+
+    @property
+    def failed(self) -> bool:
+        return self.status == STATUS_ERROR
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['version'] = PROTOCOL_VERSION
+        return {key: value for key, value in data.items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PluginResult':
+        """Build a record from its dict form, raising ValueError if it is malformed"""
+        if not isinstance(data, dict):
+            raise ValueError("result must be a JSON object")
+        if not isinstance(data.get('plugin'), str):
+            raise ValueError("result needs a plugin name")
+
+        status = data.get('status', STATUS_OK)
+        if status not in STATUSES:
+            raise ValueError(f"unknown result status: {status!r}")
+
+        fields = data.get('fields', {})
+        if not isinstance(fields, dict):
+            raise ValueError("result fields must be an object")
+
+        ttl = data.get('ttl')
+        return cls(
+            plugin=data['plugin'],
+            status=status,
+            fields=fields,
+            summary=str(data.get('summary', '')),
+            cacheable=None if data.get('cacheable') is None else bool(data['cacheable']),
+            ttl=None if ttl is None else float(ttl)
+        )
+
+    def describe(self) -> str:
+        """Get a compact one-line description, for when no summary was given"""
+        if self.summary:
+            return self.summary
+        return ", ".join(f"{key}: {value}" for key, value in self.fields.items()) or self.status
+
+
+def coerce(value: Union[PluginResult, Dict[str, Any], None]) -> Optional[PluginResult]:
+    """Turn a published record into a PluginResult, dropping it if it is malformed"""
+    if value is None or isinstance(value, PluginResult):
+        return value
+
+    try:
+        return PluginResult.from_dict(value)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Ignoring malformed plugin result: {e}")
+        return None
+
+
+def encode_frame(record: Union[PluginResult, Dict[str, Any]]) -> bytes:
+    """
+    Frame a record for the result descriptor
+
+    This is the wire format; plugins that can't import this module (whois,
+    weather) write the same frames themselves and must follow it.
+    """
+    data = record.to_dict() if isinstance(record, PluginResult) else record
+    payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return b"%d\n%s\n" % (len(payload), payload)
+
+
+def decode_frames(data: bytes) -> List[PluginResult]:
+    """Read the records a plugin wrote to its result descriptor, skipping malformed ones"""
+    records = []
+    position = 0
+    while position < len(data):
+        newline = data.find(b"\n", position)
+        if newline < 0:
+            break
+
+        try:
+            length = int(data[position:newline])
+        except ValueError:
+            logger.warning("Ignoring plugin result output with a bad frame header")
+            break
+        if length < 0 or length > MAX_FRAME_BYTES:
+            logger.warning(f"Ignoring plugin result frame of {length} bytes")
+            break
+
+        start = newline + 1
+        payload = data[start:start + length]
+        if len(payload) < length:
+            logger.warning("Ignoring truncated plugin result frame")
+            break
+        position = start + length + 1
+
+        try:
+            record = coerce(json.loads(payload.decode('utf-8')))
+        except ValueError as e:
+            logger.warning(f"Ignoring plugin result that is not JSON: {e}")
+            continue
+        if record is not None:
+            records.append(record)
+
+    return records
+
+
+def publish(extension: Any, record: Union[PluginResult, Dict[str, Any]]) -> None:
+    """
+    Publish a plugin's structured result (call from do_activate)
+
+    Sets it on the extension for an in-process caller and, when run as a
+    subprocess with SARAH_RESULT_FD set, also writes it there.
+    """
+    setattr(extension, RESULT_ATTRIBUTE, record)
+
+    fd = os.environ.get(RESULT_FD_ENV)
+    if not fd:
+        return
+    try:
+        os.write(int(fd), encode_frame(record))
+    except (OSError, ValueError) as e:
+        logger.debug(f"Could not write plugin result: {e}")
+
+
+if __name__ == "__main__":
+    # Round-trip a record through the frame encoding
+    record = PluginResult("weather", fields={"location": "London", "temperature_c": 14},
+                          summary="London: 14°C, light rain", ttl=600)
+    frames = encode_frame(record) + encode_frame({"plugin": "time", "status": "bogus"})
+    print(frames)
+    print(decode_frames(frames))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Predictive Prefetcher for Sarah AI Agent
+
+This module warms the result cache with the user's most likely next
+requests, so habitual queries (the weather and prayer times for their usual
+city) are answered from the cache. Predictions come from the conversation
+manager's learned preferences: the most used plugins, each replayed with the
+entities of the user's last successful request for it. Plugins whose
+requests keep failing are left out.
+
+Prefetching runs when a session starts and whenever the agent has been idle
+for a while, on a background thread with a cap on concurrent fetches.
+Prefetched calls always run isolated, so they never capture the output of a
+request being handled in the foreground.
+"""
+
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List
+import logging
+
+try:
+    from .ai_core import Intent
+    from .plugin_executor import NullOutput, PluginCall
+except ImportError:
+    # Fallback for direct execution
+    from ai_core import Intent
+    from plugin_executor import NullOutput, PluginCall
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Runs predicted plugin calls in the background to warm the result cache
+    """
+
+    def __init__(self, executor, conversation_manager, prepare_args: Callable,
+                 is_side_effect_free: Callable[[str], bool], config: Dict[str, Any] = None):
+        config = config or {}
+        self.executor = executor
+        self.conversation_manager = conversation_manager
+        self.prepare_args = prepare_args
+        self.is_side_effect_free = is_side_effect_free
+        self.max_concurrent = max(1, config.get('max_concurrent', 2))
+        self.max_predictions = config.get('max_predictions', 3)
+        self.min_uses = config.get('min_uses', 2)
+        self.min_success_rate = config.get('min_success_rate', 0.5)
+        self.idle_seconds = config.get('idle_seconds', 300)
+
+        self.last_activity = time.monotonic()
+        self.prefetched = 0
+        self.used = 0
+        self._pending_keys = set()
+        self._running = False
+        self._idle_prefetched = False
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def predict(self) -> List[PluginCall]:
+        """Predict the user's most likely next plugin calls"""
+        stats = self.conversation_manager.stats
+        last_requests = self.conversation_manager.get_user_preferences().get('last_requests', {})
+
+        calls = []
+        for plugin_name, count in stats.top_plugins(None):
+            if len(calls) >= self.max_predictions or count < self.min_uses:
+                break
+            if not self.is_side_effect_free(plugin_name):
+                continue
+            success_rate = stats.success_rate(plugin_name)
+            if success_rate is not None and success_rate < self.min_success_rate:
+                continue
+
+            request = last_requests.get(plugin_name)
+            if request is None:
+                continue
+
+            intent = Intent(plugin_name, 1.0, request['entities'], request['user_input'])
+            calls.append(PluginCall(plugin_name, self.prepare_args(intent)))
+
+        return calls
+
+    def prefetch(self) -> bool:
+        """
+        Start prefetching predicted calls on a background thread
+
+        Returns:
+            False if a prefetch is already running or there is nothing to fetch
+        """
+        cache = self.executor.cache
+        if cache is None:
+            return False
+
+        calls = [call for call in self.predict()
+                 if cache.is_cacheable(call.plugin_name) and not cache.contains(call.plugin_name, call.args)]
+        with self._lock:
+            if self._running or not calls:
+                return False
+            self._running = True
+
+        threading.Thread(target=self._run, args=(calls,), daemon=True).start()
+        return True
+
+    def _run(self, calls: List[PluginCall]) -> None:
+        try:
+            asyncio.run(self._fetch_all(calls))
+        except Exception as e:
+            logger.warning(f"Prefetch failed: {e}")
+        finally:
+            with self._lock:
+                self._running = False
+
+    async def _fetch_all(self, calls: List[PluginCall]) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def fetch(call: PluginCall) -> None:
+            async with semaphore:
+                result = await self.executor.run(call, NullOutput(), isolate=True)
+            if result.success and not result.cached:
+                with self._lock:
+                    self.prefetched += 1
+                    self._pending_keys.add(self.executor.cache.make_key(call.plugin_name, call.args))
+                logger.debug(f"Prefetched {call.plugin_name} {call.args}")
+
+        await asyncio.gather(*(fetch(call) for call in calls))
+
+    def record_result(self, result) -> None:
+        """Note a foreground result, counting it as a prefetch hit if it came from a prefetch"""
+        self.touch()
+        if not result.cached or self.executor.cache is None:
+            return
+
+        key = self.executor.cache.make_key(result.plugin_name, result.args)
+        with self._lock:
+            if key in self._pending_keys:
+                self._pending_keys.discard(key)
+                self.used += 1
+
+    def touch(self) -> None:
+        """Mark the agent as active, restarting the idle timer"""
+        self.last_activity = time.monotonic()
+        self._idle_prefetched = False
+
+    def start_idle_watch(self) -> None:
+        """Prefetch again each time the agent has been idle for `idle_seconds`"""
+        if self.idle_seconds <= 0:
+            return
+        threading.Thread(target=self._watch_idle, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _watch_idle(self) -> None:
+        while not self._stopped.wait(min(self.idle_seconds, 30)):
+            idle = time.monotonic() - self.last_activity
+            if idle >= self.idle_seconds and not self._idle_prefetched:
+                self._idle_prefetched = True
+                self.prefetch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how many prefetched results were fetched and later used"""
+        with self._lock:
+            return {
+                "prefetched": self.prefetched,
+                "used": self.used,
+                "hit_rate": self.used / self.prefetched if self.prefetched else 0.0
+            }
+
+
+def create_prefetcher(executor, conversation_manager, prepare_args: Callable,
+                      is_side_effect_free: Callable[[str], bool],
+                      config: Dict[str, Any] = None) -> Prefetcher:
+    """Factory function to create prefetcher"""
+    return Prefetcher(executor, conversation_manager, prepare_args, is_side_effect_free, config)
+
+
+if __name__ == "__main__":
+    # Show the predictions for a sample history, saved to and reloaded from a
+    # temporary conversation log
+    import os
+    import tempfile
+
+    try:
+        from .conversation_log import create_conversation_log
+        from .conversation_manager import create_conversation_manager
+        from .plugin_executor import create_plugin_executor
+    except ImportError:
+        from conversation_log import create_conversation_log
+        from conversation_manager import create_conversation_manager
+        from plugin_executor import create_plugin_executor
+
+    log_path = os.path.join(tempfile.mkdtemp(), 'conversation_log.jsonl')
+    recorder = create_conversation_manager()
+    recorder.open_log(create_conversation_log(log_path, fsync=False))
+    recorder.start_conversation()
+    for user_input, plugin, entities, successful in (
+            ("weather in London", "weather", {"gpe": "London", "search_terms": ["London"]}, True),
+            ("python decorators", "wiki", {"search_terms": ["python", "decorators"]}, True),
+            ("weather in London", "weather", {"gpe": "London", "search_terms": ["London"]}, True),
+            ("search for cats", "google", {"search_terms": ["cats"]}, True),
+            ("search for dogs", "google", {"search_terms": ["dogs"]}, True),
+            ("python generators", "wiki", {"search_terms": ["python", "generators"]}, True)):
+        recorder.add_turn(user_input, plugin, 0.9, entities, "ok", successful)
+
+    manager = create_conversation_manager()
+    manager.open_log(create_conversation_log(log_path, fsync=False))
+
+    prefetcher = create_prefetcher(
+        create_plugin_executor(),
+        manager,
+        lambda intent: intent.entities.get('search_terms', []),
+        lambda plugin_name: plugin_name in ('weather', 'adhan', 'wiki', 'whois', 'watch')
+    )
+    for call in prefetcher.predict():
+        print(call)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Redis Session Store for Sarah AI Agent
+
+Conversation sessions kept in Redis, so agent processes on any number of
+hosts share them without a file lock. Each session is a hash holding its
+header, next to a list of its most recent turns as JSON, and both expire on
+the server `ttl_days` after the session was last used. A sorted set indexes
+the sessions by last interaction, for resuming the latest one and for time
+range queries.
+
+Every write to a session (its turn, its header, the trimmed turn list, the
+refreshed expiry and the index entry) goes in one pipelined MULTI/EXEC, so
+recording a turn costs a single round trip. Connections come from a shared
+pool. With `"fake": true` an in-process stand-in is used instead of a
+server.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+try:
+    from .conversation_manager import ConversationContext, ConversationTurn
+    from .session_backend import SessionBackend
+except ImportError:
+    # Fallback for direct execution
+    from conversation_manager import ConversationContext, ConversationTurn
+    from session_backend import SessionBackend
+
+logger = logging.getLogger(__name__)
+
+
+def _turn_to_json(turn: ConversationTurn) -> str:
+    return json.dumps({
+        'timestamp': turn.timestamp.timestamp(),
+        'user_input': turn.user_input,
+        'intent_plugin': turn.intent_plugin,
+        'intent_confidence': turn.intent_confidence,
+        'entities': turn.entities,
+        'sarah_response': turn.sarah_response,
+        'execution_successful': turn.execution_successful,
+        'result': turn.result
+    }, ensure_ascii=False, default=str)
+
+
+def _turn_from_json(data: str) -> ConversationTurn:
+    turn = json.loads(data)
+    turn['timestamp'] = datetime.fromtimestamp(turn['timestamp'])
+    return ConversationTurn(**turn)
+
+
+class RedisSessionStore(SessionBackend):
+    """
+    Conversation history shared through Redis
+    """
+
+    def __init__(self, client, prefix: str = 'sarah:', ttl_days: float = 30, max_turns: int = 100):
+        """
+        Args:
+            client: redis-py client (or FakeRedis) returning str responses
+            prefix: Prefix of every key, so several agents can share a server
+            ttl_days: Sessions expire on the server this long after their last use
+            max_turns: Most recent turns kept per session
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl = max(1, int(ttl_days * 86400))
+        self.max_turns = max_turns
+        self.index = f"{prefix}sessions"
+
+    def save_session(self, context: ConversationContext) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_session(pipe, context)
+        pipe.execute()
+
+    def append_turn(self, context: ConversationContext, turn: ConversationTurn) -> None:
+        turns = self._turns_key(context.session_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(turns, _turn_to_json(turn))
+        pipe.ltrim(turns, -self.max_turns, -1)
+        pipe.expireat(turns, self._expires_at(context))
+        self._queue_session(pipe, context)
+        pipe.execute()
+
+    def append_turns(self, turns: List[Tuple[ConversationContext, ConversationTurn]]) -> None:
+        latest = {context.session_id: context for context, _ in turns}
+        pipe = self.client.pipeline(transaction=True)
+        for context, turn in turns:
+            pipe.rpush(self._turns_key(context.session_id), _turn_to_json(turn))
+        for context in latest.values():
+            key = self._turns_key(context.session_id)
+            pipe.ltrim(key, -self.max_turns, -1)
+            pipe.expireat(key, self._expires_at(context))
+            self._queue_session(pipe, context)
+        pipe.execute()
+
+    def import_sessions(self, contexts: List[ConversationContext]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for context in contexts:
+            turns = self._turns_key(context.session_id)
+            recent = [_turn_to_json(turn) for turn in context.turns[-self.max_turns:]]
+            pipe.delete(turns)
+            if recent:
+                pipe.rpush(turns, *recent)
+                pipe.expireat(turns, self._expires_at(context))
+            self._queue_session(pipe, context)
+        pipe.execute()
+
+    def latest_session(self, since: datetime = None, max_turns: int = 10) -> Optional[ConversationContext]:
+        low = since.timestamp() if since is not None else '-inf'
+        # Index entries can outlive sessions that expired on the server; skip those
+        for session_id in self.client.zrevrangebyscore(self.index, '+inf', low, start=0, num=5):
+            context = self.get_session(session_id, max_turns)
+            if context is not None:
+                return context
+            self.client.zrem(self.index, session_id)
+        return None
+
+    def get_session(self, session_id: str, max_turns: int = 10) -> Optional[ConversationContext]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._session_key(session_id))
+        pipe.lrange(self._turns_key(session_id), -max_turns, -1)
+        header, turns = pipe.execute()
+        if not header:
+            return None
+        return self._context_from_hash(session_id, header, [_turn_from_json(turn) for turn in turns])
+
+    def turns_between(self, start: datetime = None, end: datetime = None,
+                      limit: int = 100) -> List[Dict[str, Any]]:
+        # Only sessions active since `start` can hold turns in the range
+        low = start.timestamp() if start is not None else '-inf'
+        session_ids = self.client.zrevrangebyscore(self.index, '+inf', low)
+        if not session_ids:
+            return []
+
+        pipe = self.client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.lrange(self._turns_key(session_id), 0, -1)
+
+        turns = []
+        for session_id, stored in zip(session_ids, pipe.execute()):
+            for data in stored:
+                turn = _turn_from_json(data)
+                if (start is None or turn.timestamp >= start) and (end is None or turn.timestamp < end):
+                    turns.append({'session_id': session_id, 'turn': turn})
+        turns.sort(key=lambda item: item['turn'].timestamp, reverse=True)
+        return turns[:limit]
+
+    def delete_before(self, cutoff: datetime, keep_latest: bool = True) -> int:
+        expired = self.client.zrangebyscore(self.index, '-inf', f"({cutoff.timestamp()}")
+        if keep_latest and expired:
+            # The latest session carries the learned preferences
+            latest = self.client.zrevrange(self.index, 0, 0)
+            expired = [session_id for session_id in expired if session_id not in latest]
+        if not expired:
+            return 0
+
+        pipe = self.client.pipeline(transaction=True)
+        for session_id in expired:
+            pipe.delete(self._session_key(session_id), self._turns_key(session_id))
+        pipe.zrem(self.index, *expired)
+        pipe.execute()
+        return len(expired)
+
+    def count_sessions(self) -> int:
+        return self.client.zcard(self.index)
+
+    def close(self) -> None:
+        pool = getattr(self.client, 'connection_pool', None)
+        if pool is not None:
+            pool.disconnect()
+        else:
+            self.client.close()
+
+    def _queue_session(self, pipe, context: ConversationContext) -> None:
+        key = self._session_key(context.session_id)
+        last_interaction = context.last_interaction.timestamp()
+        pipe.hset(key, mapping={
+            'started_at': context.started_at.timestamp(),
+            'last_interaction': last_interaction,
+            # Redis has no null, so every field is JSON
+            'active_topic': json.dumps(context.active_topic),
+            'user_preferences': json.dumps(context.user_preferences, ensure_ascii=False, default=str),
+            'location_context': json.dumps(context.location_context)
+        })
+        pipe.expireat(key, self._expires_at(context))
+        pipe.zadd(self.index, {context.session_id: last_interaction})
+        # Drop index entries of sessions the server has expired by now
+        pipe.zremrangebyscore(self.index, '-inf', f"({last_interaction - self.ttl}")
+
+    def _expires_at(self, context: ConversationContext) -> int:
+        return int(context.last_interaction.timestamp()) + self.ttl
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.prefix}session:{session_id}"
+
+    def _turns_key(self, session_id: str) -> str:
+        return f"{self.prefix}turns:{session_id}"
+
+    @staticmethod
+    def _context_from_hash(session_id: str, header: Dict[str, str],
+                           turns: List[ConversationTurn]) -> ConversationContext:
+        return ConversationContext(
+            session_id=session_id,
+            started_at=datetime.fromtimestamp(float(header['started_at'])),
+            last_interaction=datetime.fromtimestamp(float(header['last_interaction'])),
+            turns=turns,
+            active_topic=json.loads(header.get('active_topic', 'null')),
+            user_preferences=json.loads(header.get('user_preferences', 'null')),
+            location_context=json.loads(header.get('location_context', 'null'))
+        )
+
+
+def create_redis_session_store(config: Dict[str, Any] = None) -> RedisSessionStore:
+    """
+    Factory function to create Redis session store
+
+    The client connects lazily, so the server is pinged here: an unreachable
+    server would otherwise only show when the first write fails.
+
+    Raises:
+        ImportError: If the redis package is not installed (unless `fake` is set)
+        ConnectionError: If the server can't be reached
+    """
+    config = config or {}
+    if config.get('fake', False):
+        try:
+            from .fake_redis import create_fake_redis
+        except ImportError:
+            # Fallback for direct execution
+            from fake_redis import create_fake_redis
+        client = create_fake_redis()
+    else:
+        import redis
+        pool = redis.ConnectionPool.from_url(
+            config.get('url', 'redis://localhost:6379/0'),
+            max_connections=config.get('max_connections', 8),
+            socket_timeout=config.get('socket_timeout', 2),
+            decode_responses=True
+        )
+        client = redis.Redis(connection_pool=pool)
+        try:
+            client.ping()
+        except redis.RedisError as e:
+            pool.disconnect()
+            raise ConnectionError(f"Redis at {config.get('url', 'redis://localhost:6379/0')} "
+                                  f"is unreachable: {e}") from e
+
+    return RedisSessionStore(
+        client,
+        config.get('prefix', 'sarah:'),
+        config.get('ttl_days', 30),
+        config.get('max_turns', 100)
+    )
+
+
+if __name__ == "__main__":
+    # Exercise the store against a local redis-server, or the in-process
+    # stand-in when run with --fake
+    import sys
+    import time
+    from datetime import timedelta
+
+    store = create_redis_session_store({'fake': '--fake' in sys.argv, 'prefix': 'sarah-demo:'})
+    now = datetime.now()
+    context = ConversationContext("demo", now, now, [], user_preferences={'preferred_plugins': {}})
+    store.save_session(context)
+
+    started = time.perf_counter()
+    for n in range(200):
+        turn = ConversationTurn(datetime.now(), f"weather {n}", "weather", 0.9, {"gpe": "London"}, "Sunny", True)
+        context.last_interaction = turn.timestamp
+        store.append_turn(context, turn)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{elapsed_ms / 200:.3f}ms per turn (one round trip each)")
+
+    resumed = store.latest_session(now - timedelta(minutes=1), max_turns=10)
+    print(f"Resumed {resumed.session_id} with {len(resumed.turns)} of {store.max_turns} kept turns")
+    print(f"{len(store.turns_between(now, limit=1000))} turns since start")
+    print(f"Deleted {store.delete_before(datetime.now() + timedelta(seconds=1), keep_latest=False)}")
+    store.close()
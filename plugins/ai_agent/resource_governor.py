@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resource Governor for Sarah AI Agent
+
+torch and spaCy size their thread pools to every core on the machine and
+keep their weights resident for as long as the process lives. In the
+interactive REPL and the daemon that means hundreds of MB held while the
+agent sits idle, and inference bursts that compete with everything else on
+a shared box.
+
+This module limits the inference thread pools and the CPUs the agent may
+run on, caps how many inputs the sentence encoder processes per batch, and
+calls back into the AI core to unload its models once they have been idle
+for a while. It also samples the resident set size so `status` can show
+memory use over time.
+"""
+
+import os
+import gc
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def current_rss() -> Optional[int]:
+    """Get the resident set size of this process in bytes, or None if unknown"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+        import sys
+        # Peak rather than current RSS; reported in bytes on macOS, KiB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def _release_memory() -> None:
+    """Collect garbage and hand freed heap pages back to the OS where possible"""
+    gc.collect()
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class ResourceGovernor:
+    """
+    Limits the CPU use of model inference and unloads idle models
+    """
+
+    def __init__(self, config: Dict[str, Any] = None, unload_models: Callable[[], bool] = None):
+        config = config or {}
+        self.intra_op_threads = config.get('intra_op_threads', 2)
+        self.interop_threads = config.get('interop_threads', 1)
+        self.cpu_affinity: List[int] = list(config.get('cpu_affinity', []))
+        self.encoder_batch_size = max(1, config.get('encoder_batch_size', 16))
+        self.max_seq_length = config.get('max_seq_length', 128)
+        self.idle_seconds = config.get('idle_unload_minutes', 15) * 60
+        self.sample_seconds = max(1, config.get('rss_sample_seconds', 60))
+        self.unload_models = unload_models
+
+        self.last_used = time.monotonic()
+        self.unloads = 0
+        self.peak_rss = 0
+        self.rss_history = deque(maxlen=config.get('rss_history', 60))
+        self._active = 0
+        self._started = False
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def limit_threads(self) -> None:
+        """
+        Apply the CPU affinity and thread pool limits
+
+        Call this before the NLP libraries are imported, so that thread pools
+        created at import time are sized by the limits, and again afterwards
+        to configure torch itself.
+        """
+        if self.cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, self.cpu_affinity)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not set CPU affinity to {self.cpu_affinity}: {e}")
+
+        if self.intra_op_threads <= 0:
+            return
+
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(self.intra_op_threads)
+
+        try:
+            from threadpoolctl import threadpool_limits
+            # Without a `with` block the limits stay in place
+            threadpool_limits(limits=self.intra_op_threads)
+        except ImportError:
+            pass
+
+        torch = self._torch()
+        if torch is not None:
+            torch.set_num_threads(self.intra_op_threads)
+            if self.interop_threads > 0:
+                try:
+                    torch.set_num_interop_threads(self.interop_threads)
+                except RuntimeError:
+                    # Only allowed before torch has run any parallel work
+                    pass
+
+    def configure_encoder(self, sentence_model) -> None:
+        """Cap the sequence length a sentence model pads its batches to"""
+        if self.max_seq_length and getattr(sentence_model, 'max_seq_length', None):
+            sentence_model.max_seq_length = min(sentence_model.max_seq_length, self.max_seq_length)
+
+    @contextmanager
+    def in_use(self):
+        """Mark the models as in use, so they are not unloaded until the block exits"""
+        with self._lock:
+            self._active += 1
+            self.last_used = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self.last_used = time.monotonic()
+
+    def start(self) -> None:
+        """Start sampling RSS and unloading idle models on a daemon thread"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.sample()
+        threading.Thread(target=self._watch, name="resource-governor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _watch(self) -> None:
+        interval = self.sample_seconds
+        if self.idle_seconds > 0:
+            interval = min(interval, self.idle_seconds, 30)
+        next_sample = time.monotonic() + self.sample_seconds
+
+        while not self._stopped.wait(interval):
+            if time.monotonic() >= next_sample:
+                self.sample()
+                next_sample += self.sample_seconds
+            if self.idle_seconds > 0:
+                self.unload_if_idle()
+
+    def unload_if_idle(self) -> bool:
+        """Unload the models if nothing has used them for the idle period"""
+        if self.unload_models is None:
+            return False
+
+        with self._lock:
+            # Holding the lock keeps requests from starting during the unload
+            if self._active or time.monotonic() - self.last_used < self.idle_seconds:
+                return False
+            if not self.unload_models():
+                return False
+            self.unloads += 1
+
+        before = current_rss()
+        _release_memory()
+        after = current_rss()
+        if before and after:
+            logger.info(f"Unloaded idle models, RSS {before / 2**20:.0f} MB -> {after / 2**20:.0f} MB")
+        self.sample()
+        return True
+
+    def sample(self) -> Optional[int]:
+        """Record the current RSS"""
+        rss = current_rss()
+        if rss is not None:
+            with self._lock:
+                self.rss_history.append((time.time(), rss))
+                self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the thread settings in effect and the RSS samples"""
+        rss = current_rss()
+        torch = self._torch()
+        affinity = None
+        if hasattr(os, 'sched_getaffinity'):
+            affinity = sorted(os.sched_getaffinity(0))
+
+        with self._lock:
+            return {
+                "rss_bytes": rss,
+                "peak_rss_bytes": max(self.peak_rss, rss or 0),
+                "rss_history": list(self.rss_history),
+                "intra_op_threads": torch.get_num_threads() if torch else self.intra_op_threads,
+                "interop_threads": torch.get_num_interop_threads() if torch else self.interop_threads,
+                "cpu_affinity": affinity,
+                "encoder_batch_size": self.encoder_batch_size,
+                "idle_unload_seconds": self.idle_seconds,
+                "unloads": self.unloads
+            }
+
+    @staticmethod
+    def _torch():
+        """Get torch if something has already imported it; never import it here"""
+        import sys
+        return sys.modules.get('torch')
+
+
+def create_resource_governor(config: Dict[str, Any] = None,
+                             unload_models: Callable[[], bool] = None) -> ResourceGovernor:
+    """Factory function to create resource governor"""
+    return ResourceGovernor(config, unload_models)
+
+
+if __name__ == "__main__":
+    # Unload a large buffer standing in for model weights once it is idle
+    models = {'weights': bytearray(200 * 2**20)}
+
+    def unload() -> bool:
+        return models.pop('weights', None) is not None
+
+    governor = create_resource_governor({'idle_unload_minutes': 0.01, 'rss_sample_seconds': 1}, unload)
+    governor.limit_threads()
+    with governor.in_use():
+        print(f"RSS in use: {governor.sample() / 2**20:.0f} MB")
+    time.sleep(1)
+    print("unloaded:", governor.unload_if_idle())
+    print(f"RSS idle: {current_rss() / 2**20:.0f} MB")
+    print({key: value for key, value in governor.snapshot().items() if key != 'rss_history'})
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Result Cache for Sarah AI Agent
+
+This module caches plugin output keyed by plugin name and normalized
+arguments, so repeated lookups (the same wiki topic, the weather for the
+same city a few minutes later) are answered without running the plugin or
+calling its upstream API again.
+
+Entries live in a size-bounded in-memory LRU backed by an on-disk tier that
+survives across CLI invocations. Each plugin has its own time-to-live; a TTL
+of 0 disables caching for that plugin and "midnight" keeps results until the
+end of the local day.
+
+Past its TTL an entry stays usable for a per-plugin staleness window, so the
+executor can answer with the last good result right away while it refreshes
+the entry in the background.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTLS: Dict[str, Union[int, str]] = {
+    "time": 0,
+    "speedtest": 0,
+    "weather": 600,
+    "adhan": "midnight",
+    "wiki": 86400,
+    "watch": 86400,
+    "whois": 86400
+}
+
+# The disk tier is pruned every this many writes of a process, and by the
+# first write of any process if none has pruned it for PRUNE_INTERVAL
+# seconds, so short-lived CLI invocations keep it bounded too
+PRUNE_EVERY = 64
+PRUNE_INTERVAL = 3600
+PRUNE_MARKER = '.pruned'
+
+DEFAULT_STALE_WINDOWS: Dict[str, int] = {
+    "weather": 3600,
+    "adhan": 86400,
+    "wiki": 604800,
+    "watch": 604800,
+    "whois": 604800
+}
+
+
+@dataclass
+class CacheEntry:
+    """A cached plugin result"""
+    plugin_name: str
+    args: List[str]
+    output: str
+    stored_at: float
+    expires_at: float
+    stale_until: float = 0.0
+    record: Optional[Dict[str, Any]] = None  # Structured result published by the plugin
+
+    @property
+    def size(self) -> int:
+        return len(self.output)
+
+    def is_fresh(self, now: float = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    def is_usable(self, now: float = None) -> bool:
+        """Check whether the entry is fresh or still within its staleness window"""
+        return (now or time.time()) < max(self.expires_at, self.stale_until)
+
+
+class ResultCache:
+    """
+    Two-tier (memory LRU + disk) TTL cache for plugin results
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.default_ttl = config.get('default_ttl', 0)
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(config.get('ttl', {}))
+        self.default_stale_window = config.get('default_stale_window', 0)
+        self.stale_windows = dict(DEFAULT_STALE_WINDOWS)
+        self.stale_windows.update(config.get('stale_windows', {}))
+        self.max_entries = config.get('max_entries', 256)
+        self.max_memory_bytes = config.get('max_memory_bytes', 4 * 1024 * 1024)
+        self.max_disk_entries = config.get('max_disk_entries', 2048)
+
+        directory = config.get('directory', '~/.sarah/cache/results')
+        self.directory = os.path.expanduser(directory) if directory else None
+
+        self._memory: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(plugin_name: str, args: List[str]) -> str:
+        """Build a cache key from the plugin name and normalized arguments"""
+        normalized = [' '.join(str(arg).lower().split()) for arg in args]
+        normalized = [arg for arg in normalized if arg]
+        raw = json.dumps([plugin_name, normalized], ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, plugin_name: str, now: float = None) -> float:
+        """Get the time-to-live in seconds for a plugin's results"""
+        ttl = self.ttls.get(plugin_name, self.default_ttl)
+
+        if ttl == "midnight":
+            current = datetime.fromtimestamp(now or time.time())
+            midnight = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+            return (midnight - current).total_seconds()
+
+        return float(ttl or 0)
+
+    def is_cacheable(self, plugin_name: str) -> bool:
+        """Check whether results of a plugin are cached at all"""
+        return self.enabled and self.ttl_for(plugin_name) > 0
+
+    def get(self, plugin_name: str, args: List[str], allow_stale: bool = False) -> Optional[CacheEntry]:
+        """
+        Look up a cached result, checking memory first and then disk
+
+        Args:
+            plugin_name: Plugin that produced the result
+            args: Arguments the plugin was run with
+            allow_stale: Also return an expired entry within its staleness window
+
+        Returns:
+            The entry, or None on a miss; check `is_fresh()` when allowing stale entries
+        """
+        if not self.is_cacheable(plugin_name):
+            return None
+
+        now = time.time()
+        entry = self._lookup(self.make_key(plugin_name, args), now)
+
+        with self._lock:
+            if entry is not None and entry.is_fresh(now):
+                self.hits += 1
+                return entry
+            if entry is not None and allow_stale:
+                self.stale_hits += 1
+                return entry
+            self.misses += 1
+
+        return None
+
+    def contains(self, plugin_name: str, args: List[str]) -> bool:
+        """Check for a fresh result without counting it as a lookup"""
+        if not self.is_cacheable(plugin_name):
+            return False
+
+        now = time.time()
+        entry = self._lookup(self.make_key(plugin_name, args), now)
+        return entry is not None and entry.is_fresh(now)
+
+    def put(self, plugin_name: str, args: List[str], output: str, record: Dict[str, Any] = None,
+            ttl: float = None) -> Optional[CacheEntry]:
+        """
+        Store a plugin result if the plugin is cacheable
+
+        Args:
+            record: Structured result to store alongside the output
+            ttl: Time-to-live suggested by the plugin, instead of the configured one
+        """
+        if not self.is_cacheable(plugin_name):
+            return None
+
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl_for(plugin_name, now))
+        stale_window = self.stale_windows.get(plugin_name, self.default_stale_window)
+        entry = CacheEntry(plugin_name, list(args), output, now, expires_at, expires_at + stale_window,
+                           record)
+        key = self.make_key(plugin_name, args)
+
+        with self._lock:
+            self._store_memory(key, entry)
+
+        self._write_disk(key, entry)
+        return entry
+
+    def clear(self) -> None:
+        """Drop every cached result from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0
+            }
+
+    def _lookup(self, key: str, now: float) -> Optional[CacheEntry]:
+        """Find a usable entry in memory or on disk, promoting disk entries to memory"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry.is_usable(now):
+                self._memory.move_to_end(key)
+                return entry
+            if entry is not None:
+                self._evict(key)
+
+        entry = self._read_disk(key)
+        if entry is None or not entry.is_usable(now):
+            return None
+
+        with self._lock:
+            self._store_memory(key, entry)
+        return entry
+
+    def _store_memory(self, key: str, entry: CacheEntry) -> None:
+        """Insert into the memory tier and evict least recently used entries over the limits"""
+        if key in self._memory:
+            self._evict(key)
+
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+
+        while self._memory and (len(self._memory) > self.max_entries
+                                or self._memory_bytes > self.max_memory_bytes):
+            self._evict(next(iter(self._memory)))
+
+    def _evict(self, key: str) -> None:
+        entry = self._memory.pop(key)
+        self._memory_bytes -= entry.size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[CacheEntry]:
+        if not self.directory:
+            return None
+
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return CacheEntry(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.debug(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: CacheEntry) -> None:
+        """Write an entry atomically, pruning the disk tier now and then"""
+        if not self.directory:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(entry), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry: {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % PRUNE_EVERY == 0 or self._prune_due():
+            self._prune_disk()
+
+    def _prune_due(self) -> bool:
+        """Check whether no process has pruned the disk tier for PRUNE_INTERVAL"""
+        try:
+            pruned_at = os.path.getmtime(os.path.join(self.directory, PRUNE_MARKER))
+        except OSError:
+            return True
+        return time.time() - pruned_at >= PRUNE_INTERVAL
+
+    def _prune_disk(self) -> None:
+        """Remove the oldest disk entries beyond max_disk_entries"""
+        try:
+            with open(os.path.join(self.directory, PRUNE_MARKER), 'w'):
+                pass
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        except OSError:
+            return
+
+        excess = len(files) - self.max_disk_entries
+        if excess <= 0:
+            return
+
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:excess]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+def create_result_cache(config: Dict[str, Any] = None) -> ResultCache:
+    """Factory function to create result cache"""
+    return ResultCache(config)
+
+
+if __name__ == "__main__":
+    # Exercise the cache with a temporary disk tier
+    import tempfile
+
+    cache = create_result_cache({'directory': tempfile.mkdtemp(), 'max_entries': 2})
+    cache.put('weather', ['London'], 'Sunny, 21C')
+    cache.put('time', [], 'never cached')
+    print("weather london:", cache.get('weather', ['  london ']))
+    print("time:", cache.get('time', []))
+    print("adhan ttl:", round(cache.ttl_for('adhan')), "seconds")
+    print(cache.stats())
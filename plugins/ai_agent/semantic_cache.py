@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Semantic Cache for Sarah AI Agent
+
+This module caches LLM fallback responses keyed by the embedding of the
+question, so a near-duplicate question ("what's the capital of france" vs
+"what is france's capital") is answered locally when its cosine similarity
+with a cached question is above a threshold.
+
+Entries are appended to a JSONL file as they are added and the file is
+rewritten only when it has grown well past `max_entries`. Questions without
+an embedding (e.g. while the sentence model is unavailable) only match
+cached questions with the same normalized text.
+"""
+
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SemanticEntry:
+    """A cached question and its answer"""
+    query: str
+    response: str
+    stored_at: float
+    embedding: Optional[np.ndarray] = None
+
+
+def _normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+def _unit(embedding) -> Optional[np.ndarray]:
+    """Scale an embedding to unit length so a dot product is the cosine similarity"""
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
+
+
+class SemanticCache:
+    """
+    Embedding-keyed cache of LLM responses
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.similarity_threshold = config.get('similarity_threshold', 0.92)
+        self.max_entries = config.get('max_entries', 1000)
+        self.max_age = config.get('max_age_days', 30) * 86400
+
+        path = config.get('path', '~/.sarah/cache/llm_responses.jsonl')
+        self.path = os.path.expanduser(path) if path else None
+
+        # Entries fill slots in order; once full, the oldest slot is overwritten
+        # in place, and row i of the matrix is the embedding of slot i
+        self.entries: List[SemanticEntry] = []
+        self._oldest = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._has_row: Optional[np.ndarray] = None
+        self._file_lines = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def lookup(self, query: str, embedding=None) -> Optional[Tuple[SemanticEntry, float]]:
+        """
+        Find the cached answer to the most similar question
+
+        Returns:
+            The entry and its similarity, or None if nothing is similar enough
+        """
+        if not self.enabled:
+            return None
+
+        vector = _unit(embedding)
+        cutoff = time.time() - self.max_age
+
+        with self._lock:
+            match = None
+            if vector is not None and self._matrix is not None:
+                # After a sentence model change the cached embeddings can't be compared
+                if self._matrix.shape[1] != len(vector):
+                    self.misses += 1
+                    return None
+                slots = len(self.entries)
+                similarities = np.where(self._has_row[:slots], self._matrix[:slots] @ vector, -np.inf)
+                best = int(np.argmax(similarities))
+                entry = self.entries[best]
+                if similarities[best] >= self.similarity_threshold and entry.stored_at >= cutoff:
+                    match = (entry, float(similarities[best]))
+            elif vector is None:
+                normalized = _normalize_query(query)
+                for entry in reversed(self._ordered()):
+                    if _normalize_query(entry.query) == normalized and entry.stored_at >= cutoff:
+                        match = (entry, 1.0)
+                        break
+
+            if match:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return match
+
+    def put(self, query: str, response: str, embedding=None) -> None:
+        """Cache the answer to a question"""
+        if not self.enabled or not response.strip():
+            return
+
+        entry = SemanticEntry(query, response, time.time(), _unit(embedding))
+        with self._lock:
+            self._add(entry)
+            self._append(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+    def _ordered(self) -> List[SemanticEntry]:
+        """Entries from oldest to newest"""
+        return self.entries[self._oldest:] + self.entries[:self._oldest]
+
+    def _add(self, entry: SemanticEntry) -> None:
+        """Add an entry in memory, overwriting the oldest slot beyond max_entries"""
+        if self.max_entries <= 0:
+            return
+        if len(self.entries) < self.max_entries:
+            slot = len(self.entries)
+            self.entries.append(entry)
+        else:
+            slot = self._oldest
+            self.entries[slot] = entry
+            self._oldest = (slot + 1) % self.max_entries
+        self._set_row(slot, entry.embedding)
+
+    def _set_row(self, slot: int, embedding: Optional[np.ndarray]) -> None:
+        """Write the embedding of a slot into its matrix row"""
+        if embedding is None:
+            if self._has_row is not None:
+                self._has_row[slot] = False
+            return
+
+        if self._matrix is None or self._matrix.shape[1] != embedding.shape[0]:
+            # The sentence model changed; older embeddings can't be compared
+            self._matrix = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+            self._has_row = np.zeros(self.max_entries, dtype=bool)
+        self._matrix[slot] = embedding
+        self._has_row[slot] = True
+
+    def _append(self, entry: SemanticEntry) -> None:
+        """Append an entry to the JSONL file, rewriting it once it has grown too long"""
+        if not self.path:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self._file_lines >= 2 * self.max_entries:
+                self._rewrite()
+                return
+
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(self._serialize(entry) + "\n")
+            self._file_lines += 1
+        except OSError as e:
+            logger.warning(f"Failed to write semantic cache: {e}")
+
+    def _rewrite(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self._ordered():
+                f.write(self._serialize(entry) + "\n")
+        os.replace(tmp_path, self.path)
+        self._file_lines = len(self.entries)
+
+    @staticmethod
+    def _serialize(entry: SemanticEntry) -> str:
+        return json.dumps({
+            "query": entry.query,
+            "response": entry.response,
+            "stored_at": entry.stored_at,
+            "embedding": None if entry.embedding is None else [round(float(x), 6) for x in entry.embedding]
+        }, ensure_ascii=False)
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        cutoff = time.time() - self.max_age
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._file_lines += 1
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+                    if data.get('stored_at', 0) < cutoff:
+                        continue
+                    embedding = data.get('embedding')
+                    self.entries.append(SemanticEntry(
+                        data['query'], data['response'], data['stored_at'],
+                        None if embedding is None else np.asarray(embedding, dtype=np.float32)
+                    ))
+        except (OSError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable semantic cache {self.path}: {e}")
+
+        loaded, self.entries = self.entries[-self.max_entries:], []
+        for entry in loaded:
+            self._add(entry)
+
+
+def create_semantic_cache(config: Dict[str, Any] = None) -> SemanticCache:
+    """Factory function to create semantic cache"""
+    return SemanticCache(config)
+
+
+if __name__ == "__main__":
+    # Match a near-duplicate question with toy embeddings
+    cache = create_semantic_cache({'path': None, 'similarity_threshold': 0.9})
+    cache.put("what is the capital of france", "Paris.", [1.0, 0.1, 0.0])
+    print(cache.lookup("what's france's capital", [0.98, 0.12, 0.01]))
+    print(cache.lookup("how tall is everest", [0.0, 0.2, 1.0]))
+    print(cache.lookup("What is the capital of  France"))
+    print(cache.stats())
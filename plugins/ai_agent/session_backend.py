@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session Backends for Sarah AI Agent
+
+The interface the ConversationManager stores sessions through, and the
+factory that picks a backend from the `conversation` configuration:
+
+- "memory": sessions held by this process only (MemorySessionBackend)
+- "sqlite": an indexed local database file (session_store.SessionStore)
+- "redis": a Redis server shared by agent processes on any number of hosts
+  (redis_session_store.RedisSessionStore), or an in-process stand-in for it
+
+A backend only stores what the manager hands it; learning from turns and
+deciding which session to resume stay in the manager.
+"""
+
+import copy
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+try:
+    from .conversation_manager import ConversationContext, ConversationTurn
+except ImportError:
+    # Fallback for direct execution
+    from conversation_manager import ConversationContext, ConversationTurn
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+
+class SessionBackend(ABC):
+    """
+    Where conversation sessions and their turns are stored
+    """
+
+    @abstractmethod
+    def save_session(self, context: ConversationContext) -> None:
+        """Insert or update a session's header (not its turns)"""
+        ...
+
+    @abstractmethod
+    def append_turn(self, context: ConversationContext, turn: ConversationTurn) -> None:
+        """Add a turn and the session state it led to"""
+        ...
+
+    def append_turns(self, turns: List[Tuple[ConversationContext, ConversationTurn]]) -> None:
+        """Add several turns, each with the session state it led to, in order"""
+        for context, turn in turns:
+            self.append_turn(context, turn)
+
+    def import_sessions(self, contexts: List[ConversationContext]) -> None:
+        """Store whole sessions with their turns, e.g. from an older history format"""
+        for context in contexts:
+            self.save_session(context)
+            for turn in context.turns:
+                self.append_turn(context, turn)
+
+    @abstractmethod
+    def latest_session(self, since: datetime = None, max_turns: int = 10) -> Optional[ConversationContext]:
+        """Get the session with the most recent interaction (at or after `since`), with its last turns"""
+        ...
+
+    @abstractmethod
+    def get_session(self, session_id: str, max_turns: int = 10) -> Optional[ConversationContext]:
+        """Get a session by id with its last `max_turns` turns"""
+        ...
+
+    @abstractmethod
+    def turns_between(self, start: datetime = None, end: datetime = None,
+                      limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the turns in a time range, newest first, as dicts with the session id and the turn"""
+        ...
+
+    @abstractmethod
+    def delete_before(self, cutoff: datetime, keep_latest: bool = True) -> int:
+        """Delete sessions last active before `cutoff`, returning how many were deleted"""
+        ...
+
+    @abstractmethod
+    def count_sessions(self) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    Sessions kept in this process only, lost when it exits
+    """
+
+    def __init__(self, max_turns: int = 100):
+        self.max_turns = max_turns
+        self._sessions: Dict[str, ConversationContext] = {}
+        self._lock = threading.Lock()
+
+    def save_session(self, context: ConversationContext) -> None:
+        with self._lock:
+            stored = self._sessions.get(context.session_id)
+            self._sessions[context.session_id] = self._copy(context, stored.turns if stored else [])
+
+    def append_turn(self, context: ConversationContext, turn: ConversationTurn) -> None:
+        with self._lock:
+            stored = self._sessions.get(context.session_id)
+            turns = list(stored.turns.compact) if stored else []
+            turns.append(turn)
+            self._sessions[context.session_id] = self._copy(context, turns[-self.max_turns:])
+
+    def latest_session(self, since: datetime = None, max_turns: int = 10) -> Optional[ConversationContext]:
+        with self._lock:
+            latest = max(self._sessions.values(), key=lambda context: context.last_interaction, default=None)
+            if latest is None or (since is not None and latest.last_interaction < since):
+                return None
+            return self._copy(latest, latest.turns.compact[-max_turns:])
+
+    def get_session(self, session_id: str, max_turns: int = 10) -> Optional[ConversationContext]:
+        with self._lock:
+            stored = self._sessions.get(session_id)
+            return self._copy(stored, stored.turns.compact[-max_turns:]) if stored else None
+
+    def turns_between(self, start: datetime = None, end: datetime = None,
+                      limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            turns = [{'session_id': context.session_id, 'turn': turn}
+                     for context in self._sessions.values() for turn in context.turns
+                     if (start is None or turn.timestamp >= start) and (end is None or turn.timestamp < end)]
+        turns.sort(key=lambda item: item['turn'].timestamp, reverse=True)
+        return turns[:limit]
+
+    def delete_before(self, cutoff: datetime, keep_latest: bool = True) -> int:
+        with self._lock:
+            newest = sorted(self._sessions.values(), key=lambda context: context.last_interaction, reverse=True)
+            kept = newest[:1] if keep_latest else []
+            expired = [context.session_id for context in newest
+                       if context.last_interaction < cutoff and context not in kept]
+            for session_id in expired:
+                del self._sessions[session_id]
+            return len(expired)
+
+    def count_sessions(self) -> int:
+        return len(self._sessions)
+
+    @staticmethod
+    def _copy(context: ConversationContext, turns) -> ConversationContext:
+        """Copy a session, so the stored one doesn't change along with the caller's"""
+        return ConversationContext(
+            session_id=context.session_id,
+            started_at=context.started_at,
+            last_interaction=context.last_interaction,
+            turns=turns,
+            active_topic=context.active_topic,
+            user_preferences=copy.deepcopy(context.user_preferences),
+            location_context=context.location_context
+        )
+
+
+def create_session_backend(config: Dict[str, Any] = None) -> SessionBackend:
+    """
+    Factory function to create the session backend named by `store` in the conversation config
+
+    Raises:
+        ValueError: If the backend is unknown
+        ImportError: If the redis backend is chosen without the redis package
+        ConnectionError: If the redis backend's server can't be reached
+    """
+    config = config or {}
+    backend = config.get('store', 'sqlite')
+
+    if backend == 'memory':
+        return MemorySessionBackend(config.get('max_stored_turns', 100))
+
+    if backend == 'sqlite':
+        try:
+            from .session_store import create_session_store
+        except ImportError:
+            # Fallback for direct execution
+            from session_store import create_session_store
+        return create_session_store(config.get('database', '~/.sarah/conversations.db'))
+
+    if backend == 'redis':
+        try:
+            from .redis_session_store import create_redis_session_store
+        except ImportError:
+            # Fallback for direct execution
+            from redis_session_store import create_redis_session_store
+        redis_config = dict(config.get('redis', {}))
+        redis_config.setdefault('ttl_days', config.get('retention_days', 30))
+        redis_config.setdefault('max_turns', config.get('max_stored_turns', 100))
+        return create_redis_session_store(redis_config)
+
+    raise ValueError(f"Unknown conversation store {backend!r}, expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session Store for Sarah AI Agent
+
+Conversation history in an SQLite database (in WAL mode, so readers never
+wait on the writer) with sessions indexed by id and by last interaction
+time, and turns indexed by session and by time.
+
+Resuming the latest session reads one session row and its last few turns,
+so startup costs the same however much history has built up. Each turn is a
+single small transaction. Sessions and turns can also be queried by time
+range.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+try:
+    from .conversation_manager import ConversationContext, ConversationTurn
+    from .session_backend import SessionBackend
+except ImportError:
+    # Fallback for direct execution
+    from conversation_manager import ConversationContext, ConversationTurn
+    from session_backend import SessionBackend
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    last_interaction REAL NOT NULL,
+    active_topic TEXT,
+    user_preferences TEXT,
+    location_context TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_by_last_interaction ON sessions (last_interaction);
+
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    user_input TEXT NOT NULL,
+    intent_plugin TEXT NOT NULL,
+    intent_confidence REAL NOT NULL,
+    entities TEXT NOT NULL,
+    sarah_response TEXT NOT NULL,
+    execution_successful INTEGER NOT NULL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS turns_by_session ON turns (session_id, id);
+CREATE INDEX IF NOT EXISTS turns_by_time ON turns (timestamp);
+"""
+
+TURN_COLUMNS = ("timestamp, user_input, intent_plugin, intent_confidence, entities, "
+                "sarah_response, execution_successful, result")
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
+
+
+class SessionStore(SessionBackend):
+    """
+    SQLite-backed conversation history
+    """
+
+    def __init__(self, path: str = '~/.sarah/conversations.db'):
+        self.path = os.path.expanduser(path) if path != ':memory:' else path
+        # Whether this opened a new database, e.g. to import older history into
+        self.created = self.path == ':memory:' or not os.path.exists(self.path)
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        # One connection shared by the daemon's request threads
+        self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    def save_session(self, context: ConversationContext) -> None:
+        """Insert or update a session's header (not its turns)"""
+        with self._lock, self._connection:
+            self._upsert_session(context)
+
+    def append_turn(self, context: ConversationContext, turn: ConversationTurn) -> None:
+        """Add a turn and the session state it led to, in one transaction"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT INTO turns (session_id, {TURN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (context.session_id,) + self._turn_values(turn)
+            )
+            self._upsert_session(context)
+
+    def append_turns(self, turns: List[Tuple[ConversationContext, ConversationTurn]]) -> None:
+        """Add several turns in one transaction, storing each session's latest state"""
+        latest = {context.session_id: context for context, _ in turns}
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"INSERT INTO turns (session_id, {TURN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(context.session_id,) + self._turn_values(turn) for context, turn in turns]
+            )
+            for context in latest.values():
+                self._upsert_session(context)
+
+    def import_sessions(self, contexts: List[ConversationContext]) -> None:
+        """Store whole sessions with their turns, e.g. from an older history format"""
+        with self._lock, self._connection:
+            for context in contexts:
+                self._upsert_session(context)
+                self._connection.executemany(
+                    f"INSERT INTO turns (session_id, {TURN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(context.session_id,) + self._turn_values(turn) for turn in context.turns]
+                )
+
+    def latest_session(self, since: datetime = None, max_turns: int = 10) -> Optional[ConversationContext]:
+        """
+        Get the session with the most recent interaction, with its last `max_turns` turns
+
+        Args:
+            since: Only consider sessions with an interaction at or after this time
+        """
+        query = "SELECT * FROM sessions"
+        params: tuple = ()
+        if since is not None:
+            query += " WHERE last_interaction >= ?"
+            params = (since.timestamp(),)
+        query += " ORDER BY last_interaction DESC LIMIT 1"
+
+        with self._lock:
+            row = self._connection.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._context_from_row(row, self._recent_turns(row[0], max_turns))
+
+    def get_session(self, session_id: str, max_turns: int = 10) -> Optional[ConversationContext]:
+        """Get a session by id with its last `max_turns` turns"""
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM sessions WHERE session_id = ?",
+                                           (session_id,)).fetchone()
+            if row is None:
+                return None
+            return self._context_from_row(row, self._recent_turns(session_id, max_turns))
+
+    def sessions_between(self, start: datetime = None, end: datetime = None,
+                         limit: int = 100) -> List[ConversationContext]:
+        """Get the headers (without turns) of sessions last active in a time range, newest first"""
+        where, params = self._time_range('last_interaction', start, end)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT * FROM sessions{where} ORDER BY last_interaction DESC LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+        return [self._context_from_row(row, []) for row in rows]
+
+    def turns_between(self, start: datetime = None, end: datetime = None,
+                      limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get the turns in a time range, newest first
+
+        Returns:
+            Dicts with the session id and the ConversationTurn
+        """
+        where, params = self._time_range('timestamp', start, end)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT session_id, {TURN_COLUMNS} FROM turns{where} ORDER BY timestamp DESC LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+        return [{'session_id': row[0], 'turn': self._turn_from_row(row[1:])} for row in rows]
+
+    def delete_before(self, cutoff: datetime, keep_latest: bool = True) -> int:
+        """
+        Delete sessions (and their turns) last active before `cutoff`
+
+        Returns:
+            Number of sessions deleted
+        """
+        with self._lock, self._connection:
+            params = [cutoff.timestamp()]
+            keep = ""
+            if keep_latest:
+                # The latest session carries the learned preferences
+                keep = (" AND session_id != (SELECT session_id FROM sessions"
+                        " ORDER BY last_interaction DESC LIMIT 1)")
+            expired = f"SELECT session_id FROM sessions WHERE last_interaction < ?{keep}"
+            self._connection.execute(f"DELETE FROM turns WHERE session_id IN ({expired})", params)
+            return self._connection.execute(f"DELETE FROM sessions WHERE session_id IN ({expired})",
+                                            params).rowcount
+
+    def count_sessions(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _upsert_session(self, context: ConversationContext) -> None:
+        self._connection.execute(
+            "INSERT INTO sessions (session_id, started_at, last_interaction, active_topic, "
+            "user_preferences, location_context) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET last_interaction = excluded.last_interaction, "
+            "active_topic = excluded.active_topic, user_preferences = excluded.user_preferences, "
+            "location_context = excluded.location_context",
+            (context.session_id, context.started_at.timestamp(), context.last_interaction.timestamp(),
+             context.active_topic, _dumps(context.user_preferences), context.location_context)
+        )
+
+    def _recent_turns(self, session_id: str, max_turns: int) -> List[ConversationTurn]:
+        rows = self._connection.execute(
+            f"SELECT {TURN_COLUMNS} FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, max_turns)
+        ).fetchall()
+        return [self._turn_from_row(row) for row in reversed(rows)]
+
+    @staticmethod
+    def _time_range(column: str, start: Optional[datetime], end: Optional[datetime]):
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            conditions.append(f"{column} < ?")
+            params.append(end.timestamp())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, tuple(params)
+
+    @staticmethod
+    def _turn_values(turn: ConversationTurn) -> tuple:
+        return (turn.timestamp.timestamp(), turn.user_input, turn.intent_plugin, turn.intent_confidence,
+                _dumps(turn.entities), turn.sarah_response, int(turn.execution_successful),
+                _dumps(turn.result))
+
+    @staticmethod
+    def _turn_from_row(row) -> ConversationTurn:
+        return ConversationTurn(
+            timestamp=datetime.fromtimestamp(row[0]),
+            user_input=row[1],
+            intent_plugin=row[2],
+            intent_confidence=row[3],
+            entities=_loads(row[4]),
+            sarah_response=row[5],
+            execution_successful=bool(row[6]),
+            result=_loads(row[7])
+        )
+
+    @staticmethod
+    def _context_from_row(row, turns: List[ConversationTurn]) -> ConversationContext:
+        return ConversationContext(
+            session_id=row[0],
+            started_at=datetime.fromtimestamp(row[1]),
+            last_interaction=datetime.fromtimestamp(row[2]),
+            turns=turns,
+            active_topic=row[3],
+            user_preferences=_loads(row[4]),
+            location_context=row[5]
+        )
+
+
+def create_session_store(path: str = '~/.sarah/conversations.db') -> SessionStore:
+    """Factory function to create session store"""
+    return SessionStore(path)
+
+
+if __name__ == "__main__":
+    # Time resuming the latest session from a large history
+    import time
+    import tempfile
+    from datetime import timedelta
+
+    store = create_session_store(os.path.join(tempfile.mkdtemp(), 'conversations.db'))
+    now = datetime.now()
+    sessions = []
+    for index in range(2000):
+        started = now - timedelta(hours=2000 - index)
+        turns = [ConversationTurn(started + timedelta(seconds=n), "weather in london", "weather", 0.9,
+                                  {"gpe": "London"}, "Sunny", True) for n in range(50)]
+        sessions.append(ConversationContext(f"session_{index}", started, turns[-1].timestamp, turns))
+    store.import_sessions(sessions)
+
+    started = time.perf_counter()
+    context = store.latest_session(now - timedelta(hours=2), max_turns=10)
+    print(f"Resumed {context.session_id} with {len(context.turns)} turns out of "
+          f"{2000 * 50} in {(time.perf_counter() - started) * 1000:.2f}ms")
+    print(f"{len(store.turns_between(now - timedelta(hours=5), now, limit=10000))} turns in the last 5 hours")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session Table for Sarah AI Agent
+
+The conversation sessions held in memory, kept in order of last interaction.
+A session moves to the end when it is used, so the sessions that have been
+idle longest are always at the front: expiring them pops from the front and
+stops at the first one still active, and the least recently used session is
+the one evicted when the table is over its size cap. Neither costs a scan of
+the whole table.
+
+Sessions added out of order (e.g. loaded from disk) are sorted once, the
+next time the order matters.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTable:
+    """
+    Sessions by id, ordered by last interaction, with expiry and an LRU cap
+    """
+
+    def __init__(self, max_sessions: int = 0):
+        """
+        Args:
+            max_sessions: Most sessions held; 0 means no limit
+        """
+        self.max_sessions = max_sessions
+        self.expired = 0
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._sorted = True
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __getitem__(self, session_id: str):
+        return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, context) -> None:
+        with self._lock:
+            self._insert(session_id, context)
+            self._evict()
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            del self._sessions[session_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, session_id: str, default=None):
+        return self._sessions.get(session_id, default)
+
+    def setdefault(self, session_id: str, context):
+        """Add a session unless one with its id is held; returns the one held"""
+        with self._lock:
+            if session_id not in self._sessions:
+                self[session_id] = context
+            return self._sessions.get(session_id, context)
+
+    def pop(self, session_id: str, default=None):
+        with self._lock:
+            return self._sessions.pop(session_id, default)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            self._ensure_order()
+            return list(self._sessions.keys())
+
+    def values(self) -> List[Any]:
+        """Get the sessions, least recently active first"""
+        with self._lock:
+            self._ensure_order()
+            return list(self._sessions.values())
+
+    def items(self) -> List[tuple]:
+        with self._lock:
+            self._ensure_order()
+            return list(self._sessions.items())
+
+    def replace(self, sessions: Dict[str, Any]) -> None:
+        """Replace all sessions, e.g. with those loaded from disk"""
+        with self._lock:
+            self._sessions = OrderedDict(sorted(sessions.items(), key=lambda item: item[1].last_interaction))
+            self._sorted = True
+            self._evict()
+
+    def touch(self, context) -> None:
+        """Mark a session as just used, adding it back if it had been expired or evicted"""
+        self[context.session_id] = context
+
+    def newest(self) -> Optional[Any]:
+        """Get the most recently active session"""
+        with self._lock:
+            self._ensure_order()
+            if not self._sessions:
+                return None
+            return next(reversed(self._sessions.values()))
+
+    def expire(self, cutoff: datetime) -> List[str]:
+        """
+        Remove the sessions last active before `cutoff`
+
+        The newest session is always kept, since it carries the learned
+        preferences.
+
+        Returns:
+            Ids of the removed sessions
+        """
+        removed = []
+        with self._lock:
+            self._ensure_order()
+            while len(self._sessions) > 1:
+                session_id, context = next(iter(self._sessions.items()))
+                if context.last_interaction >= cutoff:
+                    break
+                del self._sessions[session_id]
+                removed.append(session_id)
+            self.expired += len(removed)
+        return removed
+
+    def _insert(self, session_id: str, context) -> None:
+        self._sessions.pop(session_id, None)
+        if self._sessions and self._sorted:
+            newest = next(reversed(self._sessions.values()))
+            if context.last_interaction < newest.last_interaction:
+                self._sorted = False
+        self._sessions[session_id] = context
+
+    def _ensure_order(self) -> None:
+        if not self._sorted:
+            self._sessions = OrderedDict(sorted(self._sessions.items(),
+                                                key=lambda item: item[1].last_interaction))
+            self._sorted = True
+
+    def _evict(self) -> None:
+        if not self.max_sessions or len(self._sessions) <= self.max_sessions:
+            return
+        self._ensure_order()
+        while len(self._sessions) > self.max_sessions:
+            session_id, _ = self._sessions.popitem(last=False)
+            self.evicted += 1
+            logger.debug(f"Evicted least recently used session {session_id}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"sessions": len(self._sessions), "expired": self.expired, "evicted": self.evicted}
+
+
+def create_session_table(max_sessions: int = 0) -> SessionTable:
+    """Factory function to create session table"""
+    return SessionTable(max_sessions)
+
+
+if __name__ == "__main__":
+    # Time expiring a few sessions from a large table
+    import time
+    from datetime import timedelta
+    from types import SimpleNamespace
+
+    table = create_session_table(max_sessions=50000)
+    now = datetime.now()
+    table.replace({f"session_{n}": SimpleNamespace(session_id=f"session_{n}",
+                                                   last_interaction=now - timedelta(seconds=60000 - n))
+                   for n in range(60000)})
+    print(table.stats())
+
+    cutoff = now - timedelta(seconds=49990)
+    started = time.perf_counter()
+    scanned = [session_id for session_id, context in table.items() if context.last_interaction < cutoff]
+    scan_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    removed = table.expire(cutoff)
+    print(f"Expired {len(removed)} of {len(table) + len(removed)} sessions in "
+          f"{(time.perf_counter() - started) * 1000:.3f}ms (a full scan takes {scan_ms:.3f}ms)")
@@ -23,6 +23,7 @@
 #
 import os
 import sys
+import json
 
 import gi
 gi.require_version('Peas', '1.0')
@@ -36,7 +37,27 @@ class WeatherPlugin(GObject.Object, Sarah.IExtension):
     object = GObject.property(type=GObject.Object)
 
     def do_activate(self, args, argv):
-        os.system("curl wttr.in/"+' '.join(args))
+        location = ' '.join(args)
+        # --fail makes HTTP errors a non-zero exit status, like DNS and
+        # connection errors, so the agent doesn't cache them as a forecast
+        status = os.system("curl --fail wttr.in/"+location)
+        # On success the forecast text itself is the result
+        if status != 0:
+            self.publish_result({"plugin": "weather", "status": "error", "fields": {"location": location},
+                                 "summary": "Could not get the weather from wttr.in"})
+
+    def publish_result(self, result):
+        # Structured result for the AI agent: read from this attribute
+        # in-process, or from SARAH_RESULT_FD. ai_agent/plugin_result.py
+        # specifies the framing (encode_frame); keep this in step with it.
+        self.sarah_result = result
+        fd = os.environ.get("SARAH_RESULT_FD")
+        if fd:
+            payload = json.dumps(result).encode('utf-8')
+            try:
+                os.write(int(fd), b"%d\n%s\n" % (len(payload), payload))
+            except (OSError, ValueError):
+                pass
 
     def do_deactivate(self):
        pass
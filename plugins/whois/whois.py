@@ -21,6 +21,8 @@
 #  MA 02110-1301, USA.
 #
 #
+import os
+import json
 import wikipedia
 import gi
 gi.require_version('Peas', '1.0')
@@ -34,7 +36,33 @@ class WhoisPlugin(GObject.Object, Sarah.IExtension):
     object = GObject.property(type=GObject.Object)
 
     def do_activate(self, args, argv):
-        print(wikipedia.summary(' '.join(args), sentences=2))
+        topic = ' '.join(args)
+        try:
+            summary = wikipedia.summary(topic, sentences=2)
+        except wikipedia.exceptions.WikipediaException as e:
+            print(e)
+            # Some exceptions carry no message at all
+            reason = (str(e).strip().splitlines() or [type(e).__name__])[0]
+            self.publish_result({"plugin": "whois", "status": "error",
+                                 "fields": {"topic": topic}, "summary": reason})
+            return
+
+        print(summary)
+        self.publish_result({"plugin": "whois", "status": "ok",
+                             "fields": {"topic": topic}, "summary": summary})
+
+    def publish_result(self, result):
+        # Structured result for the AI agent: read from this attribute
+        # in-process, or from SARAH_RESULT_FD. ai_agent/plugin_result.py
+        # specifies the framing (encode_frame); keep this in step with it.
+        self.sarah_result = result
+        fd = os.environ.get("SARAH_RESULT_FD")
+        if fd:
+            payload = json.dumps(result).encode('utf-8')
+            try:
+                os.write(int(fd), b"%d\n%s\n" % (len(payload), payload))
+            except (OSError, ValueError):
+                pass
 
     def do_deactivate(self):
         pass